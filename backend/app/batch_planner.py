@@ -0,0 +1,173 @@
+"""Micro-batching of concurrent planner requests into one model call.
+
+Callers block in ``BatchPlanner.plan``. Requests arriving within
+``PLANNER_BATCH_WAIT_MS`` of each other (up to ``PLANNER_BATCH_MAX``) are
+sent to the model together, so the long shared planner instructions are
+paid once per batch instead of once per mission. Only requests of the same
+user share a batch, so one user's prompt never reaches the model next to
+another user's. Each request gets a random key; requests the batch answer
+does not cover raise ``BatchItemError`` and are retried individually by the
+caller.
+"""
+import os
+import time
+import logging
+import secrets
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Batching configuration
+PLANNER_BATCH_ENABLED = os.getenv("PLANNER_BATCH_ENABLED", "false").lower() == "true"
+PLANNER_BATCH_MAX = int(os.getenv("PLANNER_BATCH_MAX", "8"))
+PLANNER_BATCH_WAIT_MS = int(os.getenv("PLANNER_BATCH_WAIT_MS", "50"))
+# Batches allowed to call the model at once
+PLANNER_BATCH_CONCURRENCY = int(os.getenv("PLANNER_BATCH_CONCURRENCY", "2"))
+
+
+class BatchItemError(Exception):
+    """Raised for a request the batch response did not answer usably."""
+
+
+class BatchItem:
+    """One planning request waiting in a batch."""
+
+    __slots__ = ("key", "user", "prompt", "repo_path", "context", "future")
+
+    def __init__(self, key: str, user: str, prompt: str, repo_path: str, context: Any = None):
+        self.key = key
+        self.user = user
+        self.prompt = prompt
+        self.repo_path = repo_path
+        self.context = context
+        self.future: Future = Future()
+
+
+class BatchPlanner:
+    """Collects planner requests and runs them as keyed per-user batches."""
+
+    def __init__(self, run_batch: Callable[[List[BatchItem]], Dict[str, Any]],
+                 max_batch: int = PLANNER_BATCH_MAX, max_wait_ms: int = PLANNER_BATCH_WAIT_MS,
+                 concurrency: int = PLANNER_BATCH_CONCURRENCY):
+        """Initialize the batcher.
+
+        Args:
+            run_batch: Sends a batch to the model; returns results keyed by
+                BatchItem.key. Missing keys or Exception values mark
+                requests for individual retry.
+            max_batch: Maximum requests per batch
+            max_wait_ms: Maximum time the first request waits for company
+            concurrency: Batches allowed to run at once
+        """
+        self.run_batch = run_batch
+        self.max_batch = max(1, max_batch)
+        self.max_wait_s = max_wait_ms / 1000.0
+        self._executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="planner-batch")
+
+        self._cond = threading.Condition()
+        self._pending: List[BatchItem] = []
+        self._flusher: Optional[threading.Thread] = None
+
+        self._batches = 0
+        self._items = 0
+        self._failed_items = 0
+        self._failed_batches = 0
+        self._prompt_chars_saved = 0
+
+    def record_prompt_savings(self, chars: int) -> None:
+        """Count prompt characters saved by sharing instructions in a batch."""
+        with self._cond:
+            self._prompt_chars_saved += chars
+
+    def plan(self, user: str, prompt: str, repo_path: str, timeout: Optional[float] = None,
+             context: Any = None) -> Any:
+        """Plan one request as part of the user's next batch.
+
+        Args:
+            user: User the request belongs to; batches never mix users
+            prompt: User's mission description
+            repo_path: Local repository path
+            timeout: Maximum seconds to wait for the batch result
+            context: Opaque caller data handed to run_batch with the request
+
+        Returns:
+            The result run_batch produced for this request
+
+        Raises:
+            BatchItemError: If the batch did not produce a usable result
+            TimeoutError: If the result did not arrive within timeout
+        """
+        with self._cond:
+            # Unguessable, so a prompt cannot address another request's plan
+            item = BatchItem(f"r-{secrets.token_hex(8)}", user, prompt, repo_path, context)
+            self._pending.append(item)
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = threading.Thread(target=self._flush_loop, name="planner-batcher", daemon=True)
+                self._flusher.start()
+            self._cond.notify_all()
+        return item.future.result(timeout)
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                # The batch window starts with its first request and only takes that user's requests
+                user = self._pending[0].user
+                deadline = time.monotonic() + self.max_wait_s
+                while self._count(user) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = [item for item in self._pending if item.user == user][:self.max_batch]
+                self._pending = [item for item in self._pending if not any(item is taken for taken in batch)]
+            self._executor.submit(self._run, batch)
+
+    def _count(self, user: str) -> int:
+        return sum(1 for item in self._pending if item.user == user)
+
+    def _run(self, batch: List[BatchItem]) -> None:
+        started = time.perf_counter()
+        try:
+            results = self.run_batch(batch)
+        except Exception as e:
+            logger.warning(f"Planner batch of {len(batch)} failed: {e}")
+            results = {}
+            with self._cond:
+                self._failed_batches += 1
+
+        failed = 0
+        for item in batch:
+            result = results.get(item.key)
+            if result is None or isinstance(result, Exception):
+                failed += 1
+                item.future.set_exception(BatchItemError(str(result) if result else "missing from batch response"))
+            else:
+                item.future.set_result(result)
+
+        with self._cond:
+            self._batches += 1
+            self._items += len(batch)
+            self._failed_items += failed
+        logger.info(
+            f"Planner batch of {len(batch)} done in {time.perf_counter() - started:.2f}s "
+            f"({failed} to retry individually)"
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Return batch counts and sizes."""
+        with self._cond:
+            return {
+                "max_batch": self.max_batch,
+                "max_wait_ms": int(self.max_wait_s * 1000),
+                "pending": len(self._pending),
+                "batches": self._batches,
+                "items": self._items,
+                "avg_batch_size": round(self._items / self._batches, 2) if self._batches else 0.0,
+                "failed_batches": self._failed_batches,
+                "items_retried": self._failed_items,
+                "prompt_chars_saved": self._prompt_chars_saved,
+            }
@@ -2,18 +2,27 @@
 import sqlite3
 import logging
 import os
-from typing import Optional, Dict, Any
+import time
+from typing import Optional, Dict, Any, List, Callable
 import json
 
 logger = logging.getLogger(__name__)
 
 # Get the backend directory (parent of app directory)
 BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DB_FILE = os.path.join(BACKEND_DIR, "db.sqlite")
+DB_FILE = os.getenv("DB_FILE", os.path.join(BACKEND_DIR, "db.sqlite"))
 
 # Log the database path for debugging
 print(f"Database file path: {DB_FILE}")
 
+# Live command output older than this is deleted (0 keeps it forever)
+STEP_LOG_RETENTION_S = float(os.getenv("STEP_LOG_RETENTION_S", str(7 * 24 * 3600)))
+# Planner call records older than this are deleted (0 keeps them forever)
+PLANNER_CALL_RETENTION_S = float(os.getenv("PLANNER_CALL_RETENTION_S", str(30 * 24 * 3600)))
+# Minimum seconds between retention sweeps of a table
+RETENTION_SWEEP_INTERVAL_S = 60.0
+_last_sweep: Dict[str, float] = {}
+
 
 def get_connection() -> sqlite3.Connection:
     """Get a database connection with performance optimizations."""
@@ -50,6 +59,7 @@ def init_db() -> None:
                 mac_id TEXT NOT NULL,
                 status TEXT NOT NULL,
                 plan_json TEXT,
+                use_cache INTEGER NOT NULL DEFAULT 1,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
@@ -66,10 +76,73 @@ def init_db() -> None:
             )
         """)
         
+        # Create plan cache table (see app/plan_cache.py)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS plan_cache (
+                key TEXT PRIMARY KEY,
+                prompt_norm TEXT NOT NULL,
+                repo_path TEXT NOT NULL,
+                model TEXT NOT NULL,
+                plan_json TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        
+        # Create planner call accounting table (see app/planner_accounting.py)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS planner_calls (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                mission_id TEXT NOT NULL,
+                source TEXT NOT NULL,
+                backend TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_chars INTEGER NOT NULL DEFAULT 0,
+                response_chars INTEGER NOT NULL DEFAULT 0,
+                prompt_tokens INTEGER,
+                response_tokens INTEGER,
+                wall_ms REAL NOT NULL,
+                retries INTEGER NOT NULL DEFAULT 0,
+                complete INTEGER NOT NULL DEFAULT 1,
+                error TEXT,
+                created_at REAL NOT NULL,
+                FOREIGN KEY (mission_id) REFERENCES missions(id)
+            )
+        """)
+        
+        # Create live command output table (appended while a step runs)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS step_logs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                mission_id TEXT NOT NULL,
+                step_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                stream TEXT NOT NULL,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                UNIQUE (mission_id, step_id, seq),
+                FOREIGN KEY (mission_id) REFERENCES missions(id)
+            )
+        """)
+        
+        # Events posted through the client outbox carry an idempotency key
+        event_columns = {row["name"] for row in cursor.execute("PRAGMA table_info(events)")}
+        if "idempotency_key" not in event_columns:
+            cursor.execute("ALTER TABLE events ADD COLUMN idempotency_key TEXT")
+        
+        # Missions keep use_cache so planning resumed after a restart honours it
+        mission_columns = {row["name"] for row in cursor.execute("PRAGMA table_info(missions)")}
+        if "use_cache" not in mission_columns:
+            cursor.execute("ALTER TABLE missions ADD COLUMN use_cache INTEGER NOT NULL DEFAULT 1")
+        
         # Create indexes for better query performance
         cursor.execute("""
             CREATE INDEX IF NOT EXISTS idx_events_mission_id ON events(mission_id)
         """)
+        cursor.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_events_idempotency_key ON events(idempotency_key)
+        """)
         cursor.execute("""
             CREATE INDEX IF NOT EXISTS idx_events_step_id ON events(step_id)
         """)
@@ -79,6 +152,21 @@ def init_db() -> None:
         cursor.execute("""
             CREATE INDEX IF NOT EXISTS idx_missions_status ON missions(status)
         """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_plan_cache_last_used ON plan_cache(last_used_at)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_planner_calls_mission_id ON planner_calls(mission_id)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_planner_calls_created_at ON planner_calls(created_at)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_step_logs_mission_id ON step_logs(mission_id, id)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_step_logs_created_at ON step_logs(created_at)
+        """)
         
         conn.commit()
         conn.close()
@@ -107,8 +195,8 @@ def create_mission(mission_data: Dict[str, Any]) -> str:
         cursor = conn.cursor()
         
         cursor.execute("""
-            INSERT INTO missions (id, user, prompt, repo_path, mac_id, status, plan_json)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
+            INSERT INTO missions (id, user, prompt, repo_path, mac_id, status, plan_json, use_cache)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         """, (
             mission_data["id"],
             mission_data["user"],
@@ -116,7 +204,8 @@ def create_mission(mission_data: Dict[str, Any]) -> str:
             mission_data["repo_path"],
             mission_data["mac_id"],
             mission_data["status"],
-            mission_data.get("plan_json")
+            mission_data.get("plan_json"),
+            int(mission_data.get("use_cache", True))
         ))
         
         conn.commit()
@@ -171,14 +260,67 @@ def get_mission_by_id(mission_id: str) -> Optional[Dict[str, Any]]:
         raise
 
 
+def get_mission_plan_json(mission_id: str) -> Optional[Dict[str, Any]]:
+    """Retrieve a mission's status and raw plan JSON without parsing it.
+    
+    Args:
+        mission_id: The mission identifier
+        
+    Returns:
+        Dictionary with status and plan_json, or None if not found
+    """
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT status, plan_json
+            FROM missions
+            WHERE id = ?
+        """, (mission_id,))
+        
+        row = cursor.fetchone()
+        conn.close()
+        
+        if row:
+            return {"status": row["status"], "plan_json": row["plan_json"] or "{}"}
+        
+        return None
+        
+    except sqlite3.Error as e:
+        logger.error(f"Failed to retrieve plan for mission {mission_id}: {e}")
+        raise
+
+
 def create_event(event_data: Dict[str, Any]) -> str:
     """Create a new event in the database.
     
+    Events with an idempotency_key that was already stored are ignored.
+    
     Args:
         event_data: Dictionary containing event fields
         
     Returns:
-        The event ID of the created event
+        The event ID of the created event, or of the event stored earlier
+        with the same idempotency_key
+        
+    Raises:
+        sqlite3.Error: If database operation fails
+    """
+    return create_events([event_data])[0]
+
+
+def create_events(events: List[Dict[str, Any]]) -> List[str]:
+    """Create several events in one transaction.
+    
+    Events whose idempotency_key was already stored (e.g. a batch resent by
+    the client after a lost response) are not inserted again.
+    
+    Args:
+        events: Dictionaries containing event fields
+        
+    Returns:
+        Event IDs in input order; duplicates map to the stored event's ID
         
     Raises:
         sqlite3.Error: If database operation fails
@@ -187,25 +329,169 @@ def create_event(event_data: Dict[str, Any]) -> str:
         conn = get_connection()
         cursor = conn.cursor()
         
+        event_ids = []
+        for event_data in events:
+            key = event_data.get("idempotency_key")
+            cursor.execute("""
+                INSERT INTO events (id, mission_id, step_id, payload, idempotency_key)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(idempotency_key) DO NOTHING
+            """, (
+                event_data["id"],
+                event_data["mission_id"],
+                event_data.get("step_id"),
+                event_data["payload"],
+                key
+            ))
+            if cursor.rowcount == 0 and key is not None:
+                row = cursor.execute("SELECT id FROM events WHERE idempotency_key = ?", (key,)).fetchone()
+                event_ids.append(row["id"])
+                logger.info(f"Duplicate event ignored: {key} for mission {event_data['mission_id']}")
+            else:
+                event_ids.append(event_data["id"])
+        
+        conn.commit()
+        conn.close()
+        
+        logger.info(f"Events created: {len(events)} for mission {events[0]['mission_id'] if events else None}")
+        return event_ids
+        
+    except sqlite3.Error as e:
+        logger.error(f"Failed to create events: {e}")
+        raise
+
+
+def get_action_timings(mission_id: str) -> list:
+    """Get the action timings reported with a mission's step events.
+    
+    Args:
+        mission_id: The mission identifier
+        
+    Returns:
+        List of timing dictionaries (type, resource, duration_s, success and
+        the action id if any) with their step_id, in the order reported
+    """
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        
         cursor.execute("""
-            INSERT INTO events (id, mission_id, step_id, payload)
-            VALUES (?, ?, ?, ?)
-        """, (
-            event_data["id"],
-            event_data["mission_id"],
-            event_data.get("step_id"),
-            event_data["payload"]
-        ))
+            SELECT step_id, json_extract(payload, '$.action_timings') AS timings
+            FROM events
+            WHERE mission_id = ? AND json_extract(payload, '$.action_timings') IS NOT NULL
+            ORDER BY timestamp, rowid
+        """, (mission_id,))
+        
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [
+            {"step_id": row["step_id"], **timing}
+            for row in rows
+            for timing in json.loads(row["timings"])
+        ]
+        
+    except sqlite3.Error as e:
+        logger.error(f"Failed to retrieve action timings: {e}")
+        raise
+
+
+def sweep_expired(cursor: sqlite3.Cursor, table: str, retention_s: float, now: float) -> int:
+    """Delete rows older than retention_s, at most once per sweep interval per table.
+    
+    Args:
+        cursor: Cursor of the caller's transaction
+        table: Table with an indexed created_at column holding Unix time
+        retention_s: Age in seconds after which rows are deleted (0 keeps them)
+        now: Current Unix time
+        
+    Returns:
+        Number of rows deleted
+    """
+    if retention_s <= 0 or now - _last_sweep.get(table, 0.0) < RETENTION_SWEEP_INTERVAL_S:
+        return 0
+    _last_sweep[table] = now
+    cursor.execute(f"DELETE FROM {table} WHERE created_at < ?", (now - retention_s,))
+    if cursor.rowcount:
+        logger.info(f"Deleted {cursor.rowcount} {table} rows older than {retention_s:.0f}s")
+    return cursor.rowcount
+
+
+def append_step_logs(mission_id: str, step_id: str, chunks: List[Dict[str, Any]]) -> int:
+    """Append chunks of a step's live output.
+    
+    Chunks whose seq is already stored (a batch resent by the client) are
+    skipped. Output older than STEP_LOG_RETENTION_S is deleted along the way.
+    
+    Args:
+        mission_id: The mission identifier
+        step_id: The step identifier
+        chunks: Dictionaries with seq, stream and data
+        
+    Returns:
+        Number of chunks stored
+        
+    Raises:
+        sqlite3.Error: If database operation fails
+    """
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        
+        now = time.time()
+        cursor.executemany("""
+            INSERT OR IGNORE INTO step_logs (mission_id, step_id, seq, stream, data, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [(mission_id, step_id, chunk["seq"], chunk["stream"], chunk["data"], now) for chunk in chunks])
+        stored = cursor.rowcount
+        sweep_expired(cursor, "step_logs", STEP_LOG_RETENTION_S, now)
         
         conn.commit()
-        event_id = event_data["id"]
         conn.close()
         
-        logger.info(f"Event created: {event_id} for mission {event_data['mission_id']}")
-        return event_id
+        return stored
         
     except sqlite3.Error as e:
-        logger.error(f"Failed to create event: {e}")
+        logger.error(f"Failed to append step logs: {e}")
+        raise
+
+
+def get_step_logs(mission_id: str, step_id: Optional[str] = None, after: int = 0, limit: int = 500) -> list:
+    """Retrieve live output chunks of a mission.
+    
+    Args:
+        mission_id: The mission identifier
+        step_id: Only return chunks of this step
+        after: Only return chunks with an id greater than this cursor
+        limit: Maximum chunks returned
+        
+    Returns:
+        List of dictionaries (id, step_id, seq, stream, data, created_at), oldest first
+    """
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        
+        conditions, params = ["mission_id = ?", "id > ?"], [mission_id, after]
+        if step_id is not None:
+            conditions.append("step_id = ?")
+            params.append(step_id)
+        
+        cursor.execute(f"""
+            SELECT id, step_id, seq, stream, data, created_at
+            FROM step_logs
+            WHERE {' AND '.join(conditions)}
+            ORDER BY id
+            LIMIT ?
+        """, params + [limit])
+        
+        rows = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        
+        return rows
+        
+    except sqlite3.Error as e:
+        logger.error(f"Failed to retrieve step logs: {e}")
         raise
 
 
@@ -236,3 +522,215 @@ def get_completed_step_ids(mission_id: str) -> set:
     except sqlite3.Error as e:
         logger.error(f"Failed to get completed steps for mission {mission_id}: {e}")
         raise
+
+
+def update_mission_plan(mission_id: str, plan_json: str, status: str) -> None:
+    """Store a mission's plan and status.
+    
+    Args:
+        mission_id: The mission identifier
+        plan_json: JSON string of the mission plan
+        status: New mission status
+        
+    Raises:
+        sqlite3.Error: If database operation fails
+    """
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            UPDATE missions
+            SET plan_json = ?, status = ?
+            WHERE id = ?
+        """, (plan_json, status, mission_id))
+        
+        conn.commit()
+        conn.close()
+        
+        logger.info(f"Mission {mission_id} plan updated (status: {status})")
+        
+    except sqlite3.Error as e:
+        logger.error(f"Failed to update plan for mission {mission_id}: {e}")
+        raise
+
+
+def get_missions_by_status(status: str) -> list:
+    """Retrieve all missions with a given status.
+    
+    Args:
+        status: Mission status to filter on
+        
+    Returns:
+        List of dictionaries with id, user, prompt, repo_path and use_cache
+    """
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT id, user, prompt, repo_path, use_cache
+            FROM missions
+            WHERE status = ?
+            ORDER BY created_at
+        """, (status,))
+        
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [dict(row) for row in rows]
+        
+    except sqlite3.Error as e:
+        logger.error(f"Failed to get missions with status {status}: {e}")
+        raise
+
+
+def clone_mission(source_id: str, mission_id: str, status: str, exclude_status: str,
+                  user: Optional[str] = None, repo_path: Optional[str] = None,
+                  mac_id: Optional[str] = None,
+                  rebase: Optional[Callable[[Dict[str, Any], str, str], Dict[str, Any]]] = None) -> bool:
+    """Copy a mission and its stored plan into a new mission in one transaction.
+    
+    The source row is read and copied under one write lock, so a repair or
+    replan of the source cannot land in between and the copy always holds
+    a single version of its plan. Unless the plan has to be rebased, it is
+    copied inside SQLite with its mission_id replaced, so a re-run never
+    parses or re-plans the source mission.
+    
+    Args:
+        source_id: Mission to copy
+        mission_id: Identifier of the new mission
+        status: Status of the new mission
+        exclude_status: Source status that cannot be copied (e.g. still planning)
+        user: New owner, or None to keep the source's
+        repo_path: New repository path, or None to keep the source's
+        mac_id: New macOS client, or None to keep the source's
+        rebase: Callable(plan, old_repo_path, new_repo_path) returning the
+            plan to store when repo_path differs from the source's
+        
+    Returns:
+        True if the mission was created, False if the source does not exist
+        or has exclude_status
+        
+    Raises:
+        sqlite3.Error: If database operation fails
+    """
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        
+        cursor.execute(
+            "SELECT repo_path, status, plan_json FROM missions WHERE id = ?",
+            (source_id,)
+        )
+        source = cursor.fetchone()
+        if source is None or source["status"] == exclude_status:
+            conn.rollback()
+            conn.close()
+            return False
+            
+        plan_json = None
+        if rebase is not None and repo_path is not None and repo_path != source["repo_path"]:
+            # Paths in the plan point into the source repository
+            plan = json.loads(source["plan_json"]) if source["plan_json"] else {}
+            plan_json = json.dumps(rebase(plan, source["repo_path"], repo_path))
+        
+        cursor.execute("""
+            INSERT INTO missions (id, user, prompt, repo_path, mac_id, status, plan_json, use_cache)
+            SELECT ?, COALESCE(?, user), prompt, COALESCE(?, repo_path), COALESCE(?, mac_id), ?,
+                   json_set(COALESCE(?, plan_json), '$.mission_id', ?), use_cache
+            FROM missions
+            WHERE id = ?
+        """, (
+            mission_id, user, repo_path, mac_id, status,
+            plan_json, mission_id,
+            source_id
+        ))
+        
+        conn.commit()
+        conn.close()
+        
+        logger.info(f"Mission {mission_id} cloned from {source_id}")
+        return True
+        
+    except sqlite3.Error as e:
+        logger.error(f"Failed to clone mission {source_id}: {e}")
+        raise
+
+
+PLANNER_CALL_COLUMNS = (
+    "mission_id", "source", "backend", "model", "prompt_chars", "response_chars",
+    "prompt_tokens", "response_tokens", "wall_ms", "retries", "complete", "error", "created_at",
+)
+
+
+def create_planner_call(call_data: Dict[str, Any]) -> None:
+    """Store the accounting record of one planner call.
+    
+    Records older than PLANNER_CALL_RETENTION_S are deleted along the way.
+    
+    Args:
+        call_data: Dictionary with the PLANNER_CALL_COLUMNS fields
+        
+    Raises:
+        sqlite3.Error: If database operation fails
+    """
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute(f"""
+            INSERT INTO planner_calls ({", ".join(PLANNER_CALL_COLUMNS)})
+            VALUES ({", ".join("?" for _ in PLANNER_CALL_COLUMNS)})
+        """, tuple(call_data.get(column) for column in PLANNER_CALL_COLUMNS))
+        sweep_expired(cursor, "planner_calls", PLANNER_CALL_RETENTION_S, time.time())
+        
+        conn.commit()
+        conn.close()
+        
+    except sqlite3.Error as e:
+        logger.error(f"Failed to store planner call for mission {call_data.get('mission_id')}: {e}")
+        raise
+
+
+def get_planner_calls(mission_id: Optional[str] = None, since: Optional[float] = None) -> list:
+    """Retrieve planner call records.
+    
+    Args:
+        mission_id: Only return calls for this mission
+        since: Only return calls created at or after this Unix timestamp
+        
+    Returns:
+        List of dictionaries with the planner call fields, oldest first
+    """
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        
+        conditions, params = [], []
+        if mission_id is not None:
+            conditions.append("mission_id = ?")
+            params.append(mission_id)
+        if since is not None:
+            conditions.append("created_at >= ?")
+            params.append(since)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        cursor.execute(f"""
+            SELECT id, {", ".join(PLANNER_CALL_COLUMNS)}
+            FROM planner_calls
+            {where}
+            ORDER BY created_at
+        """, params)
+        
+        rows = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        
+        for row in rows:
+            row["complete"] = bool(row["complete"])
+        return rows
+        
+    except sqlite3.Error as e:
+        logger.error(f"Failed to retrieve planner calls: {e}")
+        raise
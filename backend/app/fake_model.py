@@ -0,0 +1,140 @@
+"""Local stand-in for the Gemini model used for offline testing and benchmarks.
+
+``FakeStreamingModel`` mimics the parts of ``genai.GenerativeModel`` the
+planner uses: ``generate_content(prompt)`` returns an object with ``.text``
+and ``generate_content(prompt, stream=True)`` yields chunks with ``.text``.
+Latency is simulated with sleeps so timing behaviour can be measured, and
+``request_options={"timeout": s}`` ends a call that would take longer, like
+the real client's request deadline.
+Batched planner prompts are answered with a ``plans`` object keyed by request.
+"""
+import re
+import json
+import time
+import random
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+_REPO_PATH = re.compile(r"^Repository path: (.*)$", re.MULTILINE)
+_USER_PROMPT = re.compile(r"^User prompt: (.*)$", re.MULTILINE)
+_MISSION_ID = re.compile(r'"mission_id": "([^"]*)"')
+_BATCH_REQUESTS = re.compile(r"^Requests:\n(\[.*?\n\])$", re.MULTILINE | re.DOTALL)
+
+
+def prompt_fields(prompt: str) -> Tuple[str, str]:
+    """Extract the user prompt and repository path from a planner prompt."""
+    repo_match = _REPO_PATH.search(prompt)
+    prompt_match = _USER_PROMPT.search(prompt)
+    repo_path = repo_match.group(1).strip() if repo_match else "."
+    user_prompt = prompt_match.group(1).strip() if prompt_match else "Complete the task"
+    return user_prompt, repo_path
+
+
+class FakeChunk:
+    """A response (or streamed response chunk) carrying text."""
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeStreamingModel:
+    """Deterministic fake model producing valid plans with simulated latency."""
+
+    def __init__(self, first_token_latency_s: float = 0.3, step_latency_s: float = 0.5,
+                 steps: int = 3, chunk_size: int = 48, extra_latency_s: float = 0.0,
+                 error_rate: float = 0.0, seed: int = 0):
+        """Initialize the fake model.
+
+        Args:
+            first_token_latency_s: Delay before the first chunk
+            step_latency_s: Generation time per plan step
+            steps: Number of steps in generated plans
+            chunk_size: Characters per streamed chunk
+            extra_latency_s: Injected delay added before the first chunk
+            error_rate: Fraction of calls that fail with an upstream error
+            seed: Seed for error injection
+        """
+        self.first_token_latency_s = first_token_latency_s
+        self.step_latency_s = step_latency_s
+        self.steps = steps
+        self.chunk_size = chunk_size
+        self.extra_latency_s = extra_latency_s
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+
+    def build_plan(self, prompt: str) -> Dict[str, Any]:
+        """Build the plan this model answers with for a planner prompt."""
+        user_prompt, repo_path = prompt_fields(prompt)
+        mission_match = _MISSION_ID.search(prompt)
+
+        steps = [{
+            "step_id": "s-1",
+            "title": "Open Kiro and open project",
+            "actions": [
+                {"type": "open_app", "app": "Kiro"},
+                {"type": "open_project", "path": repo_path},
+                {"type": "screenshot"}
+            ],
+            "expect_marker": "C-1001"
+        }]
+        for i in range(2, self.steps + 1):
+            steps.append({
+                "step_id": f"s-{i}",
+                "title": f"Work on: {user_prompt}" if i < self.steps else "Run tests",
+                "actions": [
+                    {"type": "prompt_kiro_ai", "prompt": user_prompt} if i < self.steps
+                    else {"type": "run_command", "cmd": "npm test"}
+                ],
+                "expect_marker": f"C-{1000 + i}"
+            })
+        return {"mission_id": mission_match.group(1) if mission_match else "fake", "plan": steps}
+
+    def build_response(self, prompt: str) -> Dict[str, Any]:
+        """Build the JSON document answering a single or batched planner prompt."""
+        requests = _BATCH_REQUESTS.search(prompt)
+        if not requests:
+            return self.build_plan(prompt)
+        plans = {}
+        for request in json.loads(requests.group(1)):
+            plan = self.build_plan(f"User prompt: {request['prompt']}\nRepository path: {request['repository_path']}")
+            plans[request["key"]] = {**plan, "mission_id": "<mission_id>"}
+        return {"plans": plans}
+
+    def _chunks(self, text: str) -> Iterator[str]:
+        for i in range(0, len(text), self.chunk_size):
+            yield text[i:i + self.chunk_size]
+
+    def _stream(self, prompt: str, timeout: Optional[float] = None) -> Iterator[FakeChunk]:
+        document = self.build_response(prompt)
+        plans = document["plans"].values() if "plans" in document else [document]
+        steps = sum(len(plan["plan"]) for plan in plans)
+        text = "```json\n" + json.dumps(document, indent=2) + "\n```"
+        chunks = list(self._chunks(text))
+        # Spread the per-step generation time evenly over the chunks
+        per_chunk = self.step_latency_s * steps / max(1, len(chunks))
+
+        delay = self.first_token_latency_s + self.extra_latency_s
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"fake upstream deadline of {timeout}s exceeded (504 Deadline Exceeded)")
+        time.sleep(delay)
+        if self.error_rate and self._rng.random() < self.error_rate:
+            raise RuntimeError("fake upstream error (503 Service Unavailable)")
+        for chunk in chunks:
+            time.sleep(per_chunk)
+            yield FakeChunk(chunk)
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs: Any):
+        """Generate a plan for a planner prompt.
+
+        Args:
+            prompt: Full planner prompt
+            stream: Return an iterator of chunks instead of one response
+            **kwargs: request_options={"timeout": seconds} bounds the call
+
+        Returns:
+            FakeChunk, or an iterator of FakeChunk when streaming
+        """
+        timeout = (kwargs.get("request_options") or {}).get("timeout")
+        if stream:
+            return self._stream(prompt, timeout)
+        return FakeChunk("".join(chunk.text for chunk in self._stream(prompt, timeout)))
@@ -7,6 +7,11 @@ from fastapi.exceptions import RequestValidationError
 from dotenv import load_dotenv
 from app.routes import router
 from app.db import init_db
+from app.planner_queue import planner_queue
+from app.mission_planning import resume_planning
+from app.ai_planner import warm_similarity_index
+from app.request_compression import GzipRequestMiddleware
+from app.tracing import TracingMiddleware
 
 # Load environment variables
 load_dotenv()
@@ -24,12 +29,20 @@ app = FastAPI(title="AutoIDE Controller")
 # Include routes
 app.include_router(router)
 
+# Accept gzip-compressed request bodies (large client events)
+app.add_middleware(GzipRequestMiddleware)
+
+# Time requests as spans and hand out mission trace contexts
+app.add_middleware(TracingMiddleware)
+
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize database and log startup."""
     try:
         init_db()
+        warm_similarity_index()
+        await resume_planning()
         logger.info("Server started on http://0.0.0.0:5757")
         
         # Check for GEMINI_API_KEY
@@ -44,6 +57,12 @@ async def startup_event():
         raise
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop planner workers."""
+    await planner_queue.shutdown()
+
+
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     """Log all incoming requests."""
@@ -0,0 +1,135 @@
+"""Background mission planning.
+
+Missions are stored with status ``planning`` as soon as they are submitted.
+The plan is generated later by the planner queue workers, written back to
+the database, and the mission is flipped to ``pending``.
+"""
+import json
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+from app.ai_planner import plan_from_prompt, get_static_plan
+from app.db import update_mission_plan, get_missions_by_status
+from app.planner_queue import planner_queue, QueueFullError
+from app.tracing import tracer, mission_trace_context
+
+logger = logging.getLogger(__name__)
+
+PLANNING_STATUS = "planning"
+PENDING_STATUS = "pending"
+
+
+def empty_plan(mission_id: str) -> Dict[str, Any]:
+    """Return the placeholder plan stored while a mission is being planned."""
+    return {"mission_id": mission_id, "plan": []}
+
+
+def rebase_plan(plan: Dict[str, Any], old_repo_path: str, new_repo_path: str) -> Dict[str, Any]:
+    """Return a copy of a plan with paths under old_repo_path moved to new_repo_path.
+
+    Args:
+        plan: Stored mission plan
+        old_repo_path: Repository path the plan was made for
+        new_repo_path: Repository path the copy runs against
+
+    Returns:
+        The rebased plan; action values equal to or inside the old
+        repository path are rewritten, everything else is unchanged
+    """
+    old_root = old_repo_path.rstrip("/")
+    new_root = new_repo_path.rstrip("/")
+
+    def rebase(value: Any) -> Any:
+        if isinstance(value, str):
+            if value.rstrip("/") == old_root:
+                return new_repo_path
+            if old_root and value.startswith(old_root + "/"):
+                return new_root + value[len(old_root):]
+            return value
+        if isinstance(value, list):
+            return [rebase(item) for item in value]
+        if isinstance(value, dict):
+            return {key: rebase(item) for key, item in value.items()}
+        return value
+
+    return rebase(plan)
+
+
+def plan_mission(mission_id: str, prompt: str, repo_path: str, use_cache: bool = True,
+                 use_templates: bool = True, user: Optional[str] = None) -> None:
+    """Generate and store the plan for a mission in ``planning`` state.
+
+    Runs in a planner worker thread. Steps streamed by the model are stored
+    as they arrive, so ``next_step`` can hand out ``s-1`` while later steps
+    are still being generated. Any failure falls back to the static plan so
+    the mission never stays stuck in ``planning``.
+
+    Args:
+        mission_id: Mission identifier
+        prompt: User's mission description
+        repo_path: Local repository path
+        use_cache: Whether the planner may use the plan cache
+        use_templates: Whether the planner may use the plan templates
+        user: User the mission belongs to
+    """
+    streamed = []
+
+    def store_step(step: Dict[str, Any]) -> None:
+        streamed.append(step)
+        partial = {"mission_id": mission_id, "plan": streamed}
+        update_mission_plan(mission_id, json.dumps(partial), PLANNING_STATUS)
+        logger.info(f"Mission {mission_id} step {step.get('step_id')} ready while planning")
+
+    with tracer.span("plan_mission", parent=mission_trace_context(mission_id),
+                     attributes={"mission.id": mission_id}) as span:
+        try:
+            plan = plan_from_prompt(
+                mission_id, prompt, repo_path, use_cache, on_step=store_step, use_templates=use_templates,
+                user=user
+            )
+        except Exception as e:
+            logger.error(f"Background planning failed for mission {mission_id}: {e}")
+            span.set_error(str(e))
+            plan = get_static_plan(mission_id, prompt, repo_path)
+            if streamed:
+                # Steps may already be running; never swap them for a different plan
+                plan = {"mission_id": mission_id, "plan": streamed}
+        span.set_attribute("plan.steps", len(plan.get("plan", [])))
+        span.set_attribute("plan.streamed_steps", len(streamed))
+
+        try:
+            update_mission_plan(mission_id, json.dumps(plan), PENDING_STATUS)
+            logger.info(f"Mission {mission_id} planned with {len(plan.get('plan', []))} steps")
+        except Exception as e:
+            logger.error(f"Failed to store plan for mission {mission_id}: {e}")
+
+
+async def schedule_planning(user: str, mission_id: str, prompt: str, repo_path: str,
+                            use_cache: bool = True, use_templates: bool = True) -> asyncio.Future:
+    """Queue background planning for a mission.
+
+    Raises:
+        QueueFullError: If the planner queue cannot accept the job
+    """
+    return await planner_queue.enqueue(
+        user, plan_mission, mission_id, prompt, repo_path, use_cache, use_templates, user
+    )
+
+
+async def resume_planning() -> None:
+    """Re-queue missions left in ``planning`` state by a previous run."""
+    missions = get_missions_by_status(PLANNING_STATUS)
+    if not missions:
+        return
+
+    logger.info(f"Resuming planning for {len(missions)} missions")
+    for mission in missions:
+        try:
+            await schedule_planning(
+                mission["user"], mission["id"], mission["prompt"], mission["repo_path"],
+                bool(mission["use_cache"])
+            )
+        except QueueFullError:
+            logger.warning(f"Planner queue full, using static plan for mission {mission['id']}")
+            plan = get_static_plan(mission["id"], mission["prompt"], mission["repo_path"])
+            update_mission_plan(mission["id"], json.dumps(plan), PENDING_STATUS)
@@ -0,0 +1,213 @@
+"""Pluggable model backends for the planner.
+
+``PLANNER_MODEL_BACKEND`` selects what ``plan_from_prompt`` talks to:
+
+- ``gemini``: the real Gemini API
+- ``fake``: ``FakeStreamingModel``, valid plans with simulated latency
+- ``record``: wraps ``PLANNER_RECORD_BACKEND`` (gemini or fake) and appends
+  every prompt/response pair with its chunk timing to ``PLANNER_RECORDING_FILE``
+- ``replay``: serves responses from ``PLANNER_RECORDING_FILE`` without
+  network access, optionally reproducing the recorded timing
+
+All backends expose ``generate_content(prompt, stream=False)`` like
+``genai.GenerativeModel``.
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+import google.generativeai as genai
+from app.fake_model import FakeStreamingModel, FakeChunk
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PLANNER_MODEL_BACKEND = os.getenv("PLANNER_MODEL_BACKEND", "gemini")
+PLANNER_FAKE_FIRST_TOKEN_S = float(os.getenv("PLANNER_FAKE_FIRST_TOKEN_S", "0.3"))
+PLANNER_FAKE_STEP_LATENCY_S = float(os.getenv("PLANNER_FAKE_STEP_LATENCY_S", "0.5"))
+PLANNER_FAKE_EXTRA_LATENCY_S = float(os.getenv("PLANNER_FAKE_EXTRA_LATENCY_S", "0"))
+PLANNER_FAKE_ERROR_RATE = float(os.getenv("PLANNER_FAKE_ERROR_RATE", "0"))
+
+# Record/replay configuration
+PLANNER_RECORDING_FILE = os.getenv(
+    "PLANNER_RECORDING_FILE", os.path.join(BACKEND_DIR, "recordings", "planner.jsonl")
+)
+PLANNER_RECORD_BACKEND = os.getenv("PLANNER_RECORD_BACKEND", "gemini")
+PLANNER_REPLAY_TIMING = os.getenv("PLANNER_REPLAY_TIMING", "false").lower() == "true"
+PLANNER_REPLAY_SPEED = float(os.getenv("PLANNER_REPLAY_SPEED", "1.0"))
+
+BACKENDS = ("gemini", "fake", "record", "replay")
+
+
+class ReplayMissError(LookupError):
+    """Raised when a replayed prompt has no recording."""
+
+
+def prompt_key(prompt: str) -> str:
+    """Return the recording key of a model prompt."""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+class RecordingModel:
+    """Wraps a model and records every call to a JSONL file."""
+
+    def __init__(self, inner: Any, path: str = PLANNER_RECORDING_FILE):
+        """Initialize the recorder.
+
+        Args:
+            inner: Model whose calls are recorded
+            path: JSONL file recordings are appended to
+        """
+        self.inner = inner
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def _write(self, prompt: str, stream: bool, started: float,
+               chunks: List[List[Any]], error: Optional[str] = None) -> None:
+        record = {
+            "key": prompt_key(prompt),
+            "prompt": prompt,
+            "stream": stream,
+            "chunks": chunks,
+            "total_s": round(time.perf_counter() - started, 4),
+            "error": error,
+            "recorded_at": time.time(),
+        }
+        line = json.dumps(record)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def _stream(self, prompt: str, started: float, **kwargs: Any) -> Iterator[Any]:
+        chunks: List[List[Any]] = []
+        try:
+            for chunk in self.inner.generate_content(prompt, stream=True, **kwargs):
+                chunks.append([round(time.perf_counter() - started, 4), chunk.text])
+                yield chunk
+        except Exception as e:
+            self._write(prompt, True, started, chunks, error=str(e))
+            raise
+        self._write(prompt, True, started, chunks)
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs: Any):
+        """Call the wrapped model and record the response and its timing."""
+        started = time.perf_counter()
+        if stream:
+            return self._stream(prompt, started, **kwargs)
+        try:
+            response = self.inner.generate_content(prompt, **kwargs)
+        except Exception as e:
+            self._write(prompt, False, started, [], error=str(e))
+            raise
+        self._write(prompt, False, started, [[round(time.perf_counter() - started, 4), response.text]])
+        return response
+
+
+class ReplayModel:
+    """Serves recorded responses deterministically."""
+
+    def __init__(self, path: str = PLANNER_RECORDING_FILE, timing: bool = PLANNER_REPLAY_TIMING,
+                 speed: float = PLANNER_REPLAY_SPEED):
+        """Load a recording file.
+
+        Args:
+            path: JSONL file written by RecordingModel
+            timing: Reproduce the recorded chunk timing with sleeps
+            speed: Timing multiplier (2.0 replays twice as fast)
+        """
+        self.path = path
+        self.timing = timing
+        self.speed = max(speed, 1e-6)
+        self._records: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursor: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self._records.setdefault(record["key"], []).append(record)
+        logger.info(f"Loaded {sum(len(r) for r in self._records.values())} planner recordings from {path}")
+
+    def _next_record(self, prompt: str) -> Dict[str, Any]:
+        key = prompt_key(prompt)
+        with self._lock:
+            records = self._records.get(key)
+            if not records:
+                raise ReplayMissError(f"no recording for prompt {key[:12]}")
+            # Repeated prompts cycle through their recordings in order
+            index = self._cursor.get(key, 0)
+            self._cursor[key] = index + 1
+            return records[index % len(records)]
+
+    def _sleep_until(self, started: float, offset_s: float) -> None:
+        if self.timing:
+            delay = started + offset_s / self.speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    def _replay(self, record: Dict[str, Any]) -> Iterator[FakeChunk]:
+        started = time.perf_counter()
+        for offset_s, text in record["chunks"]:
+            self._sleep_until(started, offset_s)
+            yield FakeChunk(text)
+        if record.get("error"):
+            self._sleep_until(started, record["total_s"])
+            raise RuntimeError(record["error"])
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs: Any):
+        """Return the recorded response for a prompt.
+
+        Raises:
+            ReplayMissError: If the prompt was never recorded
+        """
+        record = self._next_record(prompt)
+        if stream:
+            return self._replay(record)
+        return FakeChunk("".join(chunk.text for chunk in self._replay(record)))
+
+    def __len__(self) -> int:
+        return sum(len(records) for records in self._records.values())
+
+
+def requires_api_key(backend: str = PLANNER_MODEL_BACKEND) -> bool:
+    """Return True if the backend calls the real Gemini API."""
+    return backend == "gemini" or (backend == "record" and PLANNER_RECORD_BACKEND == "gemini")
+
+
+def create_model(backend: str, gemini_model: str) -> Any:
+    """Build the planning model for a backend name.
+
+    Args:
+        backend: One of BACKENDS
+        gemini_model: Gemini model name for the gemini backend
+
+    Returns:
+        Model exposing generate_content(prompt, stream=False)
+
+    Raises:
+        ValueError: If the backend is unknown
+    """
+    if backend == "gemini":
+        return genai.GenerativeModel(gemini_model)
+    if backend == "fake":
+        return FakeStreamingModel(
+            first_token_latency_s=PLANNER_FAKE_FIRST_TOKEN_S,
+            step_latency_s=PLANNER_FAKE_STEP_LATENCY_S,
+            extra_latency_s=PLANNER_FAKE_EXTRA_LATENCY_S,
+            error_rate=PLANNER_FAKE_ERROR_RATE
+        )
+    if backend == "record":
+        if PLANNER_RECORD_BACKEND not in ("gemini", "fake"):
+            raise ValueError(f"Unknown record backend: {PLANNER_RECORD_BACKEND}")
+        logger.info(f"Recording {PLANNER_RECORD_BACKEND} planner calls to {PLANNER_RECORDING_FILE}")
+        return RecordingModel(create_model(PLANNER_RECORD_BACKEND, gemini_model))
+    if backend == "replay":
+        return ReplayModel()
+    raise ValueError(f"Unknown planner model backend: {backend}")
@@ -1,6 +1,6 @@
 """Pydantic models for request validation and response serialization."""
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Literal
 
 
 class MissionIn(BaseModel):
@@ -10,6 +10,7 @@ class MissionIn(BaseModel):
     prompt: str = Field(..., description="Mission description/prompt")
     repo_path: str = Field(..., description="Local repository path")
     mac_id: Optional[str] = Field(default="mac-01", description="Assigned macOS client ID")
+    use_cache: bool = Field(default=True, description="Set to false to bypass the plan cache")
     
     model_config = ConfigDict(
         json_schema_extra={
@@ -17,7 +18,25 @@ class MissionIn(BaseModel):
                 "user": "alice",
                 "prompt": "Create a Next.js todo app",
                 "repo_path": "/Users/alice/Projects/todo",
-                "mac_id": "mac-01"
+                "mac_id": "mac-01",
+                "use_cache": True
+            }
+        }
+    )
+
+
+class MissionCloneIn(BaseModel):
+    """Request model for cloning a mission with its stored plan."""
+    
+    user: Optional[str] = Field(default=None, description="New owner (defaults to the source mission's)")
+    repo_path: Optional[str] = Field(default=None, description="New repository path; plan paths are rebased onto it")
+    mac_id: Optional[str] = Field(default=None, description="New macOS client ID (defaults to the source mission's)")
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "repo_path": "/Users/alice/Projects/todo-v2",
+                "mac_id": "mac-02"
             }
         }
     )
@@ -31,7 +50,7 @@ class MissionOut(BaseModel):
     prompt: str = Field(..., description="Mission description/prompt")
     repo_path: str = Field(..., description="Local repository path")
     mac_id: str = Field(..., description="Assigned macOS client ID")
-    status: str = Field(..., description="Mission status (pending, running, done, failed)")
+    status: str = Field(..., description="Mission status (planning, pending, running, done, failed)")
     plan: Dict[str, Any] = Field(..., description="Mission execution plan")
     
     model_config = ConfigDict(
@@ -56,12 +75,14 @@ class MissionCreateResponse(BaseModel):
     """Response model for mission creation."""
     
     mission_id: str = Field(..., description="The created mission identifier")
-    plan: Dict[str, Any] = Field(..., description="Mission execution plan")
+    status: str = Field(default="planning", description="Mission status (planning until the plan is ready)")
+    plan: Dict[str, Any] = Field(..., description="Mission execution plan (empty while planning)")
     
     model_config = ConfigDict(
         json_schema_extra={
             "example": {
                 "mission_id": "m-a1b2c3d4",
+                "status": "planning",
                 "plan": {
                     "mission_id": "m-a1b2c3d4",
                     "plan": []
@@ -81,3 +102,26 @@ class EventIn(BaseModel):
     stderr: Optional[str] = Field(default="", description="Standard error from step execution")
     screenshots: Optional[list] = Field(default=None, description="Base64 encoded screenshots")
     found_markers: Optional[list] = Field(default=None, description="Markers found in code")
+    action_timings: Optional[list] = Field(default=None, description="Per-action type, resource, duration_s, success and cached (result served from the client's result cache), in plan order")
+    output: Optional[dict] = Field(default=None, description="Per stream total bytes, whether stdout/stderr were truncated to head and tail, and the client's spill file")
+    idempotency_key: Optional[str] = Field(default=None, description="Client-generated key; resent events with the same key are stored once")
+
+
+class EventBatchIn(BaseModel):
+    """Request model for posting several events of a mission at once."""
+    
+    events: List[EventIn] = Field(..., min_length=1, description="Events in the order they happened")
+
+
+class LogChunkIn(BaseModel):
+    """One chunk of live command output."""
+    
+    seq: int = Field(..., ge=0, description="Chunk number within the step; resent chunks are stored once")
+    stream: Literal["stdout", "stderr"] = Field(..., description="Output stream")
+    data: str = Field(..., description="Output text")
+
+
+class LogChunkBatchIn(BaseModel):
+    """Request model for appending live output of a step."""
+    
+    chunks: List[LogChunkIn] = Field(..., min_length=1, description="Chunks in the order they were produced")
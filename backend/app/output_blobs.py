@@ -0,0 +1,74 @@
+"""Storage of full step output uploaded by mac-clients.
+
+Step events only carry the head and tail of a command's output. With
+``CAPTURE_SPILL`` enabled a client keeps the complete streams as gzip files
+and uploads them on demand; they are stored here as is, one file per
+mission, step and stream.
+"""
+import os
+import re
+from typing import AsyncIterator, Optional
+
+OUTPUT_BLOB_DIR = os.getenv(
+    "OUTPUT_BLOB_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "output_blobs")
+)
+OUTPUT_BLOB_MAX_BYTES = int(os.getenv("OUTPUT_BLOB_MAX_BYTES", str(256 * 1024 * 1024)))
+
+STREAMS = ("stdout", "stderr")
+
+# IDs become path components, so only plain names are accepted
+_SAFE_NAME = re.compile(r"[A-Za-z0-9_-][A-Za-z0-9._-]*")
+
+
+class BlobTooLargeError(Exception):
+    """Raised when an uploaded blob exceeds OUTPUT_BLOB_MAX_BYTES."""
+
+
+def blob_path(mission_id: str, step_id: str, stream: str) -> Optional[str]:
+    """Return the file of a step's output stream, or None if the names are invalid.
+    
+    Args:
+        mission_id: Mission identifier
+        step_id: Step identifier
+        stream: "stdout" or "stderr"
+        
+    Returns:
+        Path of the gzip file
+    """
+    if stream not in STREAMS or not _SAFE_NAME.fullmatch(mission_id) or not _SAFE_NAME.fullmatch(step_id):
+        return None
+    return os.path.join(OUTPUT_BLOB_DIR, mission_id, f"{step_id}.{stream}.gz")
+
+
+async def store_blob(path: str, chunks: AsyncIterator[bytes], max_bytes: int = OUTPUT_BLOB_MAX_BYTES) -> int:
+    """Write an uploaded body to path without holding it in memory.
+    
+    The body goes to a temporary file that replaces path once complete, so a
+    failed upload never leaves a partial blob behind.
+    
+    Args:
+        path: Destination file
+        chunks: Request body chunks
+        max_bytes: Size limit
+        
+    Returns:
+        Number of bytes stored
+        
+    Raises:
+        BlobTooLargeError: If the body is larger than max_bytes
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f"{path}.partial"
+    size = 0
+    try:
+        with open(partial, "wb") as f:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise BlobTooLargeError(f"output larger than {max_bytes} bytes")
+                f.write(chunk)
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return size
@@ -0,0 +1,267 @@
+"""Persistent plan cache stored in SQLite.
+
+Plans generated by the LLM are cached under a key derived from the
+normalized prompt, the repository path and the Gemini model. Entries expire
+after a TTL and the least recently used entries are evicted once the cache
+grows past its size limit.
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+from app.db import get_connection
+
+logger = logging.getLogger(__name__)
+
+# Cache configuration
+PLAN_CACHE_ENABLED = os.getenv("PLAN_CACHE_ENABLED", "true").lower() == "true"
+PLAN_CACHE_TTL_S = int(os.getenv("PLAN_CACHE_TTL_S", "86400"))
+PLAN_CACHE_MAX_ENTRIES = int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "1000"))
+
+_WHITESPACE = re.compile(r"\s+")
+_EDGE_PUNCTUATION = " \t\n.!?;:,"
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Normalize a prompt so trivially different spellings share a cache entry.
+
+    Args:
+        prompt: User's mission prompt
+
+    Returns:
+        Lowercased prompt with collapsed whitespace and no edge punctuation
+    """
+    return _WHITESPACE.sub(" ", prompt.lower()).strip(_EDGE_PUNCTUATION)
+
+
+def normalize_repo_path(repo_path: str) -> str:
+    """Normalize a repository path (collapse separators, drop trailing slash)."""
+    return os.path.normpath(repo_path.strip())
+
+
+def cache_key(prompt: str, repo_path: str, model: str) -> str:
+    """Build the cache key for a (prompt, repo_path, model) tuple."""
+    raw = json.dumps([normalize_prompt(prompt), normalize_repo_path(repo_path), model])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def restamp_plan(plan: Dict[str, Any], mission_id: str) -> Dict[str, Any]:
+    """Return a copy of a stored plan belonging to another mission."""
+    restamped = json.loads(json.dumps(plan))
+    restamped["mission_id"] = mission_id
+    return restamped
+
+
+class PlanCache:
+    """SQLite-backed plan cache with TTL and LRU eviction."""
+
+    def __init__(self, ttl_s: int = PLAN_CACHE_TTL_S, max_entries: int = PLAN_CACHE_MAX_ENTRIES,
+                 enabled: bool = PLAN_CACHE_ENABLED):
+        """Initialize the plan cache.
+
+        Args:
+            ttl_s: Seconds a cached plan stays valid
+            max_entries: Maximum number of cached plans
+            enabled: Whether the cache is consulted at all
+        """
+        self.ttl_s = ttl_s
+        self.max_entries = max(1, max_entries)
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._bypassed = 0
+        self._stores = 0
+        self._evictions = 0
+
+    def _count(self, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def record_bypass(self) -> None:
+        """Count a planner call that skipped the cache on request."""
+        self._count("_bypassed")
+
+    def get(self, mission_id: str, prompt: str, repo_path: str, model: str) -> Optional[Dict[str, Any]]:
+        """Look up a cached plan and re-stamp it for a new mission.
+
+        Args:
+            mission_id: Mission the plan is for
+            prompt: User's mission prompt
+            repo_path: Local repository path
+            model: Gemini model name
+
+        Returns:
+            Plan dictionary, or None on a miss
+        """
+        if not self.enabled:
+            return None
+
+        plan = self.get_by_key(cache_key(prompt, repo_path, model), mission_id)
+        self._count("_hits" if plan is not None else "_misses")
+        if plan is not None:
+            logger.info(f"Plan cache hit for mission {mission_id}")
+        return plan
+
+    def get_by_key(self, key: str, mission_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch a cached plan by key and re-stamp it, without counting a lookup.
+
+        Args:
+            key: Cache key
+            mission_id: Mission the plan is for
+
+        Returns:
+            Plan dictionary, or None if missing or expired
+        """
+        now = time.time()
+        try:
+            conn = get_connection()
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                SELECT plan_json, created_at
+                FROM plan_cache
+                WHERE key = ?
+            """, (key,))
+            row = cursor.fetchone()
+
+            if row is None or now - row["created_at"] > self.ttl_s:
+                if row is not None:
+                    cursor.execute("DELETE FROM plan_cache WHERE key = ?", (key,))
+                    conn.commit()
+                conn.close()
+                return None
+
+            cursor.execute("""
+                UPDATE plan_cache
+                SET last_used_at = ?, hits = hits + 1
+                WHERE key = ?
+            """, (now, key))
+            conn.commit()
+            conn.close()
+
+            return restamp_plan(json.loads(row["plan_json"]), mission_id)
+
+        except sqlite3.Error as e:
+            logger.error(f"Plan cache lookup failed: {e}")
+            return None
+
+    def recent_entries(self, model: str, limit: int) -> List[Dict[str, Any]]:
+        """List the most recently used entries for a model, oldest first.
+
+        Args:
+            model: Gemini model name
+            limit: Maximum number of entries
+
+        Returns:
+            List of dictionaries with key, prompt_norm and repo_path
+        """
+        try:
+            conn = get_connection()
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                SELECT key, prompt_norm, repo_path
+                FROM plan_cache
+                WHERE model = ? AND created_at >= ?
+                ORDER BY last_used_at DESC
+                LIMIT ?
+            """, (model, time.time() - self.ttl_s, limit))
+
+            rows = cursor.fetchall()
+            conn.close()
+            return [dict(row) for row in reversed(rows)]
+
+        except sqlite3.Error as e:
+            logger.error(f"Failed to list plan cache entries: {e}")
+            return []
+
+    def put(self, prompt: str, repo_path: str, model: str, plan: Dict[str, Any]) -> Optional[str]:
+        """Store a generated plan and evict least recently used entries.
+
+        Args:
+            prompt: User's mission prompt
+            repo_path: Local repository path
+            model: Gemini model name
+            plan: Validated plan to cache
+
+        Returns:
+            The cache key the plan was stored under, or None if not stored
+        """
+        if not self.enabled:
+            return None
+
+        key = cache_key(prompt, repo_path, model)
+        now = time.time()
+        try:
+            conn = get_connection()
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                INSERT OR REPLACE INTO plan_cache
+                    (key, prompt_norm, repo_path, model, plan_json, created_at, last_used_at, hits)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 0)
+            """, (
+                key,
+                normalize_prompt(prompt),
+                normalize_repo_path(repo_path),
+                model,
+                json.dumps(plan),
+                now,
+                now
+            ))
+
+            cursor.execute("SELECT COUNT(*) FROM plan_cache")
+            overflow = cursor.fetchone()[0] - self.max_entries
+            if overflow > 0:
+                cursor.execute("""
+                    DELETE FROM plan_cache
+                    WHERE key IN (
+                        SELECT key FROM plan_cache ORDER BY last_used_at ASC LIMIT ?
+                    )
+                """, (overflow,))
+                self._count("_evictions", overflow)
+
+            conn.commit()
+            conn.close()
+            self._count("_stores")
+            return key
+
+        except sqlite3.Error as e:
+            logger.error(f"Plan cache store failed: {e}")
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit rate and size statistics."""
+        entries = 0
+        try:
+            conn = get_connection()
+            entries = conn.execute("SELECT COUNT(*) FROM plan_cache").fetchone()[0]
+            conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Plan cache stats failed: {e}")
+
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "ttl_s": self.ttl_s,
+                "max_entries": self.max_entries,
+                "entries": entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "bypassed": self._bypassed,
+                "stores": self._stores,
+                "evictions": self._evictions,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+# Shared cache used by the planner
+plan_cache = PlanCache()
@@ -0,0 +1,385 @@
+"""Best-effort repair of malformed or truncated plan JSON from the LLM.
+
+``repair_plan`` turns an almost-correct model response into a plan that
+passes validation instead of discarding it. It handles prose around the
+JSON, trailing commas, unbalanced or truncated brackets (keeping only the
+steps that were complete), missing step IDs and markers, unknown action
+types that are close to a known one, and action dependencies (``id`` /
+``depends_on``) that reference unknown actions or form a cycle. Every applied fix is reported so
+callers can decide whether the result is trustworthy enough to cache.
+"""
+import re
+import json
+import difflib
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from app.plan_stream import IncrementalPlanParser, strip_code_fences
+
+logger = logging.getLogger(__name__)
+
+# Action types understood by the macOS client
+KNOWN_ACTION_TYPES = (
+    "open_app", "open_project", "screenshot", "run_command", "prompt_kiro_ai",
+    "wait_for_marker", "apply_patch", "wait_for_file", "wait_for_kiro_completion",
+)
+
+# Common model spellings that string similarity alone would not map
+ACTION_ALIASES = {
+    "shell": "run_command",
+    "exec": "run_command",
+    "execute": "run_command",
+    "command": "run_command",
+    "run": "run_command",
+    "run_tests": "run_command",
+    "terminal": "run_command",
+    "prompt": "prompt_kiro_ai",
+    "ask_kiro": "prompt_kiro_ai",
+    "kiro_prompt": "prompt_kiro_ai",
+    "prompt_kiro": "prompt_kiro_ai",
+    "launch_app": "open_app",
+    "launch": "open_app",
+    "open_application": "open_app",
+    "open_repo": "open_project",
+    "open_folder": "open_project",
+    "open_repository": "open_project",
+    "take_screenshot": "screenshot",
+    "capture_screen": "screenshot",
+    "wait_for_completion": "wait_for_kiro_completion",
+    "patch": "apply_patch",
+    "edit_file": "apply_patch",
+}
+
+# Alternative field names for an action's main argument
+FIELD_ALIASES = {
+    "run_command": ("cmd", ("command", "shell", "script")),
+    "prompt_kiro_ai": ("prompt", ("text", "message", "instruction")),
+    "open_project": ("path", ("repo_path", "project", "directory")),
+    "open_app": ("app", ("name", "application")),
+}
+
+# Fields the model sometimes uses instead of "plan"
+_PLAN_KEYS = ("plan", "steps")
+
+# Fix labels that mean part of the response was lost
+LOSSY_FIXES = {"truncated", "unbalanced", "dropped_steps", "dropped_actions"}
+
+
+def _remove_trailing_commas(text: str) -> str:
+    """Drop commas directly before a closing bracket, outside strings."""
+    out = []
+    in_string = False
+    escape = False
+    pending_comma = None
+    for ch in text:
+        if in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if pending_comma is not None:
+            if ch.isspace():
+                pending_comma.append(ch)
+                continue
+            if ch not in "}]":
+                out.append(",")
+            out.extend(pending_comma[1:])
+            pending_comma = None
+        if ch == ",":
+            pending_comma = [","]
+            continue
+        if ch == '"':
+            in_string = True
+        out.append(ch)
+    return "".join(out)
+
+
+def _extract_document(text: str, fixes: List[str]) -> Optional[Any]:
+    """Decode the first JSON document in a response, ignoring surrounding prose."""
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    if not starts:
+        return None
+    start = min(starts)
+    if start > 0:
+        fixes.append("leading_prose")
+    body = text[start:]
+
+    decoder = json.JSONDecoder()
+    for candidate, fix in ((body, None), (_remove_trailing_commas(body), "trailing_commas")):
+        if fix and candidate == body:
+            continue
+        try:
+            document, end = decoder.raw_decode(candidate)
+        except json.JSONDecodeError:
+            continue
+        if fix:
+            fixes.append(fix)
+        if candidate[end:].strip():
+            fixes.append("trailing_prose")
+        return document
+    return None
+
+
+def _salvage_steps(text: str, fixes: List[str]) -> List[Any]:
+    """Collect the complete step objects of a truncated or unbalanced plan."""
+    parser = IncrementalPlanParser()
+    steps = parser.feed(_remove_trailing_commas(text))
+    if steps:
+        fixes.append("unbalanced" if parser.complete else "truncated")
+    return steps
+
+
+def _map_action_type(action_type: str) -> Optional[str]:
+    normalized = re.sub(r"[^a-z0-9]+", "_", action_type.lower()).strip("_")
+    if normalized in KNOWN_ACTION_TYPES:
+        return normalized
+    if normalized in ACTION_ALIASES:
+        return ACTION_ALIASES[normalized]
+    close = difflib.get_close_matches(normalized, KNOWN_ACTION_TYPES, n=1, cutoff=0.6)
+    return close[0] if close else None
+
+
+def _repair_action(raw: Any, fixes: List[str]) -> Optional[Dict[str, Any]]:
+    """Return the action with a known type and canonical fields, or None."""
+    if isinstance(raw, str):
+        raw = {"type": raw}
+    if not isinstance(raw, dict):
+        return None
+    action = dict(raw)
+    if "type" not in action and isinstance(action.get("action"), str):
+        action["type"] = action.pop("action")
+        fixes.append("action_field")
+    if not isinstance(action.get("type"), str):
+        return None
+
+    mapped = _map_action_type(action["type"])
+    if mapped is None:
+        return None
+    if mapped != action["type"]:
+        logger.info(f"Mapped unknown action type {action['type']!r} to {mapped!r}")
+        fixes.append("action_type")
+        action["type"] = mapped
+
+    field_spec = FIELD_ALIASES.get(mapped)
+    if field_spec is not None and field_spec[0] not in action:
+        field, aliases = field_spec
+        for alias in aliases:
+            if alias in action:
+                action[field] = action.pop(alias)
+                fixes.append("action_field")
+                break
+    return action
+
+
+def _repair_dependencies(actions: List[Dict[str, Any]], fixes: List[str]) -> None:
+    """Make action IDs unique and drop dependencies the client cannot honour.
+
+    Unknown and self references are removed. If IDs are ambiguous or the
+    dependencies form a cycle, all of them are dropped and the step runs its
+    actions in order.
+    """
+    if not any("depends_on" in action for action in actions):
+        return
+
+    ids = [action.get("id") for action in actions]
+    known = [str(i) for i in ids if i is not None]
+    if len(set(known)) != len(known):
+        for action in actions:
+            action.pop("depends_on", None)
+        fixes.append("dependencies")
+        return
+
+    index = {str(action_id): i for i, action_id in enumerate(ids) if action_id is not None}
+    graph: List[List[int]] = []
+    for i, action in enumerate(actions):
+        if "depends_on" not in action:
+            graph.append([])
+            continue
+        wanted = action["depends_on"]
+        if isinstance(wanted, str):
+            wanted = [wanted]
+        if not isinstance(wanted, list):
+            wanted = []
+        kept = [ref for ref in wanted if isinstance(ref, (str, int)) and index.get(str(ref), i) != i]
+        if kept != action.get("depends_on"):
+            fixes.append("dependencies")
+            action["depends_on"] = kept
+        graph.append([index[str(ref)] for ref in kept])
+
+    # Depth-first search for a cycle (0 = unvisited, 1 = on the path, 2 = done)
+    state = [0] * len(actions)
+
+    def has_cycle(i: int) -> bool:
+        state[i] = 1
+        for j in graph[i]:
+            if state[j] == 1 or (state[j] == 0 and has_cycle(j)):
+                return True
+        state[i] = 2
+        return False
+
+    if any(state[i] == 0 and has_cycle(i) for i in range(len(actions))):
+        logger.info("Dropping cyclic action dependencies")
+        for action in actions:
+            action.pop("depends_on", None)
+        fixes.append("dependencies")
+
+
+def repair_step(raw: Any, fixes: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+    """Map a step's actions to known types and fill in a missing title.
+
+    Args:
+        raw: Step object from the model
+        fixes: Optional list that receives the labels of applied fixes
+
+    Returns:
+        Repaired copy of the step, or None if it has no usable action
+    """
+    fixes = fixes if fixes is not None else []
+    if not isinstance(raw, dict):
+        fixes.append("dropped_steps")
+        return None
+    raw_actions = raw.get("actions", [])
+    if isinstance(raw_actions, dict):
+        raw_actions = [raw_actions]
+    if not isinstance(raw_actions, list):
+        raw_actions = []
+
+    actions = []
+    for raw_action in raw_actions:
+        action = _repair_action(raw_action, fixes)
+        if action is None:
+            fixes.append("dropped_actions")
+            continue
+        actions.append(action)
+    if not actions:
+        fixes.append("dropped_steps")
+        return None
+
+    _repair_dependencies(actions, fixes)
+
+    step = dict(raw)
+    step["actions"] = actions
+    if not isinstance(step.get("title"), str) or not step["title"].strip():
+        fallback = step.get("name") or step.get("description")
+        step["title"] = fallback if isinstance(fallback, str) and fallback else \
+            actions[0]["type"].replace("_", " ").capitalize()
+        fixes.append("title")
+    return step
+
+
+def _repair_steps(raw_steps: List[Any], fixes: List[str]) -> List[Dict[str, Any]]:
+    steps = [step for step in (repair_step(raw, fixes) for raw in raw_steps) if step is not None]
+
+    step_ids = [step.get("step_id") for step in steps]
+    if any(not isinstance(s, str) or not s for s in step_ids) or len(set(step_ids)) != len(step_ids):
+        for i, step in enumerate(steps, start=1):
+            step["step_id"] = f"s-{i}"
+        fixes.append("step_ids")
+
+    markers = [step.get("expect_marker") for step in steps]
+    if any(not isinstance(m, str) or not m for m in markers) or len(set(markers)) != len(markers):
+        for i, step in enumerate(steps, start=1):
+            step["expect_marker"] = f"C-{1000 + i}"
+        fixes.append("expect_markers")
+    return steps
+
+
+def repair_plan(text: str, mission_id: str) -> Optional[Tuple[Dict[str, Any], List[str]]]:
+    """Recover a plan from a malformed model response.
+
+    Args:
+        text: Raw model response
+        mission_id: Mission ID to stamp on the repaired plan
+
+    Returns:
+        Tuple of (plan, fixes) where fixes lists the repairs applied, or
+        None if no usable step could be recovered
+    """
+    fixes: List[str] = []
+    text = strip_code_fences(text)
+    document = _extract_document(text, fixes)
+
+    raw_steps = None
+    if isinstance(document, list):
+        raw_steps = document
+        fixes.append("bare_array")
+    elif isinstance(document, dict):
+        for key in _PLAN_KEYS:
+            if isinstance(document.get(key), list):
+                raw_steps = document[key]
+                if key != "plan":
+                    fixes.append("plan_key")
+                break
+
+    if not raw_steps:
+        fixes = [fix for fix in fixes if fix != "trailing_prose"]
+        raw_steps = _salvage_steps(text, fixes)
+        if not raw_steps:
+            repair_stats.record(None)
+            return None
+
+    steps = _repair_steps(raw_steps, fixes)
+    if not steps:
+        repair_stats.record(None)
+        return None
+
+    fixes = sorted(set(fixes))
+    repair_stats.record(fixes)
+    return {"mission_id": mission_id, "plan": steps}, fixes
+
+
+def normalize_plan(plan: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    """Repair the steps of a plan that parsed as valid JSON.
+
+    Args:
+        plan: Decoded plan with a "plan" list
+
+    Returns:
+        Tuple of (plan, fixes); the plan may be left with no steps
+    """
+    fixes: List[str] = []
+    steps = _repair_steps(plan["plan"], fixes)
+    fixes = sorted(set(fixes))
+    if fixes:
+        repair_stats.record(fixes if steps else None)
+    return {**plan, "plan": steps}, fixes
+
+
+def is_lossy(fixes: List[str]) -> bool:
+    """Return True if a repair dropped part of the response."""
+    return any(fix in LOSSY_FIXES for fix in fixes)
+
+
+class RepairStats:
+    """Counts repair attempts, successes and applied fixes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._attempts = 0
+        self._repaired = 0
+        self._by_fix: Dict[str, int] = {}
+
+    def record(self, fixes: Optional[List[str]]) -> None:
+        with self._lock:
+            self._attempts += 1
+            if fixes is None:
+                return
+            self._repaired += 1
+            for fix in fixes:
+                self._by_fix[fix] = self._by_fix.get(fix, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return repair counters."""
+        with self._lock:
+            return {
+                "attempts": self._attempts,
+                "repaired": self._repaired,
+                "by_fix": dict(self._by_fix),
+            }
+
+
+repair_stats = RepairStats()
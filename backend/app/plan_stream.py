@@ -0,0 +1,116 @@
+"""Incremental parser for streamed plan JSON.
+
+The planner streams the model response in arbitrary text chunks. The parser
+scans the text once, tracking string/escape state and bracket depth, and
+hands back every element of the top-level ``plan`` array as soon as its
+closing brace arrives - long before the whole document is complete.
+"""
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def strip_code_fences(text: str) -> str:
+    """Remove a surrounding markdown code block from a model response."""
+    text = text.strip()
+    if text.startswith("```json"):
+        text = text[7:]
+    if text.startswith("```"):
+        text = text[3:]
+    if text.endswith("```"):
+        text = text[:-3]
+    return text.strip()
+
+
+class IncrementalPlanParser:
+    """Extracts complete step objects from a partially received plan."""
+
+    def __init__(self):
+        self.text = ""
+        self._pos = 0
+        self._started = False
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        self._key: Optional[str] = None
+        self._plan_depth: Optional[int] = None
+        self._step_start: Optional[int] = None
+        self.complete = False
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Consume a chunk of response text.
+
+        Args:
+            chunk: Next piece of the model response
+
+        Returns:
+            Step dictionaries whose JSON object closed within this chunk
+        """
+        self.text += chunk
+        steps = []
+        text = self.text
+
+        while self._pos < len(text) and not self.complete:
+            ch = text[self._pos]
+
+            if not self._started:
+                # Skip code fences or prose before the document
+                if ch == "{":
+                    self._started = True
+                    self._stack.append("{")
+                self._pos += 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1:
+                        self._last_string = text[self._string_start + 1:self._pos]
+                self._pos += 1
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = self._pos
+            elif ch == ":" and len(self._stack) == 1:
+                self._key = self._last_string
+            elif ch == "," and len(self._stack) == 1:
+                self._key = None
+            elif ch in "{[":
+                self._stack.append(ch)
+                depth = len(self._stack)
+                if ch == "[" and depth == 2 and self._key == "plan":
+                    self._plan_depth = depth
+                elif ch == "{" and self._plan_depth is not None and depth == self._plan_depth + 1:
+                    self._step_start = self._pos
+            elif ch in "}]":
+                depth = len(self._stack)
+                if ch == "}" and self._step_start is not None and depth == self._plan_depth + 1:
+                    step = self._decode_step(text[self._step_start:self._pos + 1])
+                    if step is not None:
+                        steps.append(step)
+                    self._step_start = None
+                elif ch == "]" and depth == self._plan_depth:
+                    self._plan_depth = None
+                self._stack.pop()
+                if not self._stack:
+                    self.complete = True
+            self._pos += 1
+
+        return steps
+
+    def _decode_step(self, fragment: str) -> Optional[Dict[str, Any]]:
+        try:
+            step = json.loads(fragment)
+        except json.JSONDecodeError as e:
+            logger.warning(f"Skipping undecodable streamed step: {e}")
+            return None
+        return step if isinstance(step, dict) else None
@@ -0,0 +1,272 @@
+"""Rule-based plan templates used before asking the LLM.
+
+Templates are JSON files in ``PLAN_TEMPLATES_DIR``. Each one lists regex
+patterns whose named groups fill slots, and the steps of the plan with
+``{slot}`` placeholders in string values. A template matches when one of its
+patterns covers (almost) the whole prompt, so only prompts of a well-known
+shape skip the model. The directory is re-scanned when its files change.
+
+Example template::
+
+    {
+      "name": "run_tests",
+      "priority": 10,
+      "patterns": ["^run (?:the )?tests(?: with (?P<cmd>.+))?$"],
+      "slots": {"cmd": {"default": "npm test"}},
+      "steps": [
+        {"step_id": "s-1", "title": "Run tests",
+         "actions": [{"type": "run_command", "cmd": "{cmd}"}],
+         "expect_marker": "C-1001"}
+      ]
+    }
+
+``{repo_path}`` is always available as a slot. Slots declared with
+``"type": "list"`` are split on commas and "and"; a string value that is
+exactly ``"{slot}"`` is replaced by the list itself.
+"""
+import os
+import re
+import json
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Template engine configuration
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLAN_TEMPLATES_ENABLED = os.getenv("PLAN_TEMPLATES_ENABLED", "true").lower() == "true"
+PLAN_TEMPLATES_DIR = os.getenv("PLAN_TEMPLATES_DIR", os.path.join(BACKEND_DIR, "plan_templates"))
+PLAN_TEMPLATES_MIN_CONFIDENCE = float(os.getenv("PLAN_TEMPLATES_MIN_CONFIDENCE", "0.9"))
+# Minimum seconds between checks of the template directory for changes
+PLAN_TEMPLATES_RELOAD_S = float(os.getenv("PLAN_TEMPLATES_RELOAD_S", "2"))
+
+_WHITESPACE = re.compile(r"\s+")
+_PLACEHOLDER = re.compile(r"\{(\w+)\}")
+_LIST_SEPARATOR = re.compile(r"\s*(?:,|\band\b)\s*")
+_EDGE_PUNCTUATION = " .!?;:,"
+
+
+class PlanTemplate:
+    """A declarative plan template with precompiled patterns."""
+
+    def __init__(self, spec: Dict[str, Any], source: str):
+        """Build a template from its JSON definition.
+
+        Args:
+            spec: Parsed template file
+            source: File the template was loaded from
+
+        Raises:
+            ValueError: If the definition is incomplete or a pattern is invalid
+        """
+        if not spec.get("name") or not spec.get("patterns") or not spec.get("steps"):
+            raise ValueError("template needs name, patterns and steps")
+
+        self.name: str = spec["name"]
+        self.source = source
+        self.priority: int = int(spec.get("priority", 0))
+        self.slots: Dict[str, Dict[str, Any]] = spec.get("slots", {})
+        self.steps: List[Dict[str, Any]] = spec["steps"]
+        try:
+            self.patterns = [re.compile(p, re.IGNORECASE) for p in spec["patterns"]]
+        except re.error as e:
+            raise ValueError(f"invalid pattern: {e}")
+
+    def match(self, prompt: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+        """Match a cleaned prompt against the template's patterns.
+
+        Args:
+            prompt: Prompt with collapsed whitespace and no edge punctuation
+
+        Returns:
+            Tuple of (confidence, slot values) for the best pattern, or None.
+            Confidence is the fraction of the prompt covered by the match.
+        """
+        best = None
+        for pattern in self.patterns:
+            found = pattern.search(prompt)
+            if not found:
+                continue
+            confidence = (found.end() - found.start()) / max(1, len(prompt))
+            if best is None or confidence > best[0]:
+                best = (confidence, found.groupdict())
+        if best is None:
+            return None
+
+        confidence, groups = best
+        values: Dict[str, Any] = {}
+        for slot, slot_spec in self.slots.items():
+            value = groups.get(slot)
+            if value is None:
+                value = slot_spec.get("default")
+            elif slot_spec.get("type") == "list":
+                value = [item for item in _LIST_SEPARATOR.split(value.strip()) if item]
+            else:
+                value = value.strip()
+            if value is None:
+                return None
+            values[slot] = value
+        return confidence, values
+
+    def render(self, mission_id: str, repo_path: str, values: Dict[str, Any]) -> Dict[str, Any]:
+        """Fill the template's steps with slot values."""
+        values = {**values, "repo_path": repo_path}
+
+        def fill(node: Any) -> Any:
+            if isinstance(node, dict):
+                return {k: fill(v) for k, v in node.items()}
+            if isinstance(node, list):
+                return [fill(v) for v in node]
+            if isinstance(node, str):
+                whole = _PLACEHOLDER.fullmatch(node)
+                if whole and whole.group(1) in values:
+                    return values[whole.group(1)]
+                return _PLACEHOLDER.sub(lambda m: str(values.get(m.group(1), m.group(0))), node)
+            return node
+
+        return {"mission_id": mission_id, "plan": fill(self.steps)}
+
+
+class TemplateEngine:
+    """Loads templates from a directory and matches prompts against them."""
+
+    def __init__(self, directory: str = PLAN_TEMPLATES_DIR,
+                 min_confidence: float = PLAN_TEMPLATES_MIN_CONFIDENCE,
+                 reload_interval_s: float = PLAN_TEMPLATES_RELOAD_S,
+                 enabled: bool = PLAN_TEMPLATES_ENABLED):
+        """Initialize the engine.
+
+        Args:
+            directory: Directory containing *.json template files
+            min_confidence: Minimum prompt coverage for a template match
+            reload_interval_s: Minimum seconds between directory checks
+            enabled: Whether templates are consulted at all
+        """
+        self.directory = directory
+        self.min_confidence = min_confidence
+        self.reload_interval_s = reload_interval_s
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._templates: List[PlanTemplate] = []
+        self._signature: Optional[Tuple] = None
+        self._checked_at = 0.0
+
+        self._lookups = 0
+        self._matches = 0
+        self._match_time_s = 0.0
+        self._by_template: Dict[str, int] = {}
+        self._reloads = 0
+
+    def _dir_signature(self) -> Tuple:
+        try:
+            names = sorted(n for n in os.listdir(self.directory) if n.endswith(".json"))
+        except FileNotFoundError:
+            return ()
+        signature = []
+        for name in names:
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            signature.append((name, stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def _load(self, signature: Tuple) -> List[PlanTemplate]:
+        templates = []
+        for name, _, _ in signature:
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    templates.append(PlanTemplate(json.load(f), path))
+            except Exception as e:
+                logger.error(f"Skipping plan template {path}: {e}")
+        templates.sort(key=lambda t: -t.priority)
+        return templates
+
+    def reload_if_changed(self, force: bool = False) -> None:
+        """Reload the templates if files in the directory changed."""
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._checked_at < self.reload_interval_s:
+                return
+            self._checked_at = now
+            signature = self._dir_signature()
+            if signature == self._signature and not force:
+                return
+            self._templates = self._load(signature)
+            self._signature = signature
+            self._reloads += 1
+        logger.info(f"Loaded {len(self._templates)} plan templates from {self.directory}")
+
+    def match(self, mission_id: str, prompt: str, repo_path: str,
+              validate: Optional[Callable[[Dict[str, Any]], bool]] = None
+              ) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Build a plan from the best matching template.
+
+        Args:
+            mission_id: Mission identifier
+            prompt: User's mission description
+            repo_path: Local repository path
+            validate: Optional plan validator; rendered plans it rejects
+                do not count as matches
+
+        Returns:
+            Tuple of (template name, plan), or None if no template matches
+            with enough confidence
+        """
+        if not self.enabled:
+            return None
+
+        self.reload_if_changed()
+        started = time.perf_counter()
+        cleaned = _WHITESPACE.sub(" ", prompt).strip(_EDGE_PUNCTUATION)
+
+        best = None
+        with self._lock:
+            templates = self._templates
+        for template in templates:
+            found = template.match(cleaned)
+            if found is None or found[0] < self.min_confidence:
+                continue
+            # Templates are sorted by priority, so the first of equal confidence wins
+            if best is None or found[0] > best[1]:
+                best = (template, found[0], found[1])
+
+        result = None
+        if best is not None:
+            template, _, values = best
+            plan = template.render(mission_id, repo_path, values)
+            if validate is None or validate(plan):
+                result = (template.name, plan)
+            else:
+                logger.warning(f"Plan template {template.name} rendered an invalid plan")
+
+        with self._lock:
+            self._lookups += 1
+            self._match_time_s += time.perf_counter() - started
+            if result is not None:
+                self._matches += 1
+                self._by_template[result[0]] = self._by_template.get(result[0], 0) + 1
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Return template counts and match statistics."""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "directory": self.directory,
+                "templates": [t.name for t in self._templates],
+                "reloads": self._reloads,
+                "lookups": self._lookups,
+                "matches": self._matches,
+                "match_rate": round(self._matches / self._lookups, 3) if self._lookups else 0.0,
+                "by_template": dict(self._by_template),
+                "avg_match_us": round(self._match_time_s / self._lookups * 1e6, 1) if self._lookups else 0.0,
+            }
+
+
+# Shared engine used by the planner
+template_engine = TemplateEngine()
@@ -0,0 +1,148 @@
+"""Per-call accounting of planner cost and latency.
+
+Every ``plan_from_prompt`` call produces one ``planner_calls`` row recording
+where the plan came from (template, cache, similar prompt, model, shared
+in-flight generation or fallback), the prompt and response sizes, token
+counts reported by the model, wall time and the number of extra model
+requests (hedges and individual retries after a batch).
+"""
+import os
+import time
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+from app.db import create_planner_call, get_planner_calls
+
+logger = logging.getLogger(__name__)
+
+# Calls summarized by default: the last day (the created_at index keeps this cheap)
+PLANNER_CALLS_WINDOW_S = float(os.getenv("PLANNER_CALLS_WINDOW_S", "86400"))
+
+# Where a plan came from
+SOURCE_TEMPLATE = "template"
+SOURCE_CACHE = "cache"
+SOURCE_SIMILAR = "similar"
+SOURCE_MODEL = "model"
+SOURCE_SHARED = "shared"
+SOURCE_FALLBACK = "fallback"
+
+
+class PlannerCall:
+    """Accumulates the accounting data of one planner call."""
+
+    def __init__(self, mission_id: str, backend: str, model: str):
+        self.mission_id = mission_id
+        self.backend = backend
+        self.model = model
+        self.prompt_chars = 0
+        self.response_chars = 0
+        self.prompt_tokens: Optional[int] = None
+        self.response_tokens: Optional[int] = None
+        self.requests = 0
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def record_request(self, prompt_chars: int) -> None:
+        """Count a model request (attempts may run concurrently when hedging)."""
+        with self._lock:
+            self.requests += 1
+            self.prompt_chars += prompt_chars
+
+    def record_response(self, response_chars: int, usage: Any = None, share: float = 1.0) -> None:
+        """Add response size and token usage.
+
+        Args:
+            response_chars: Characters of response text received
+            usage: Model usage metadata (prompt_token_count and
+                candidates_token_count), if the backend reports it
+            share: Fraction of the usage attributed to this call (batches)
+        """
+        with self._lock:
+            self.response_chars += response_chars
+            prompt_tokens = getattr(usage, "prompt_token_count", None)
+            response_tokens = getattr(usage, "candidates_token_count", None)
+            if prompt_tokens is not None:
+                self.prompt_tokens = (self.prompt_tokens or 0) + round(prompt_tokens * share)
+            if response_tokens is not None:
+                self.response_tokens = (self.response_tokens or 0) + round(response_tokens * share)
+
+    def finish(self, source: str, complete: bool = True, error: Optional[str] = None) -> None:
+        """Store the call record; accounting failures never break planning.
+
+        Args:
+            source: Where the plan came from (one of the SOURCE_* constants)
+            complete: Whether the plan is complete (False for partial plans)
+            error: Why a fallback was used, if it was
+        """
+        wall_ms = (time.perf_counter() - self._started) * 1000
+        try:
+            create_planner_call({
+                "mission_id": self.mission_id,
+                "source": source,
+                "backend": self.backend,
+                "model": self.model,
+                "prompt_chars": self.prompt_chars,
+                "response_chars": self.response_chars,
+                "prompt_tokens": self.prompt_tokens,
+                "response_tokens": self.response_tokens,
+                "wall_ms": round(wall_ms, 2),
+                "retries": max(0, self.requests - 1),
+                "complete": 1 if complete else 0,
+                "error": error,
+                "created_at": time.time(),
+            })
+        except Exception as e:
+            logger.error(f"Failed to record planner call for mission {self.mission_id}: {e}")
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct))], 2)
+
+
+def _latency(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    wall = [row["wall_ms"] for row in rows]
+    return {
+        "p50_ms": _percentile(wall, 0.50),
+        "p95_ms": _percentile(wall, 0.95),
+        "p99_ms": _percentile(wall, 0.99),
+        "max_ms": round(max(wall), 2) if wall else None,
+    }
+
+
+def summarize_planner_calls(since: Optional[float] = None) -> Dict[str, Any]:
+    """Summarize planner calls with latency percentiles per source.
+
+    Args:
+        since: Only include calls created at or after this Unix timestamp
+
+    Returns:
+        Totals, latency percentiles and per-source breakdown
+    """
+    rows = get_planner_calls(since=since)
+    model_rows = [row for row in rows if row["prompt_chars"]]
+
+    def total(field: str) -> Optional[int]:
+        values = [row[field] for row in rows if row[field] is not None]
+        return sum(values) if values else None
+
+    by_source: Dict[str, Any] = {}
+    for source in sorted({row["source"] for row in rows}):
+        source_rows = [row for row in rows if row["source"] == source]
+        by_source[source] = {"calls": len(source_rows), **_latency(source_rows)}
+
+    return {
+        "calls": len(rows),
+        "model_calls": len(model_rows),
+        "retries": sum(row["retries"] for row in rows),
+        "incomplete": sum(1 for row in rows if not row["complete"]),
+        "prompt_chars": total("prompt_chars") or 0,
+        "response_chars": total("response_chars") or 0,
+        "prompt_tokens": total("prompt_tokens"),
+        "response_tokens": total("response_tokens"),
+        "avg_prompt_chars": round(sum(r["prompt_chars"] for r in model_rows) / len(model_rows)) if model_rows else 0,
+        "latency": _latency(rows),
+        "by_source": by_source,
+    }
@@ -0,0 +1,312 @@
+"""Latency budget, hedged requests and circuit breaking for planner calls.
+
+``run_hedged`` runs a planner attempt on a worker thread with a hard
+deadline and, optionally, launches a second (hedged) attempt when the first
+is slower than the recent p95. ``CircuitBreaker`` short-circuits planning
+while the upstream error rate is high and probes for recovery in the
+background.
+"""
+import os
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Latency budget configuration
+PLANNER_TIMEOUT_S = float(os.getenv("PLANNER_TIMEOUT_S", "30"))
+PLANNER_HEDGE_ENABLED = os.getenv("PLANNER_HEDGE_ENABLED", "false").lower() == "true"
+# Fixed hedge delay; when unset the p95 of recent successful calls is used
+PLANNER_HEDGE_AFTER_S = os.getenv("PLANNER_HEDGE_AFTER_S")
+PLANNER_HEDGE_MIN_SAMPLES = 20
+PLANNER_ATTEMPT_THREADS = int(os.getenv("PLANNER_ATTEMPT_THREADS", "8"))
+
+# Circuit breaker configuration
+CIRCUIT_WINDOW = int(os.getenv("PLANNER_CIRCUIT_WINDOW", "20"))
+CIRCUIT_MIN_CALLS = int(os.getenv("PLANNER_CIRCUIT_MIN_CALLS", "5"))
+CIRCUIT_FAILURE_RATE = float(os.getenv("PLANNER_CIRCUIT_FAILURE_RATE", "0.5"))
+CIRCUIT_COOLDOWN_S = float(os.getenv("PLANNER_CIRCUIT_COOLDOWN_S", "30"))
+
+
+class PlannerTimeoutError(Exception):
+    """Raised when a planner call exceeds its latency budget."""
+
+
+class CircuitOpenError(Exception):
+    """Raised when the circuit breaker rejects a planner call."""
+
+
+class LatencyTracker:
+    """Keeps recent successful call latencies to derive the hedge delay."""
+
+    def __init__(self, window: int = 200):
+        self._lock = threading.Lock()
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def p95(self) -> Optional[float]:
+        """Return the p95 latency, or None with too few samples."""
+        with self._lock:
+            if len(self._samples) < PLANNER_HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+    def mean(self) -> Optional[float]:
+        """Return the mean latency, or None without samples."""
+        with self._lock:
+            if not self._samples:
+                return None
+            return sum(self._samples) / len(self._samples)
+
+
+class _Race:
+    """Decides which attempt owns the streamed output."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.owner: Optional[int] = None
+        self.closed = False
+
+    def claim(self, index: int) -> bool:
+        """Claim output ownership; True if index owns (or now owns) it."""
+        with self._lock:
+            if self.closed:
+                return False
+            if self.owner is None:
+                self.owner = index
+            return self.owner == index
+
+    def close(self) -> None:
+        """Stop every attempt, including the owner, from emitting output."""
+        with self._lock:
+            self.closed = True
+
+
+class BudgetStats:
+    """Counters for timeouts and hedged requests."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.timeouts = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def count(self, counter: str) -> None:
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+_executor = ThreadPoolExecutor(max_workers=PLANNER_ATTEMPT_THREADS, thread_name_prefix="planner-attempt")
+latency_tracker = LatencyTracker()
+budget_stats = BudgetStats()
+
+
+def request_options(timeout: float = PLANNER_TIMEOUT_S) -> Dict[str, Any]:
+    """Return generate_content request options ending the model call itself at timeout.
+
+    run_hedged only stops waiting for an attempt; without a request deadline a
+    hung call would keep its attempt thread forever.
+    """
+    return {"timeout": timeout}
+
+
+def hedge_delay() -> Optional[float]:
+    """Return the delay after which a hedged attempt is launched, if any."""
+    if not PLANNER_HEDGE_ENABLED:
+        return None
+    if PLANNER_HEDGE_AFTER_S:
+        return float(PLANNER_HEDGE_AFTER_S)
+    return latency_tracker.p95()
+
+
+def run_hedged(attempt: Callable[[int, Callable[[], bool]], Any],
+               timeout: float = PLANNER_TIMEOUT_S) -> Tuple[Any, Callable[[], None]]:
+    """Run a planner attempt under a latency budget, hedging if it is slow.
+
+    Args:
+        attempt: Called as attempt(index, claim). Before emitting any
+            streamed output the attempt must call claim(); output may only
+            be emitted while claim() returns True.
+        timeout: Hard deadline in seconds for the whole call
+
+    Returns:
+        Tuple of (result, close) where close() stops late output from
+        attempts still running in the background
+
+    Raises:
+        PlannerTimeoutError: If no attempt finished within the budget
+        Exception: The last attempt error if every attempt failed
+    """
+    budget_stats.count("calls")
+    race = _Race()
+    started = time.monotonic()
+    deadline = started + timeout
+    hedge_after = hedge_delay()
+
+    def submit(index: int):
+        return _executor.submit(attempt, index, lambda: race.claim(index))
+
+    futures = {submit(0): 0}
+    hedged = False
+    last_error: Optional[BaseException] = None
+
+    while futures:
+        now = time.monotonic()
+        if now >= deadline:
+            race.close()
+            budget_stats.count("timeouts")
+            raise PlannerTimeoutError(f"planner call exceeded {timeout:.1f}s budget")
+
+        wait_for = deadline - now
+        can_hedge = hedge_after is not None and not hedged
+        if can_hedge:
+            wait_for = min(wait_for, max(0.0, started + hedge_after - now))
+
+        done, _ = wait(list(futures), timeout=wait_for, return_when=FIRST_COMPLETED)
+
+        for future in done:
+            index = futures.pop(future)
+            error = future.exception()
+            if error is not None:
+                last_error = error
+                logger.warning(f"Planner attempt {index} failed: {error}")
+                continue
+            if race.claim(index):
+                if index > 0:
+                    budget_stats.count("hedge_wins")
+                latency_tracker.record(time.monotonic() - started)
+                return future.result(), race.close
+            # Another attempt already streamed output; its result is authoritative
+
+        if not done and can_hedge and time.monotonic() >= started + hedge_after:
+            hedged = True
+            # Once the first attempt has streamed steps a hedge cannot replace it
+            if race.owner is None:
+                budget_stats.count("hedges")
+                logger.info(f"Planner call slower than {hedge_after:.2f}s, sending hedged request")
+                futures[submit(1)] = 1
+
+    race.close()
+    raise last_error if last_error else RuntimeError("all planner attempts failed")
+
+
+class CircuitBreaker:
+    """Opens after a high upstream error rate; probes for recovery in the background."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, window: int = CIRCUIT_WINDOW, min_calls: int = CIRCUIT_MIN_CALLS,
+                 failure_rate: float = CIRCUIT_FAILURE_RATE, cooldown_s: float = CIRCUIT_COOLDOWN_S):
+        """Initialize the breaker.
+
+        Args:
+            window: Number of recent outcomes considered
+            min_calls: Outcomes required before the breaker may trip
+            failure_rate: Failure fraction that trips the breaker
+            cooldown_s: Seconds to wait before probing an open breaker
+        """
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.cooldown_s = cooldown_s
+        self.probe: Optional[Callable[[], None]] = None
+
+        self._lock = threading.Lock()
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._trips = 0
+        self._short_circuited = 0
+        self._probes = 0
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def allow(self) -> bool:
+        """Return True if a real upstream call may be made right now."""
+        start_probe = False
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            self._short_circuited += 1
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown_s:
+                self._state = self.HALF_OPEN
+                start_probe = True
+
+        if start_probe:
+            threading.Thread(target=self._run_probe, name="planner-probe", daemon=True).start()
+        return False
+
+    def _run_probe(self) -> None:
+        with self._lock:
+            self._probes += 1
+        try:
+            if self.probe is None:
+                raise RuntimeError("no probe configured")
+            self.probe()
+        except Exception as e:
+            logger.warning(f"Planner recovery probe failed: {e}")
+            with self._lock:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+            return
+
+        logger.info("Planner recovery probe succeeded, closing circuit")
+        with self._lock:
+            self._state = self.CLOSED
+            self._outcomes.clear()
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._outcomes.append(False)
+            failures = self._outcomes.count(False)
+            if (self._state == self.CLOSED and len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.failure_rate):
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trips += 1
+                logger.error(
+                    f"Planner circuit opened ({failures}/{len(self._outcomes)} recent calls failed)"
+                )
+
+    def stats(self) -> Dict[str, Any]:
+        """Return breaker state and counters."""
+        with self._lock:
+            failures = self._outcomes.count(False)
+            return {
+                "state": self._state,
+                "trips": self._trips,
+                "short_circuited": self._short_circuited,
+                "probes": self._probes,
+                "recent_calls": len(self._outcomes),
+                "recent_failure_rate": round(failures / len(self._outcomes), 3) if self._outcomes else 0.0,
+            }
+
+
+def budget_snapshot() -> Dict[str, Any]:
+    """Return latency budget configuration and counters."""
+    with budget_stats.lock:
+        delay = hedge_delay()
+        return {
+            "timeout_s": PLANNER_TIMEOUT_S,
+            "hedge_enabled": PLANNER_HEDGE_ENABLED,
+            "hedge_after_s": round(delay, 3) if delay is not None else None,
+            "calls": budget_stats.calls,
+            "timeouts": budget_stats.timeouts,
+            "hedges": budget_stats.hedges,
+            "hedge_wins": budget_stats.hedge_wins,
+        }
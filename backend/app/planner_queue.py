@@ -0,0 +1,228 @@
+"""Bounded planner work queue with per-user fairness.
+
+Planning calls go through a fixed pool of worker tasks so a burst of mission
+submissions cannot fan out into an unbounded number of outbound LLM calls.
+Pending jobs are kept in per-user FIFOs and served round-robin, so one noisy
+user cannot starve everybody else.
+"""
+import os
+import math
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Queue configuration
+PLANNER_CONCURRENCY = int(os.getenv("PLANNER_CONCURRENCY", "2"))
+PLANNER_QUEUE_MAX = int(os.getenv("PLANNER_QUEUE_MAX", "32"))
+PLANNER_QUEUE_PER_USER_MAX = int(os.getenv("PLANNER_QUEUE_PER_USER_MAX", "8"))
+
+# Number of recent samples kept for wait/service time statistics
+STATS_WINDOW = 256
+
+
+class QueueFullError(Exception):
+    """Raised when the planner queue cannot accept another job."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Job:
+    """A queued planner call."""
+
+    __slots__ = ("user", "fn", "args", "future", "enqueued_at")
+
+    def __init__(self, user: str, fn: Callable[..., Any], args: tuple, future: asyncio.Future):
+        self.user = user
+        self.fn = fn
+        self.args = args
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    """Return the nearest-rank percentile of a list of samples."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class PlannerQueue:
+    """Bounded, per-user fair work queue executed by a fixed worker pool."""
+
+    def __init__(self, concurrency: int = PLANNER_CONCURRENCY,
+                 max_depth: int = PLANNER_QUEUE_MAX,
+                 per_user_max: int = PLANNER_QUEUE_PER_USER_MAX):
+        """Initialize the planner queue.
+
+        Args:
+            concurrency: Number of planner calls allowed to run at once
+            max_depth: Maximum number of queued (not yet running) jobs
+            per_user_max: Maximum number of queued jobs per user
+        """
+        self.concurrency = max(1, concurrency)
+        self.max_depth = max(1, max_depth)
+        self.per_user_max = max(1, per_user_max)
+
+        # user -> pending jobs; dict order is the round-robin order
+        self._pending: "OrderedDict[str, Deque[_Job]]" = OrderedDict()
+        self._depth = 0
+        self._active = 0
+        self._workers: List[asyncio.Task] = []
+        self._cond: Optional[asyncio.Condition] = None
+
+        self._wait_times: Deque[float] = deque(maxlen=STATS_WINDOW)
+        self._service_times: Deque[float] = deque(maxlen=STATS_WINDOW)
+        self._submitted = 0
+        self._rejected = 0
+        self._completed = 0
+        self._failed = 0
+
+    def _ensure_workers(self) -> None:
+        """Start worker tasks on the running event loop if needed."""
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        self._workers = [w for w in self._workers if not w.done()]
+        while len(self._workers) < self.concurrency:
+            index = len(self._workers)
+            self._workers.append(asyncio.create_task(self._worker(index)))
+
+    def retry_after(self) -> int:
+        """Estimate how many seconds a rejected client should wait."""
+        service = sum(self._service_times) / len(self._service_times) if self._service_times else 1.0
+        return max(1, math.ceil(service * (self._depth + 1) / self.concurrency))
+
+    async def enqueue(self, user: str, fn: Callable[..., Any], *args: Any) -> asyncio.Future:
+        """Queue a blocking planner call without waiting for it.
+
+        Args:
+            user: User the job is accounted to for fairness
+            fn: Blocking callable, run in a worker thread
+            *args: Positional arguments for fn
+
+        Returns:
+            Future resolved with the return value of fn. Cancelling it
+            before a worker picks the job up drops the job.
+
+        Raises:
+            QueueFullError: If the queue or the user's share of it is full
+        """
+        self._ensure_workers()
+
+        job = _Job(user, fn, args, asyncio.get_running_loop().create_future())
+        async with self._cond:
+            user_jobs = self._pending.get(user)
+            user_depth = len(user_jobs) if user_jobs else 0
+            if self._depth >= self.max_depth or user_depth >= self.per_user_max:
+                self._rejected += 1
+                retry_after = self.retry_after()
+                logger.warning(
+                    f"Planner queue full (depth={self._depth}, user {user} depth={user_depth}), "
+                    f"rejecting with Retry-After {retry_after}s"
+                )
+                raise QueueFullError("planner queue is full", retry_after)
+
+            if user_jobs is None:
+                user_jobs = self._pending[user] = deque()
+            user_jobs.append(job)
+            self._depth += 1
+            self._submitted += 1
+            self._cond.notify()
+
+        return job.future
+
+    async def submit(self, user: str, fn: Callable[..., Any], *args: Any) -> Any:
+        """Queue a blocking planner call and wait for its result.
+
+        Raises:
+            QueueFullError: If the queue or the user's share of it is full
+        """
+        future = await self.enqueue(user, fn, *args)
+        return await future
+
+    async def _next_job(self) -> _Job:
+        """Pop the next job, rotating across users."""
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._depth > 0)
+            user, jobs = next(iter(self._pending.items()))
+            job = jobs.popleft()
+            self._depth -= 1
+            if jobs:
+                self._pending.move_to_end(user)
+            else:
+                del self._pending[user]
+            return job
+
+    async def _worker(self, index: int) -> None:
+        """Worker loop executing queued jobs."""
+        while True:
+            job = await self._next_job()
+            if job.future.done():
+                # Caller went away while the job was queued
+                continue
+
+            wait = time.monotonic() - job.enqueued_at
+            self._wait_times.append(wait)
+            self._active += 1
+            logger.info(
+                f"Planner worker {index} picked job for {job.user} "
+                f"(waited {wait * 1000:.0f}ms, depth={self._depth})"
+            )
+
+            started = time.monotonic()
+            try:
+                result = await asyncio.to_thread(job.fn, *job.args)
+                if not job.future.done():
+                    job.future.set_result(result)
+                self._completed += 1
+            except Exception as e:
+                if not job.future.done():
+                    job.future.set_exception(e)
+                self._failed += 1
+            finally:
+                self._service_times.append(time.monotonic() - started)
+                self._active -= 1
+
+    async def shutdown(self) -> None:
+        """Cancel worker tasks."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return queue depth, wait time and throughput statistics."""
+        waits = list(self._wait_times)
+        services = list(self._service_times)
+        return {
+            "concurrency": self.concurrency,
+            "max_depth": self.max_depth,
+            "per_user_max": self.per_user_max,
+            "depth": self._depth,
+            "active": self._active,
+            "depth_by_user": {user: len(jobs) for user, jobs in self._pending.items()},
+            "submitted": self._submitted,
+            "rejected": self._rejected,
+            "completed": self._completed,
+            "failed": self._failed,
+            "wait_ms": {
+                "avg": round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+                "p95": round(_percentile(waits, 95) * 1000, 1),
+                "max": round(max(waits) * 1000, 1) if waits else 0.0,
+            },
+            "service_ms": {
+                "avg": round(sum(services) / len(services) * 1000, 1) if services else 0.0,
+                "p95": round(_percentile(services, 95) * 1000, 1),
+            },
+        }
+
+
+# Shared queue used by the API routes
+planner_queue = PlannerQueue()
@@ -0,0 +1,88 @@
+"""Decompression of gzip-encoded request bodies.
+
+The mac-client gzips large event bodies (base64 screenshots compress well).
+``GzipRequestMiddleware`` inflates them before routing, so handlers and
+Pydantic validation see plain JSON.
+"""
+import os
+import zlib
+import logging
+from typing import Any, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on an inflated request body (guards against gzip bombs)
+REQUEST_MAX_INFLATED_BYTES = int(os.getenv("REQUEST_MAX_INFLATED_BYTES", str(64 * 1024 * 1024)))
+
+
+class GzipRequestMiddleware:
+    """ASGI middleware accepting ``Content-Encoding: gzip`` request bodies."""
+
+    def __init__(self, app: Callable, max_inflated_bytes: int = REQUEST_MAX_INFLATED_BYTES):
+        """Wrap an ASGI application.
+
+        Args:
+            app: ASGI application
+            max_inflated_bytes: Largest accepted body after decompression
+        """
+        self.app = app
+        self.max_inflated_bytes = max_inflated_bytes
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers: List = scope.get("headers", [])
+        encoding = next((value for name, value in headers if name == b"content-encoding"), None)
+        if encoding is None or encoding.strip().lower() != b"gzip":
+            await self.app(scope, receive, send)
+            return
+
+        compressed = bytearray()
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            compressed.extend(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+
+        try:
+            # wbits 16 + MAX_WBITS expects a gzip header
+            inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            body = inflater.decompress(bytes(compressed), self.max_inflated_bytes + 1)
+            if len(body) > self.max_inflated_bytes:
+                await self._reject(send, 413, "Decompressed request body too large")
+                return
+        except zlib.error as e:
+            logger.warning(f"Invalid gzip request body for {scope.get('path')}: {e}")
+            await self._reject(send, 400, "Invalid gzip request body")
+            return
+
+        scope = dict(scope)
+        scope["headers"] = [
+            (name, value) for name, value in headers
+            if name not in (b"content-encoding", b"content-length")
+        ] + [(b"content-length", str(len(body)).encode())]
+
+        sent = False
+
+        async def inflated_receive() -> Dict[str, Any]:
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        await self.app(scope, inflated_receive, send)
+
+    @staticmethod
+    async def _reject(send: Callable, status_code: int, detail: str) -> None:
+        payload = ('{"detail": "%s"}' % detail).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())],
+        })
+        await send({"type": "http.response.body", "body": payload})
@@ -1,36 +1,81 @@
 """API route handlers for the backend."""
+import os
+import time
 import uuid
+import asyncio
+import hashlib
 import json
 import logging
-from fastapi import APIRouter, HTTPException, status, Query
-from app.models import MissionIn, MissionOut, MissionCreateResponse, EventIn
-from app.db import create_mission, get_mission_by_id, create_event, get_completed_step_ids
-from app.ai_planner import plan_from_prompt
+from typing import Any, Dict, Optional
+from fastapi import APIRouter, HTTPException, status, Query, Header, Request, Response
+from fastapi.responses import JSONResponse, FileResponse
+from app.models import (
+    MissionIn, MissionOut, MissionCreateResponse, MissionCloneIn, EventIn, EventBatchIn, LogChunkBatchIn
+)
+from app.db import (
+    create_mission, get_mission_by_id, get_mission_plan_json, create_event, create_events,
+    get_completed_step_ids, get_planner_calls, get_action_timings, clone_mission,
+    append_step_logs, get_step_logs
+)
+from app.planner_queue import planner_queue, QueueFullError
+from app.output_blobs import blob_path, store_blob, BlobTooLargeError
+from app.plan_cache import plan_cache
+from app.similarity_index import similarity_index
+from app.ai_planner import get_planner_stats, get_template_stats, plan_from_template
+from app.planner_accounting import summarize_planner_calls, PLANNER_CALLS_WINDOW_S
+from app.mission_planning import schedule_planning, empty_plan, rebase_plan, PLANNING_STATUS, PENDING_STATUS
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# How often a waiting log tail checks for new output
+LOG_TAIL_POLL_INTERVAL = 0.25  # seconds
 
-@router.post("/missions", response_model=MissionCreateResponse, status_code=status.HTTP_201_CREATED)
+
+@router.post("/missions", response_model=MissionCreateResponse, status_code=status.HTTP_202_ACCEPTED)
 async def create_new_mission(mission: MissionIn):
     """Create a new mission.
     
+    Prompts matching a plan template are planned on the spot and stored as
+    "pending". Otherwise the mission is stored immediately with status
+    "planning" and its plan is generated in the background by the planner queue.
+    
     Args:
         mission: Mission data from request body
         
     Returns:
-        MissionCreateResponse with mission_id and plan
+        MissionCreateResponse with mission_id, status and plan (empty while planning)
         
     Raises:
-        HTTPException: 422 for validation errors, 500 for database errors
+        HTTPException: 422 for validation errors, 429 when the planner queue
+            is full, 500 for database errors
     """
     try:
         # Generate unique mission ID
         mission_id = f"m-{str(uuid.uuid4())[:8]}"
         
-        # Generate plan using AI planner
-        plan = plan_from_prompt(mission_id, mission.prompt, mission.repo_path)
+        templated = plan_from_template(mission_id, mission.prompt, mission.repo_path)
+        if templated is not None:
+            create_mission({
+                "id": mission_id,
+                "user": mission.user,
+                "prompt": mission.prompt,
+                "repo_path": mission.repo_path,
+                "mac_id": mission.mac_id,
+                "status": PENDING_STATUS,
+                "plan_json": json.dumps(templated)
+            })
+            logger.info(f"Mission created: {mission_id} by user {mission.user} (planned from template)")
+            return MissionCreateResponse(mission_id=mission_id, status=PENDING_STATUS, plan=templated)
+            
+        # Reserve a planner slot first so a full queue rejects before anything is stored
+        planning = await schedule_planning(
+            mission.user, mission_id, mission.prompt, mission.repo_path, mission.use_cache,
+            use_templates=False
+        )
+        
+        plan = empty_plan(mission_id)
         
         # Prepare mission data for database
         mission_data = {
@@ -39,20 +84,32 @@ async def create_new_mission(mission: MissionIn):
             "prompt": mission.prompt,
             "repo_path": mission.repo_path,
             "mac_id": mission.mac_id,  # Will use default "mac-01" if not provided
-            "status": "pending",
-            "plan_json": json.dumps(plan)
+            "status": PLANNING_STATUS,
+            "plan_json": json.dumps(plan),
+            "use_cache": mission.use_cache
         }
         
-        # Store in database
-        create_mission(mission_data)
-        
-        logger.info(f"Mission created: {mission_id} by user {mission.user}")
+        # Store in database (no await before this, so workers cannot run ahead of the insert)
+        try:
+            create_mission(mission_data)
+        except Exception:
+            planning.cancel()
+            raise
+            
+        logger.info(f"Mission created: {mission_id} by user {mission.user} (planning in background)")
         
         return MissionCreateResponse(
             mission_id=mission_id,
+            status=PLANNING_STATUS,
             plan=plan
         )
         
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Planner is busy, retry later",
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         logger.error(f"Failed to create mission: {e}")
         raise HTTPException(
@@ -61,6 +118,93 @@ async def create_new_mission(mission: MissionIn):
         )
 
 
+def _clone(source_id: str, overrides: MissionCloneIn) -> MissionCreateResponse:
+    """Create a pending mission from a stored mission's plan without planning.
+    
+    Raises:
+        HTTPException: 404 if the source mission is not found, 409 while it
+            is still being planned
+    """
+    mission_id = f"m-{str(uuid.uuid4())[:8]}"
+    
+    created = clone_mission(
+        source_id, mission_id, PENDING_STATUS, PLANNING_STATUS,
+        user=overrides.user, repo_path=overrides.repo_path, mac_id=overrides.mac_id, rebase=rebase_plan
+    )
+    
+    if not created:
+        source = get_mission_by_id(source_id)
+        if source is None:
+            logger.warning(f"Mission not found: {source_id}")
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="mission not found"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="mission is still being planned"
+        )
+        
+    mission = get_mission_by_id(mission_id)
+    logger.info(f"Mission created: {mission_id} from {source_id} (plan reused)")
+    return MissionCreateResponse(mission_id=mission_id, status=PENDING_STATUS, plan=mission["plan"])
+
+
+@router.post("/missions/{mission_id}/rerun", response_model=MissionCreateResponse,
+             status_code=status.HTTP_201_CREATED)
+async def rerun_mission(mission_id: str):
+    """Run a mission again with its stored plan, without calling the planner.
+    
+    Args:
+        mission_id: Mission to re-run
+        
+    Returns:
+        MissionCreateResponse for the new pending mission
+        
+    Raises:
+        HTTPException: 404 if mission not found, 409 while it is still
+            being planned, 500 for database errors
+    """
+    try:
+        return _clone(mission_id, MissionCloneIn())
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to rerun mission {mission_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to rerun mission: {str(e)}"
+        )
+
+
+@router.post("/missions/{mission_id}/clone", response_model=MissionCreateResponse,
+             status_code=status.HTTP_201_CREATED)
+async def clone_existing_mission(mission_id: str, overrides: MissionCloneIn):
+    """Copy a mission's stored plan into a new mission with overrides.
+    
+    Args:
+        mission_id: Mission to copy
+        overrides: New user, repo_path and/or mac_id
+        
+    Returns:
+        MissionCreateResponse for the new pending mission
+        
+    Raises:
+        HTTPException: 404 if mission not found, 409 while it is still
+            being planned, 500 for database errors
+    """
+    try:
+        return _clone(mission_id, overrides)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to clone mission {mission_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to clone mission: {str(e)}"
+        )
+
+
 @router.get("/missions/{mission_id}", response_model=MissionOut)
 async def get_mission(mission_id: str):
     """Retrieve a mission by ID.
@@ -83,7 +227,7 @@ async def get_mission(mission_id: str):
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="mission not found"
             )
-        
+            
         logger.info(f"Mission retrieved: {mission_id}")
         
         return MissionOut(**mission)
@@ -100,15 +244,20 @@ async def get_mission(mission_id: str):
 
 
 @router.get("/missions/{mission_id}/next_step")
-async def get_next_step(mission_id: str, mac_id: str = Query(default="mac-01")):
+async def get_next_step(mission_id: str, mac_id: str = Query(default="mac-01"),
+                        exclude: Optional[str] = Query(default=None)):
     """Get the next step for a macOS client to execute.
     
     Args:
         mission_id: Mission identifier
         mac_id: macOS client identifier (query parameter)
-        
+        exclude: Comma-separated step IDs the client has already run but whose
+            events may not have arrived yet (lets the client prefetch the
+            following step while it is still reporting)
+            
     Returns:
-        JSON with next step or null if no steps remaining
+        JSON with next step (or null if no steps are available) and the
+        mission status; status "planning" means more steps may still come
         
     Raises:
         HTTPException: 404 if mission not found, 500 for database errors
@@ -123,24 +272,31 @@ async def get_next_step(mission_id: str, mac_id: str = Query(default="mac-01")):
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="mission not found"
             )
-        
+            
         # Get plan
         plan = mission.get("plan", {})
         steps = plan.get("plan", [])
         
         # Get completed step IDs
         completed_steps = get_completed_step_ids(mission_id)
-        
+        if exclude:
+            completed_steps |= {step_id.strip() for step_id in exclude.split(",") if step_id.strip()}
+            
         # Find first uncompleted step
         for step in steps:
             step_id = step.get("step_id")
             if step_id not in completed_steps:
                 logger.info(f"Next step for mission {mission_id}: {step_id}")
-                return {"step": step}
-        
+                return {"step": step, "status": mission["status"]}
+                
+        if mission["status"] == PLANNING_STATUS:
+            # Plan not ready yet - client should keep polling
+            logger.info(f"Mission {mission_id} is still planning")
+            return {"step": None, "status": PLANNING_STATUS}
+            
         # No steps remaining
         logger.info(f"No steps remaining for mission {mission_id}")
-        return {"step": None}
+        return {"step": None, "status": mission["status"]}
         
     except HTTPException:
         raise
@@ -176,7 +332,7 @@ async def post_event(mission_id: str, event: EventIn):
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="mission not found"
             )
-        
+            
         # Generate event ID
         event_id = f"e-{str(uuid.uuid4())[:8]}"
         
@@ -185,11 +341,12 @@ async def post_event(mission_id: str, event: EventIn):
             "id": event_id,
             "mission_id": mission_id,
             "step_id": event.step_id,
-            "payload": json.dumps(event.dict())
+            "payload": json.dumps(event.dict()),
+            "idempotency_key": event.idempotency_key
         }
         
-        # Store event
-        create_event(event_data)
+        # Store event (a resent idempotency key returns the stored event's ID)
+        event_id = create_event(event_data)
         
         logger.info(f"Event posted: {event_id} for mission {mission_id}, step {event.step_id}, status {event.status}")
         
@@ -205,22 +362,274 @@ async def post_event(mission_id: str, event: EventIn):
         )
 
 
+@router.post("/missions/{mission_id}/events/batch")
+async def post_event_batch(mission_id: str, batch: EventBatchIn):
+    """Post several events for a mission in one request and one transaction.
+    
+    Used by the client event outbox. Events whose idempotency_key was
+    already stored are acknowledged without being stored again, so a batch
+    can safely be resent after a lost response.
+    
+    Args:
+        mission_id: Mission identifier
+        batch: Events from request body
+        
+    Returns:
+        JSON with ok status, the event_ids in request order and the
+        current plan ETag
+        
+    Raises:
+        HTTPException: 404 if mission not found, 500 for database errors
+    """
+    try:
+        mission = get_mission_plan_json(mission_id)
+        
+        if mission is None:
+            logger.warning(f"Mission not found: {mission_id}")
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="mission not found"
+            )
+            
+        event_ids = create_events([
+            {
+                "id": f"e-{str(uuid.uuid4())[:8]}",
+                "mission_id": mission_id,
+                "step_id": event.step_id,
+                "payload": json.dumps(event.dict()),
+                "idempotency_key": event.idempotency_key
+            }
+            for event in batch.events
+        ])
+        
+        logger.info(f"Event batch posted: {len(event_ids)} events for mission {mission_id}")
+        
+        # Lets clients running a downloaded plan notice that it changed
+        return {"ok": True, "event_ids": event_ids, "plan_etag": _plan_etag(mission["status"], mission["plan_json"])}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to post event batch for mission {mission_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to post events: {str(e)}"
+        )
+
+
+@router.post("/missions/{mission_id}/steps/{step_id}/logs")
+async def append_logs(mission_id: str, step_id: str, batch: LogChunkBatchIn):
+    """Append live output of a running step.
+    
+    Chunks carry a per-step seq, so a batch resent after a lost response is
+    stored only once.
+    
+    Args:
+        mission_id: Mission identifier
+        step_id: Step identifier
+        batch: Output chunks from request body
+        
+    Returns:
+        JSON with ok status and the number of chunks stored
+        
+    Raises:
+        HTTPException: 404 if mission not found, 500 for database errors
+    """
+    try:
+        if get_mission_by_id(mission_id) is None:
+            logger.warning(f"Mission not found: {mission_id}")
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="mission not found"
+            )
+            
+        stored = append_step_logs(mission_id, step_id, [chunk.dict() for chunk in batch.chunks])
+        return {"ok": True, "stored": stored}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to append logs for mission {mission_id} step {step_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to append logs: {str(e)}"
+        )
+
+
+@router.get("/missions/{mission_id}/logs")
+async def get_logs(
+    mission_id: str,
+    step_id: Optional[str] = None,
+    after: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=5000),
+    wait: float = Query(0, ge=0, le=30)
+):
+    """Tail the live command output of a mission.
+    
+    Pass the returned cursor as after to get only newer output. With wait,
+    the request is held until new output arrives or wait seconds passed.
+    
+    Args:
+        mission_id: Mission identifier
+        step_id: Only return output of this step
+        after: Cursor returned by the previous call (0 for the start)
+        limit: Maximum chunks returned
+        wait: Seconds to wait for new output (long polling)
+        
+    Returns:
+        JSON with the chunks (step_id, seq, stream, data) and the cursor
+        
+    Raises:
+        HTTPException: 404 if mission not found, 500 for database errors
+    """
+    try:
+        if get_mission_by_id(mission_id) is None:
+            logger.warning(f"Mission not found: {mission_id}")
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="mission not found"
+            )
+            
+        deadline = time.monotonic() + wait
+        chunks = get_step_logs(mission_id, step_id, after, limit)
+        while not chunks and time.monotonic() < deadline:
+            await asyncio.sleep(LOG_TAIL_POLL_INTERVAL)
+            chunks = get_step_logs(mission_id, step_id, after, limit)
+            
+        return {
+            "mission_id": mission_id,
+            "chunks": chunks,
+            "cursor": chunks[-1]["id"] if chunks else after
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get logs for mission {mission_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get logs: {str(e)}"
+        )
+
+
+@router.put("/missions/{mission_id}/steps/{step_id}/output/{stream}")
+async def upload_step_output(mission_id: str, step_id: str, stream: str, request: Request):
+    """Store the full output stream of a step, uploaded as a gzip file.
+    
+    The body is the raw gzip file (Content-Type application/gzip, without
+    Content-Encoding) and is written to disk as it arrives. Uploading again
+    replaces the stored file.
+    
+    Args:
+        mission_id: Mission identifier
+        step_id: Step identifier
+        stream: "stdout" or "stderr"
+        request: Request whose body is streamed to disk
+        
+    Returns:
+        JSON with ok status and the number of bytes stored
+        
+    Raises:
+        HTTPException: 404 if mission not found or stream is invalid,
+            413 if the file is too large, 500 for storage errors
+    """
+    try:
+        path = blob_path(mission_id, step_id, stream)
+        if path is None or get_mission_by_id(mission_id) is None:
+            logger.warning(f"Output upload for unknown mission or stream: {mission_id} {step_id} {stream}")
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="mission or stream not found"
+            )
+            
+        size = await store_blob(path, request.stream())
+        logger.info(f"Stored {size} bytes of {stream} for mission {mission_id} step {step_id}")
+        return {"ok": True, "bytes": size}
+        
+    except HTTPException:
+        raise
+    except BlobTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Failed to store output for mission {mission_id} step {step_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to store output: {str(e)}"
+        )
+
+
+@router.get("/missions/{mission_id}/steps/{step_id}/output/{stream}")
+async def download_step_output(mission_id: str, step_id: str, stream: str):
+    """Download the full output stream of a step as a gzip file.
+    
+    Args:
+        mission_id: Mission identifier
+        step_id: Step identifier
+        stream: "stdout" or "stderr"
+        
+    Returns:
+        The gzip file uploaded by the client
+        
+    Raises:
+        HTTPException: 404 if the output was not uploaded
+    """
+    path = blob_path(mission_id, step_id, stream)
+    if path is None or not os.path.isfile(path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="output not uploaded"
+        )
+    return FileResponse(path, media_type="application/gzip", filename=f"{mission_id}-{step_id}.{stream}.gz")
+
+
+def _plan_etag(mission_status: str, plan_json: str) -> str:
+    """Return the ETag of a mission's plan (changes with the plan or status)."""
+    digest = hashlib.sha256(f"{mission_status}\n{plan_json}".encode("utf-8")).hexdigest()
+    return f'"{digest[:20]}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Return True if an If-None-Match header matches an ETag.
+
+    The header may list several ETags or be ``*``; weak ETags (``W/"..."``)
+    match their strong counterpart, as If-None-Match uses weak comparison.
+    """
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    if "*" in candidates:
+        return True
+
+    def opaque(tag: str) -> str:
+        return tag[2:] if tag.startswith("W/") else tag
+
+    return opaque(etag) in {opaque(candidate) for candidate in candidates}
+
+
 @router.get("/missions/{mission_id}/steps")
-async def get_steps(mission_id: str):
+async def get_steps(mission_id: str, if_none_match: Optional[str] = Header(default=None)):
     """Get all steps for a mission.
     
+    The response carries an ETag; a request whose If-None-Match matches it
+    (see _etag_matches) gets 304 Not Modified without the plan being parsed
+    or sent.
+    
     Args:
         mission_id: Mission identifier
+        if_none_match: ETag of the plan the client already has
         
     Returns:
-        JSON with full plan containing all steps
+        JSON with full plan containing all steps and the mission status
         
     Raises:
         HTTPException: 404 if mission not found, 500 for database errors
     """
     try:
         # Get mission
-        mission = get_mission_by_id(mission_id)
+        mission = get_mission_plan_json(mission_id)
         
         if mission is None:
             logger.warning(f"Mission not found: {mission_id}")
@@ -228,12 +637,16 @@ async def get_steps(mission_id: str):
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="mission not found"
             )
-        
+            
+        etag = _plan_etag(mission["status"], mission["plan_json"])
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+            
         # Return plan
-        plan = mission.get("plan", {})
+        plan = json.loads(mission["plan_json"])
         logger.info(f"Steps retrieved for mission {mission_id}")
         
-        return plan
+        return JSONResponse({**plan, "status": mission["status"]}, headers={"ETag": etag})
         
     except HTTPException:
         raise
@@ -243,3 +656,212 @@ async def get_steps(mission_id: str):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get steps: {str(e)}"
         )
+
+
+@router.get("/missions/{mission_id}/cursor")
+async def get_cursor(mission_id: str):
+    """Get a mission's progress cursor.
+    
+    Clients running a downloaded plan call this on start, after reconnecting
+    and on conflicts to find out which steps the server has recorded.
+    
+    Args:
+        mission_id: Mission identifier
+        
+    Returns:
+        JSON with the mission status, plan ETag, completed step IDs and the
+        next step ID (null if none is left)
+        
+    Raises:
+        HTTPException: 404 if mission not found, 500 for database errors
+    """
+    try:
+        mission = get_mission_plan_json(mission_id)
+        
+        if mission is None:
+            logger.warning(f"Mission not found: {mission_id}")
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="mission not found"
+            )
+            
+        completed_steps = get_completed_step_ids(mission_id)
+        steps = json.loads(mission["plan_json"]).get("plan", [])
+        next_step_id = next(
+            (step.get("step_id") for step in steps if step.get("step_id") not in completed_steps), None
+        )
+        
+        return {
+            "mission_id": mission_id,
+            "status": mission["status"],
+            "etag": _plan_etag(mission["status"], mission["plan_json"]),
+            "completed": sorted(completed_steps),
+            "next_step_id": next_step_id
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get cursor for mission {mission_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get cursor: {str(e)}"
+        )
+
+
+@router.get("/missions/{mission_id}/planner_calls")
+async def get_mission_planner_calls(mission_id: str):
+    """Get the planner call records of a mission.
+    
+    Args:
+        mission_id: Mission identifier
+        
+    Returns:
+        JSON with the mission's planner calls (source, sizes, tokens, wall time, retries)
+        
+    Raises:
+        HTTPException: 404 if mission not found, 500 for database errors
+    """
+    try:
+        mission = get_mission_by_id(mission_id)
+        
+        if mission is None:
+            logger.warning(f"Mission not found: {mission_id}")
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="mission not found"
+            )
+            
+        return {"mission_id": mission_id, "calls": get_planner_calls(mission_id=mission_id)}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get planner calls for mission {mission_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get planner calls: {str(e)}"
+        )
+
+
+@router.get("/missions/{mission_id}/action_timings")
+async def get_mission_action_timings(mission_id: str):
+    """Get how long each action of a mission took, as reported by the client.
+    
+    Args:
+        mission_id: Mission identifier
+        
+    Returns:
+        JSON with the timed actions in the order they were reported and
+        per action type counts (also of results served from the client's
+        result cache), total and maximum seconds
+        
+    Raises:
+        HTTPException: 404 if mission not found, 500 for database errors
+    """
+    try:
+        mission = get_mission_by_id(mission_id)
+        
+        if mission is None:
+            logger.warning(f"Mission not found: {mission_id}")
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="mission not found"
+            )
+            
+        actions = get_action_timings(mission_id)
+        by_type: Dict[str, Dict[str, Any]] = {}
+        for action in actions:
+            duration = action.get("duration_s") or 0.0
+            entry = by_type.setdefault(action.get("type"), {"count": 0, "cached": 0, "total_s": 0.0, "max_s": 0.0})
+            entry["count"] += 1
+            if action.get("cached"):
+                entry["cached"] += 1
+            entry["total_s"] = round(entry["total_s"] + duration, 3)
+            entry["max_s"] = max(entry["max_s"], duration)
+            
+        return {"mission_id": mission_id, "actions": actions, "by_type": by_type}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get action timings for mission {mission_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get action timings: {str(e)}"
+        )
+
+
+@router.get("/planner/queue")
+async def get_planner_queue():
+    """Get planner queue depth, wait time and throughput statistics.
+    
+    Returns:
+        JSON snapshot of the planner queue
+    """
+    return planner_queue.snapshot()
+
+
+@router.get("/planner/cache")
+async def get_plan_cache_stats():
+    """Get plan cache size and hit rate statistics.
+    
+    Returns:
+        JSON with plan cache statistics
+    """
+    return plan_cache.stats()
+
+
+@router.get("/planner/similarity")
+async def get_similarity_index_stats():
+    """Get near-duplicate prompt index statistics.
+    
+    Returns:
+        JSON with similarity index statistics
+    """
+    return similarity_index.stats()
+
+
+@router.get("/planner/metrics")
+async def get_planner_metrics():
+    """Get planner call coalescing statistics.
+    
+    Returns:
+        JSON with planner metrics
+    """
+    return get_planner_stats()
+
+
+@router.get("/planner/templates")
+async def get_planner_template_stats():
+    """Get plan template statistics.
+    
+    Returns:
+        JSON with loaded templates, match rate and estimated time saved
+    """
+    return get_template_stats()
+
+
+@router.get("/planner/calls")
+async def get_planner_calls_summary(since_s: float = Query(PLANNER_CALLS_WINDOW_S, gt=0)):
+    """Get planner cost and latency accounting.
+    
+    Args:
+        since_s: Only include calls from the last since_s seconds
+            (default: PLANNER_CALLS_WINDOW_S)
+        
+    Returns:
+        JSON with call counts, prompt/response sizes, token totals and
+        latency percentiles, overall and per plan source
+        
+    Raises:
+        HTTPException: 500 for database errors
+    """
+    try:
+        return summarize_planner_calls(since=time.time() - since_s)
+    except Exception as e:
+        logger.error(f"Failed to summarize planner calls: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to summarize planner calls: {str(e)}"
+        )
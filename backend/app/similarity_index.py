@@ -0,0 +1,204 @@
+"""Near-duplicate prompt index using character shingles, MinHash and LSH.
+
+Each indexed prompt is reduced to a short MinHash signature over its
+character shingles. Signatures are split into bands and each band is hashed
+into a bucket; prompts sharing at least one bucket are candidates, and the
+candidate with the highest estimated Jaccard similarity wins. Everything is
+local and in memory - no network embeddings.
+"""
+import os
+import zlib
+import random
+import logging
+import threading
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Index configuration
+SIMILAR_PLAN_ENABLED = os.getenv("SIMILAR_PLAN_ENABLED", "true").lower() == "true"
+SIMILAR_PLAN_THRESHOLD = float(os.getenv("SIMILAR_PLAN_THRESHOLD", "0.8"))
+SIMILARITY_INDEX_MAX_ENTRIES = int(os.getenv("SIMILARITY_INDEX_MAX_ENTRIES", "20000"))
+
+SHINGLE_SIZE = 3
+NUM_PERM = 32
+BANDS = 8
+# Most recent entries kept per LSH bucket; bounds lookup cost for very common prompts
+BUCKET_CAP = 16
+
+# Prime just above 2**32 for the universal hash family
+_PRIME = 4294967311
+_MASK = 0xFFFFFFFF
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    """Return the set of character shingles of a (normalized) prompt."""
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class SimilarityIndex:
+    """Incremental MinHash/LSH index scoped by repository."""
+
+    def __init__(self, num_perm: int = NUM_PERM, bands: int = BANDS,
+                 max_entries: int = SIMILARITY_INDEX_MAX_ENTRIES,
+                 threshold: float = SIMILAR_PLAN_THRESHOLD, seed: int = 1):
+        """Initialize the index.
+
+        Args:
+            num_perm: Number of MinHash permutations (signature length)
+            bands: Number of LSH bands; must divide num_perm
+            max_entries: Maximum indexed prompts; oldest are evicted first
+            threshold: Minimum estimated similarity for a match
+            seed: Seed for the hash permutations
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_entries = max(1, max_entries)
+        self.threshold = threshold
+
+        rng = random.Random(seed)
+        self._perms = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+
+        # entry key -> internal id; internal id -> (key, repo id, signature bytes).
+        # Plain dicts keep insertion order, which doubles as the eviction order.
+        self._ids: Dict[str, int] = {}
+        self._entries: Dict[int, Tuple[str, int, bytes]] = {}
+        self._repo_ids: Dict[str, int] = {}
+        # One dict per band: bucket hash -> internal id, or list of ids when shared
+        self._buckets: List[Dict[int, Any]] = [{} for _ in range(bands)]
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+        self._lookups = 0
+        self._matches = 0
+
+    def signature(self, text: str) -> bytes:
+        """Compute the MinHash signature of a normalized prompt."""
+        hashes = [zlib.crc32(s.encode("utf-8")) for s in shingles(text)]
+        sig = array("I", [min([(a * h + b) % _PRIME for h in hashes]) & _MASK for a, b in self._perms])
+        return sig.tobytes()
+
+    def _band_keys(self, repo_id: int, sig: bytes) -> List[int]:
+        width = self.rows * 4
+        return [hash((repo_id, sig[i * width:(i + 1) * width])) for i in range(self.bands)]
+
+    def _similarity(self, a: bytes, b: bytes) -> float:
+        return sum(x == y for x, y in zip(memoryview(a).cast("I"), memoryview(b).cast("I"))) / self.num_perm
+
+    def _remove_locked(self, entry_id: int) -> None:
+        key, repo_id, sig = self._entries.pop(entry_id)
+        del self._ids[key]
+        for band, bucket_key in zip(self._buckets, self._band_keys(repo_id, sig)):
+            members = band.get(bucket_key)
+            if members == entry_id:
+                del band[bucket_key]
+            elif isinstance(members, list) and entry_id in members:
+                members.remove(entry_id)
+                if len(members) == 1:
+                    band[bucket_key] = members[0]
+
+    def add(self, key: str, text: str, repo: str) -> None:
+        """Index a prompt, replacing any previous entry with the same key.
+
+        Args:
+            key: Identifier returned by query (e.g. a plan cache key)
+            text: Normalized prompt
+            repo: Normalized repository path the prompt is scoped to
+        """
+        sig = self.signature(text)
+        with self._lock:
+            if key in self._ids:
+                self._remove_locked(self._ids[key])
+
+            repo_id = self._repo_ids.setdefault(repo, len(self._repo_ids))
+            entry_id = self._next_id
+            self._next_id += 1
+            self._ids[key] = entry_id
+            self._entries[entry_id] = (key, repo_id, sig)
+
+            for band, bucket_key in zip(self._buckets, self._band_keys(repo_id, sig)):
+                members = band.get(bucket_key)
+                if members is None:
+                    band[bucket_key] = entry_id
+                elif isinstance(members, list):
+                    members.append(entry_id)
+                    if len(members) > BUCKET_CAP:
+                        del members[0]
+                else:
+                    band[bucket_key] = [members, entry_id]
+
+            while len(self._entries) > self.max_entries:
+                self._remove_locked(next(iter(self._entries)))
+
+    def remove(self, key: str) -> None:
+        """Drop an entry, e.g. when the plan it points to is gone."""
+        with self._lock:
+            if key in self._ids:
+                self._remove_locked(self._ids[key])
+
+    def query(self, text: str, repo: str) -> Optional[Tuple[str, float]]:
+        """Find the most similar indexed prompt for the same repository.
+
+        Args:
+            text: Normalized prompt
+            repo: Normalized repository path
+
+        Returns:
+            Tuple of (key, estimated similarity) above the threshold, or None
+        """
+        sig = self.signature(text)
+        with self._lock:
+            self._lookups += 1
+            repo_id = self._repo_ids.get(repo)
+            if repo_id is None:
+                return None
+
+            candidates = set()
+            for band, bucket_key in zip(self._buckets, self._band_keys(repo_id, sig)):
+                members = band.get(bucket_key)
+                if isinstance(members, list):
+                    candidates.update(members)
+                elif members is not None:
+                    candidates.add(members)
+
+            best = None
+            for entry_id in candidates:
+                key, entry_repo_id, entry_sig = self._entries[entry_id]
+                if entry_repo_id != repo_id:
+                    continue
+                similarity = self._similarity(sig, entry_sig)
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (key, similarity)
+
+            if best:
+                self._matches += 1
+            return best
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return index size and match statistics."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "repos": len(self._repo_ids),
+                "threshold": self.threshold,
+                "num_perm": self.num_perm,
+                "bands": self.bands,
+                "lookups": self._lookups,
+                "matches": self._matches,
+                "match_rate": round(self._matches / self._lookups, 3) if self._lookups else 0.0,
+            }
+
+
+# Shared index used by the planner
+similarity_index = SimilarityIndex()
@@ -0,0 +1,106 @@
+"""Single-flight coalescing of identical concurrent calls.
+
+The first caller for a key (the leader) runs the work; callers arriving
+while it is in flight (followers) wait for the leader's outcome instead of
+repeating the work. Results and exceptions are shared with every follower.
+"""
+import logging
+import threading
+from concurrent.futures import Future, CancelledError
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """An in-flight call shared by a leader and its followers."""
+
+    __slots__ = ("future", "state", "followers")
+
+    def __init__(self, state: Any):
+        self.future: Future = Future()
+        self.future.set_running_or_notify_cancel()
+        self.state = state
+        self.followers = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution."""
+
+    def __init__(self, state_factory: Optional[Callable[[], Any]] = None):
+        """Initialize the group.
+
+        Args:
+            state_factory: Builds per-flight state shared by the leader and
+                followers (passed to fn and on_join)
+        """
+        self._state_factory = state_factory
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._leaders = 0
+        self._coalesced = 0
+
+    def do(self, key: str, fn: Callable[[Any], Any],
+           on_join: Optional[Callable[[Any], None]] = None,
+           timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        """Run fn once for all concurrent callers with the same key.
+
+        Args:
+            key: Coalescing key
+            fn: Work to run; receives the per-flight state
+            on_join: Called with the per-flight state for every caller
+                (leader included) before waiting on the result
+            timeout: Maximum seconds a follower waits; the leader is unaffected
+
+        Returns:
+            Tuple of (result, shared) where shared is True for followers
+
+        Raises:
+            Exception: Whatever the leader's fn raised
+            CancelledError: If the leader was interrupted without an exception
+            TimeoutError: If a follower gave up waiting
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call(self._state_factory() if self._state_factory else None)
+                self._calls[key] = call
+                self._leaders += 1
+            else:
+                call.followers += 1
+                self._coalesced += 1
+
+        if not leader:
+            if on_join is not None:
+                on_join(call.state)
+            return call.future.result(timeout), True
+
+        try:
+            if on_join is not None:
+                on_join(call.state)
+            result = fn(call.state)
+        except Exception as e:
+            call.future.set_exception(e)
+            raise
+        except BaseException:
+            # Interrupted leader: release followers without leaking e.g. KeyboardInterrupt
+            call.future.set_exception(CancelledError("single-flight leader was interrupted"))
+            raise
+        else:
+            call.future.set_result(result)
+            if call.followers:
+                logger.info(f"Single-flight result shared with {call.followers} callers")
+            return result, False
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return leader/follower counts and the number of calls in flight."""
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "leaders": self._leaders,
+                "coalesced": self._coalesced,
+            }
@@ -0,0 +1,302 @@
+"""Tracing of backend requests and planning.
+
+Spans are exported as OTLP/JSON lines (one ``ExportTraceServiceRequest`` per
+line) to ``TRACE_FILE``, in the same format as the mac-client traces, so
+``benchmarks/trace_report.py`` can merge both files into one timeline.
+
+Every mission has a deterministic trace context derived from its ID
+(``mission_trace_context``). ``TracingMiddleware`` returns it in a
+``traceparent`` header on mission-scoped responses, the client parents its
+mission span on it, and requests carrying the client's ``traceparent``
+become children of the client span that sent them. Planning spans hang off
+the mission context directly, so the planner's share of the critical path
+shows up even though planning starts before any client is involved.
+"""
+import os
+import re
+import json
+import time
+import atexit
+import hashlib
+import logging
+import secrets
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+TRACE_FILE = os.getenv(
+    "TRACE_FILE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "traces", "backend.jsonl")
+)
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "backend")
+
+# OTLP span kinds and status codes
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+FLUSH_BATCH = 100  # spans per exported line
+FLUSH_INTERVAL = 1.0  # seconds a finished span may wait in the buffer
+
+_MISSION_PATH = re.compile(r"^/missions/([^/]+)")
+# Path segments replaced by placeholders in span names, keeping their cardinality low
+_ROUTE_PARAMS = (
+    (re.compile(r"^/missions/[^/]+"), "/missions/{id}"),
+    (re.compile(r"/steps/[^/]+"), "/steps/{step_id}"),
+    (re.compile(r"/output/[^/]+$"), "/output/{stream}"),
+)
+
+
+def mission_trace_context(mission_id: str) -> str:
+    """Return the W3C traceparent of a mission's root.
+    
+    The trace and root span IDs are derived from the mission ID, so every
+    process computes the same context without storing it.
+    
+    Args:
+        mission_id: Mission identifier
+        
+    Returns:
+        traceparent header value
+    """
+    digest = hashlib.sha256(f"mission:{mission_id}".encode("utf-8")).hexdigest()
+    return f"00-{digest[:32]}-{digest[32:48]}-01"
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str]]:
+    """Return (trace_id, span_id) from a W3C traceparent header, or None if invalid."""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return parts[1], parts[2]
+
+
+def route_name(path: str) -> str:
+    """Return a request path with IDs replaced by placeholders."""
+    for pattern, placeholder in _ROUTE_PARAMS:
+        path = pattern.sub(placeholder, path)
+    return path
+
+
+def _attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class Span:
+    """A timed operation within a trace."""
+    
+    def __init__(self, tracer: "Tracer", name: str, trace_id: str, parent_span_id: Optional[str],
+                 kind: int = KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent_span_id
+        self.kind = kind
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.status = STATUS_OK
+        self.status_message = ""
+    
+    def set_attribute(self, key: str, value: Any):
+        if value is not None:
+            self.attributes[key] = value
+    
+    def set_error(self, message: str):
+        self.status = STATUS_ERROR
+        self.status_message = message
+    
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self.tracer._export(self)
+    
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": self.status}
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        return span
+
+
+class _NoopSpan:
+    """Stand-in yielded while tracing is disabled."""
+    
+    def set_attribute(self, key: str, value: Any):
+        pass
+    
+    def set_error(self, message: str):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """Creates spans and exports finished ones to an OTLP/JSON lines file."""
+    
+    def __init__(self, path: str = TRACE_FILE, service_name: str = TRACE_SERVICE_NAME,
+                 enabled: bool = TRACING_ENABLED):
+        """Initialize the tracer.
+        
+        Args:
+            path: File finished spans are appended to
+            service_name: service.name resource attribute of exported spans
+            enabled: Whether spans are recorded at all
+        """
+        self.path = path
+        self.service_name = service_name
+        self.enabled = enabled
+        
+        self._lock = threading.Lock()
+        self._buffer: List[Dict[str, Any]] = []
+        self._last_flush = time.monotonic()
+        if enabled:
+            atexit.register(self.flush)
+    
+    @contextmanager
+    def span(self, name: str, kind: int = KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None,
+             parent: Optional[str] = None) -> Iterator[Any]:
+        """Time a block as a span.
+        
+        The parent is the remote ``parent`` traceparent if given, else the
+        span active in the calling context. An exception leaving the block
+        marks the span as failed.
+        
+        Args:
+            name: Span name
+            kind: KIND_INTERNAL, KIND_SERVER or KIND_CLIENT
+            attributes: Initial attributes
+            parent: traceparent header of a remote parent
+            
+        Yields:
+            The span (a no-op object while tracing is disabled)
+        """
+        if not self.enabled:
+            yield _NOOP_SPAN
+            return
+            
+        remote = parse_traceparent(parent)
+        active = _current_span.get()
+        if remote is not None:
+            trace_id, parent_span_id = remote
+        elif active is not None:
+            trace_id, parent_span_id = active.trace_id, active.span_id
+        else:
+            trace_id, parent_span_id = secrets.token_hex(16), None
+        span = Span(self, name, trace_id, parent_span_id, kind, attributes)
+        
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_error(f"{e.__class__.__name__}: {e}")
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+    
+    def _export(self, span: Span):
+        with self._lock:
+            self._buffer.append(span.to_otlp())
+            due = len(self._buffer) >= FLUSH_BATCH or time.monotonic() - self._last_flush >= FLUSH_INTERVAL
+        if due:
+            self.flush()
+    
+    def flush(self):
+        """Write buffered spans to the trace file."""
+        with self._lock:
+            spans, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+            if not spans:
+                return
+            request = {
+                "resourceSpans": [{
+                    "resource": {"attributes": [_attribute("service.name", self.service_name)]},
+                    "scopeSpans": [{"scope": {"name": "autoide.tracing"}, "spans": spans}]
+                }]
+            }
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(request) + "\n")
+            except OSError as e:
+                logger.error(f"Failed to write spans to {self.path}: {e}")
+
+
+class TracingMiddleware:
+    """ASGI middleware recording a server span per request.
+    
+    Requests under ``/missions/{id}`` get the mission's trace context in a
+    ``traceparent`` response header, whether or not tracing is enabled here,
+    so clients can trace missions against an untraced backend too.
+    """
+    
+    def __init__(self, app: Callable):
+        """Wrap an ASGI application.
+        
+        Args:
+            app: ASGI application
+        """
+        self.app = app
+    
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+            
+        path = scope.get("path", "")
+        match = _MISSION_PATH.match(path)
+        context = mission_trace_context(match.group(1)) if match else None
+        incoming = next((value for name, value in scope.get("headers", []) if name == b"traceparent"), None)
+        parent = incoming.decode("latin-1") if incoming else context
+        route = route_name(path)
+        
+        with tracer.span(f"{scope.get('method', 'GET')} {route}", KIND_SERVER, parent=parent,
+                              attributes={"http.route": route}) as span:
+            
+            async def traced_send(message: Dict[str, Any]) -> None:
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.set_error(f"HTTP {message['status']}")
+                    if context is not None:
+                        message = dict(message)
+                        message["headers"] = list(message.get("headers", [])) + [
+                            (b"traceparent", context.encode("latin-1"))
+                        ]
+                await send(message)
+                
+            await self.app(scope, receive, traced_send)
+
+
+# Shared tracer used by the middleware and planning
+tracer = Tracer()
@@ -0,0 +1,104 @@
+"""Benchmark batched vs. individual planning of concurrently queued missions.
+
+Plans --missions distinct prompts from --workers threads (like planner queue
+workers) against the fake model, once with one model call per mission and
+once with micro-batching, and reports model calls, prompt size and wall time.
+Missions are spread over --users users; only a user's own missions share a
+batch. --upstream-concurrency caps concurrent model calls, like an API quota.
+
+Usage (from the backend directory):
+    python benchmarks/bench_batching.py --missions 32 --workers 16 --upstream-concurrency 2
+"""
+import os
+import sys
+import time
+import atexit
+import shutil
+import tempfile
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class CountingModel:
+    """Counts calls and prompt characters and caps concurrent calls."""
+
+    def __init__(self, inner, concurrency):
+        self.inner = inner
+        self.calls = 0
+        self.prompt_chars = 0
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(concurrency)
+
+    def _stream(self, prompt, **kwargs):
+        with self._slots:
+            yield from self.inner.generate_content(prompt, stream=True, **kwargs)
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        with self._lock:
+            self.calls += 1
+            self.prompt_chars += len(prompt)
+        if stream:
+            return self._stream(prompt, **kwargs)
+        with self._slots:
+            return self.inner.generate_content(prompt, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--missions", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=16, help="Concurrent planner workers")
+    parser.add_argument("--users", type=int, default=1, help="Users the missions belong to")
+    parser.add_argument("--upstream-concurrency", type=int, default=2, help="Concurrent model calls allowed")
+    parser.add_argument("--batch-max", type=int, default=8)
+    parser.add_argument("--batch-wait-ms", type=int, default=50)
+    parser.add_argument("--first-token", type=float, default=0.8, help="Fake per-call latency (s)")
+    parser.add_argument("--step-latency", type=float, default=0.05, help="Fake generation time per step (s)")
+    args = parser.parse_args()
+
+    os.environ["PLANNER_MODEL_BACKEND"] = "fake"
+    os.environ["PLANNER_FAKE_FIRST_TOKEN_S"] = str(args.first_token)
+    os.environ["PLANNER_FAKE_STEP_LATENCY_S"] = str(args.step_latency)
+    os.environ["PLANNER_BATCH_MAX"] = str(args.batch_max)
+    os.environ["PLANNER_BATCH_WAIT_MS"] = str(args.batch_wait_ms)
+    os.environ["PLANNER_BATCH_CONCURRENCY"] = str(args.workers)
+    os.environ["PLANNER_ATTEMPT_THREADS"] = str(args.workers * 2)
+    # Planner calls and the plan cache go to a throwaway database, not backend/db.sqlite
+    db_dir = tempfile.mkdtemp(prefix="bench-db-")
+    atexit.register(shutil.rmtree, db_dir, True)
+    os.environ["DB_FILE"] = os.path.join(db_dir, "db.sqlite")
+
+    import logging
+    logging.disable(logging.WARNING)
+    from app import ai_planner  # noqa: E402
+    from app.db import init_db  # noqa: E402
+    init_db()
+
+    print(f"{'mode':<12} {'calls':>6} {'prompt chars':>13} {'wall (s)':>9} {'plans/s':>8}")
+    for mode, batched in (("individual", False), ("batched", True)):
+        ai_planner.PLANNER_BATCH_ENABLED = batched
+        model = CountingModel(ai_planner._get_model(), args.upstream_concurrency)
+        ai_planner._model = model
+
+        def plan(i):
+            result = ai_planner.plan_from_prompt(
+                f"m-{mode}-{i}", f"Build feature {i} for the {mode} app", f"/tmp/repo-{i % 4}",
+                use_cache=False, use_templates=False, user=f"user-{i % args.users}"
+            )
+            assert len(result["plan"]) >= 2, "planner fell back or returned an empty plan"
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            list(pool.map(plan, range(args.missions)))
+        wall = time.perf_counter() - started
+        ai_planner._model = model.inner
+
+        print(f"{mode:<12} {model.calls:>6} {model.prompt_chars:>13} {wall:>9.2f} {args.missions / wall:>8.1f}")
+
+    print(ai_planner.get_planner_stats()["batching"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Check and benchmark plan repair against a corpus of broken model responses.
+
+Each corpus case lists the number of steps the repair must recover (0 means
+the response must be rejected) and fixes it must report. Exits non-zero if
+any case does not match, then prints per-case repair latency.
+
+Usage (from the backend directory):
+    python benchmarks/bench_plan_repair.py --iterations 200
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ai_planner import parse_plan_response, validate_plan  # noqa: E402
+from app.plan_repair import repair_stats  # noqa: E402
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "plan_repair_corpus.json")
+
+
+def parse_with_fixes(response):
+    """Parse a response, returning (plan, complete, fixes applied)."""
+    before = repair_stats.stats()["by_fix"]
+    try:
+        plan, complete = parse_plan_response(response)
+    except ValueError:
+        return None, False, []
+    after = repair_stats.stats()["by_fix"]
+    return plan, complete, sorted(fix for fix, count in after.items() if count > before.get(fix, 0))
+
+
+def check(case, plan, fixes):
+    """Return a list of mismatches between a repair result and the case."""
+    problems = []
+    steps = len(plan["plan"]) if plan else 0
+    if steps != case["expect_steps"]:
+        problems.append(f"expected {case['expect_steps']} steps, got {steps}")
+    if plan and not validate_plan(plan):
+        problems.append("repaired plan fails validation")
+    missing = set(case["expect_fixes"]) - set(fixes)
+    if missing:
+        problems.append(f"missing fixes {sorted(missing)} (got {fixes})")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200, help="Repairs timed per case")
+    parser.add_argument("--corpus", default=CORPUS)
+    args = parser.parse_args()
+
+    with open(args.corpus, "r", encoding="utf-8") as f:
+        cases = json.load(f)
+
+    logging.disable(logging.ERROR)
+
+    failures = 0
+    print(f"{'case':<30} {'steps':>5} {'complete':>8} {'p50 (us)':>9}  fixes")
+    for case in cases:
+        plan, complete, fixes = parse_with_fixes(case["response"])
+
+        timings = []
+        for _ in range(args.iterations):
+            started = time.perf_counter()
+            try:
+                parse_plan_response(case["response"])
+            except ValueError:
+                pass
+            timings.append(time.perf_counter() - started)
+
+        problems = check(case, plan, fixes)
+        if problems:
+            failures += 1
+        status = "FAIL " + "; ".join(problems) if problems else ", ".join(fixes)
+        steps = len(plan["plan"]) if plan else 0
+        print(f"{case['name']:<30} {steps:>5} {str(complete):>8} "
+              f"{statistics.median(timings) * 1e6:>9.1f}  {status}")
+
+    recovered = sum(1 for case in cases if case["expect_steps"])
+    print(f"\n{len(cases) - failures}/{len(cases)} cases as expected "
+          f"({recovered} recoverable responses in the corpus)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
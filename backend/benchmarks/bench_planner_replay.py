@@ -0,0 +1,106 @@
+"""Replay recorded planner calls for repeatable planner latency numbers.
+
+Runs every prompt in a recording through plan_from_prompt with the replay
+backend (no network), reporting time-to-first-step and full-plan latency
+and checking that repeated runs produce identical plans. Use --record-fake
+to create a recording from the fake model first.
+
+Usage (from the backend directory):
+    # Record real calls while the server runs with PLANNER_MODEL_BACKEND=record
+    python benchmarks/bench_planner_replay.py --recording recordings/planner.jsonl --timing
+    python benchmarks/bench_planner_replay.py --record-fake 10 --recording /tmp/fake.jsonl --timing
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import shutil
+import tempfile
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PROMPTS = [
+    "Build a todo app", "Add a login page", "Create a calculator component",
+    "Add dark mode to the settings screen", "Write unit tests for the api client",
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def record_fake(path, count):
+    """Write a recording of the fake model answering count prompts."""
+    from app.model_backends import RecordingModel
+    from app.fake_model import FakeStreamingModel
+    from app.ai_planner import build_planner_prompt
+
+    model = RecordingModel(FakeStreamingModel(first_token_latency_s=0.2, step_latency_s=0.15), path)
+    for i in range(count):
+        prompt = build_planner_prompt(f"{PROMPTS[i % len(PROMPTS)]} #{i}", f"/tmp/repo-{i % 3}")
+        for _ in model.generate_content(prompt, stream=True):
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--recording", required=True, help="JSONL recording file")
+    parser.add_argument("--runs", type=int, default=2, help="Replays of the whole recording")
+    parser.add_argument("--timing", action="store_true", help="Reproduce recorded latency")
+    parser.add_argument("--speed", type=float, default=1.0, help="Timing multiplier")
+    parser.add_argument("--record-fake", type=int, default=0, help="First record N fake planner calls")
+    args = parser.parse_args()
+
+    os.environ["PLANNER_MODEL_BACKEND"] = "replay"
+    os.environ["PLANNER_RECORDING_FILE"] = args.recording
+    os.environ["PLANNER_REPLAY_TIMING"] = "true" if args.timing else "false"
+    os.environ["PLANNER_REPLAY_SPEED"] = str(args.speed)
+    # Planner calls and the plan cache go to a throwaway database, not backend/db.sqlite
+    db_dir = tempfile.mkdtemp(prefix="bench-db-")
+    atexit.register(shutil.rmtree, db_dir, True)
+    os.environ["DB_FILE"] = os.path.join(db_dir, "db.sqlite")
+
+    if args.record_fake:
+        if os.path.exists(args.recording):
+            os.remove(args.recording)
+        record_fake(args.recording, args.record_fake)
+
+    from app.ai_planner import plan_from_prompt  # noqa: E402
+    from app.fake_model import prompt_fields  # noqa: E402
+    from app.db import init_db  # noqa: E402
+    init_db()
+
+    with open(args.recording, "r", encoding="utf-8") as f:
+        prompts = [prompt_fields(json.loads(line)["prompt"]) for line in f if line.strip()]
+
+    first_steps, totals, plans = [], [], {}
+    mismatches = 0
+    for run in range(args.runs):
+        for i, (user_prompt, repo_path) in enumerate(prompts):
+            first = []
+            started = time.perf_counter()
+            plan = plan_from_prompt(f"m-replay{i}", user_prompt, repo_path, use_cache=False,
+                                    on_step=lambda step: first.append(time.perf_counter()),
+                                    use_templates=False)
+            finished = time.perf_counter()
+            first_steps.append((first[0] if first else finished) - started)
+            totals.append(finished - started)
+            if run == 0:
+                plans[i] = plan
+            elif plan != plans[i]:
+                mismatches += 1
+
+    print(f"{len(prompts)} recorded prompts x {args.runs} runs (timing {'on' if args.timing else 'off'})")
+    for name, values in (("first step", first_steps), ("full plan", totals)):
+        print(f"{name:<12} p50 {statistics.median(values) * 1000:8.1f} ms   "
+              f"p95 {percentile(values, 0.95) * 1000:8.1f} ms")
+    print(f"non-deterministic replays: {mismatches}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
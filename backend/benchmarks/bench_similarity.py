@@ -0,0 +1,87 @@
+"""Benchmark similarity index lookups against a large synthetic prompt corpus.
+
+Usage (from the backend directory):
+    python benchmarks/bench_similarity.py --entries 100000 --queries 2000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import resource
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.similarity_index import SimilarityIndex  # noqa: E402
+from app.plan_cache import normalize_prompt  # noqa: E402
+
+VERBS = ["run", "create", "add", "fix", "build", "refactor", "test", "deploy", "update", "remove"]
+OBJECTS = ["tests", "todo app", "login page", "api client", "calculator", "navbar", "dark mode",
+           "unit tests", "docker setup", "readme", "settings screen", "search bar", "cache layer"]
+TECH = ["react", "next.js", "vue", "fastapi", "django", "express", "swiftui", "flask", "go", "rust"]
+EXTRAS = ["please", "quickly", "with typescript", "and commit", "using npm", "with tailwind", ""]
+REPOS = [f"/Users/dev/Projects/repo-{i}" for i in range(50)]
+
+
+def make_prompt(rng: random.Random, n: int) -> str:
+    """Build a synthetic prompt; the numeric suffix keeps prompts distinct."""
+    return " ".join([
+        rng.choice(VERBS), rng.choice(OBJECTS), "in", rng.choice(TECH), rng.choice(EXTRAS), f"#{n}"
+    ])
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    index = SimilarityIndex(max_entries=args.entries)
+
+    prompts = []
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    for n in range(args.entries):
+        prompt = normalize_prompt(make_prompt(rng, n))
+        repo = rng.choice(REPOS)
+        prompts.append((prompt, repo))
+        index.add(f"k-{n}", prompt, repo)
+    build_s = time.perf_counter() - started
+    # ru_maxrss is KB on Linux, bytes on macOS
+    rss_unit = 1 if sys.platform == "darwin" else 1024
+    rss_growth = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) * rss_unit
+    # Prompts list is benchmark scaffolding, not index memory
+    scaffolding = sum(sys.getsizeof(p) + sys.getsizeof(r) + 64 for p, r in prompts) + sys.getsizeof(prompts)
+
+    latencies = []
+    matches = 0
+    for q in range(args.queries):
+        if q % 2 == 0:
+            # Near-duplicate of a stored prompt: small edit at the end
+            prompt, repo = rng.choice(prompts)
+            text = prompt + " " + rng.choice(["please", "now", "thanks"])
+        else:
+            text, repo = normalize_prompt(make_prompt(rng, args.entries + q)), rng.choice(REPOS)
+        t0 = time.perf_counter()
+        if index.query(text, repo):
+            matches += 1
+        latencies.append((time.perf_counter() - t0) * 1e6)
+
+    print(f"entries:          {len(index)}")
+    print(f"build:            {build_s:.1f}s ({build_s / args.entries * 1e6:.0f}us/insert)")
+    print(f"index memory:     ~{max(0, rss_growth - scaffolding) / 1e6:.1f} MB (RSS growth {rss_growth / 1e6:.1f} MB)")
+    print(f"queries:          {args.queries} ({matches} matched at threshold {index.threshold})")
+    print(f"lookup latency:   p50 {percentile(latencies, 50):.0f}us  "
+          f"p95 {percentile(latencies, 95):.0f}us  p99 {percentile(latencies, 99):.0f}us  "
+          f"max {max(latencies):.0f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Benchmark time-to-first-step for streamed vs. buffered plan generation.
+
+Runs the planner offline against the fake streaming model.
+
+Usage (from the backend directory):
+    python benchmarks/bench_streaming.py --runs 5 --step-latency 0.5
+"""
+import os
+import sys
+import time
+import atexit
+import shutil
+import tempfile
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--first-token", type=float, default=0.3, help="Fake first-token latency (s)")
+    parser.add_argument("--step-latency", type=float, default=0.5, help="Fake generation time per step (s)")
+    args = parser.parse_args()
+
+    os.environ["PLANNER_MODEL_BACKEND"] = "fake"
+    os.environ["PLANNER_FAKE_FIRST_TOKEN_S"] = str(args.first_token)
+    os.environ["PLANNER_FAKE_STEP_LATENCY_S"] = str(args.step_latency)
+    # Planner calls and the plan cache go to a throwaway database, not backend/db.sqlite
+    db_dir = tempfile.mkdtemp(prefix="bench-db-")
+    atexit.register(shutil.rmtree, db_dir, True)
+    os.environ["DB_FILE"] = os.path.join(db_dir, "db.sqlite")
+
+    from app.ai_planner import plan_from_prompt  # noqa: E402
+    from app.db import init_db  # noqa: E402
+    init_db()
+
+    results = {"buffered": ([], []), "streamed": ([], [])}
+    for run in range(args.runs):
+        for mode, (first_steps, totals) in results.items():
+            first = []
+            started = time.perf_counter()
+            on_step = (lambda step: first.append(time.perf_counter())) if mode == "streamed" else None
+            plan = plan_from_prompt(f"m-bench{run}", "Build a todo app", "/tmp/repo",
+                                    use_cache=False, on_step=on_step)
+            finished = time.perf_counter()
+            # Without streaming the first step is only usable once the whole plan is parsed
+            first_steps.append((first[0] if first else finished) - started)
+            totals.append(finished - started)
+            assert plan["plan"], "planner returned an empty plan"
+
+    print(f"{'mode':<10} {'first step (s)':>15} {'full plan (s)':>15}")
+    for mode, (first_steps, totals) in results.items():
+        print(f"{mode:<10} {statistics.median(first_steps):>15.3f} {statistics.median(totals):>15.3f}")
+
+
+if __name__ == "__main__":
+    main()
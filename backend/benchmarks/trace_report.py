@@ -0,0 +1,199 @@
+"""Critical-path report of a mission trace.
+
+Reads OTLP/JSON lines trace files (the backend's and any mac-client's, see
+TRACING_ENABLED), rebuilds the span tree of one mission and walks its
+critical path: starting from the end of the trace, the path follows the
+child that finished last before the current point, so time spent in spans
+that ran in parallel with the path does not count. The time each span spends
+on the path outside its own children ("self time") is summed by category
+(osascript, sleep, subprocess, HTTP, planner, UI wait, idle) and by span
+name, which shows what actually bounds mission latency.
+
+Spans from different machines are compared by wall clock, so client and
+backend clocks should be in sync.
+
+Usage (from the backend directory):
+    python benchmarks/trace_report.py traces/backend.jsonl ../mac-client/traces/client.jsonl --mission m-abc123
+"""
+import os
+import sys
+import json
+import argparse
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.tracing import mission_trace_context, parse_traceparent, KIND_SERVER  # noqa: E402
+
+ROOT_ID = "root"
+
+
+class Node:
+    """A span and its children."""
+
+    def __init__(self, span_id, name, service, kind, start_ns, end_ns, attributes, parent_id=None):
+        self.span_id = span_id
+        self.name = name
+        self.service = service
+        self.kind = kind
+        self.start_ns = start_ns
+        self.end_ns = end_ns
+        self.attributes = attributes
+        self.parent_id = parent_id
+        self.children = []
+
+
+def attribute_value(value):
+    for kind in ("stringValue", "boolValue", "doubleValue"):
+        if kind in value:
+            return value[kind]
+    if "intValue" in value:
+        return int(value["intValue"])
+    return None
+
+
+def load_spans(paths):
+    """Yield (service, span) pairs from OTLP/JSON lines files."""
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"{path}:{number}: skipping invalid line", file=sys.stderr)
+                    continue
+                for resource_spans in request.get("resourceSpans", []):
+                    resource = {
+                        item["key"]: attribute_value(item["value"])
+                        for item in resource_spans.get("resource", {}).get("attributes", [])
+                    }
+                    service = resource.get("service.name", "unknown")
+                    for scope_spans in resource_spans.get("scopeSpans", []):
+                        for span in scope_spans.get("spans", []):
+                            yield service, span
+
+
+def select_trace(paths, mission_id=None, trace_id=None):
+    """Return the nodes of one trace: the mission's, the given one or the latest."""
+    if mission_id:
+        trace_id = parse_traceparent(mission_trace_context(mission_id))[0]
+
+    traces = defaultdict(list)
+    for service, span in load_spans(paths):
+        attributes = {item["key"]: attribute_value(item["value"]) for item in span.get("attributes", [])}
+        node = Node(
+            span["spanId"], span["name"], service, span.get("kind", 1),
+            int(span["startTimeUnixNano"]), int(span["endTimeUnixNano"]), attributes, span.get("parentSpanId")
+        )
+        traces[span["traceId"]].append(node)
+
+    if mission_id:
+        # A client that could not reach the backend traced the mission under its own trace ID
+        for key in list(traces):
+            if key != trace_id and any(node.attributes.get("mission.id") == mission_id for node in traces[key]):
+                traces[trace_id].extend(traces.pop(key))
+    elif trace_id is None and traces:
+        trace_id = max(traces, key=lambda key: max(node.end_ns for node in traces[key]))
+    return trace_id, traces.get(trace_id, [])
+
+
+def build_tree(nodes):
+    """Link nodes to their parents under a synthetic root spanning the whole trace."""
+    by_id = {node.span_id: node for node in nodes}
+    root = Node(ROOT_ID, "(trace)", "", 1, min(node.start_ns for node in nodes),
+                max(node.end_ns for node in nodes), {})
+    for node in nodes:
+        parent = by_id.get(node.parent_id, root)
+        if parent is node:
+            parent = root
+        parent.children.append(node)
+    return root
+
+
+def critical_path(node, end_ns, segments):
+    """Append (node, self_ns) segments of the critical path of node up to end_ns."""
+    cursor = min(node.end_ns, end_ns)
+    while True:
+        candidates = [child for child in node.children if child.start_ns < cursor]
+        if not candidates:
+            break
+        child = max(candidates, key=lambda c: (min(c.end_ns, cursor), c.start_ns))
+        child_end = min(child.end_ns, cursor)
+        if cursor > child_end:
+            segments.append((node, cursor - child_end))
+        critical_path(child, child_end, segments)
+        cursor = max(child.start_ns, node.start_ns)
+        if child.start_ns <= node.start_ns:
+            break
+    if cursor > node.start_ns:
+        segments.append((node, cursor - node.start_ns))
+    return segments
+
+
+def category(node):
+    """Group a span into what the time was spent on."""
+    if node.span_id == ROOT_ID or node.name == "mission":
+        return "idle"
+    if node.name == "sleep":
+        return "sleep"
+    if node.name == "osascript":
+        return "osascript"
+    if node.name == "wait_for_kiro":
+        return "ui wait"
+    if node.name == "plan_mission" or node.name.startswith("planner"):
+        return "planner"
+    if node.name.startswith("HTTP ") or node.kind == KIND_SERVER:
+        return "http"
+    if node.name == "subprocess" or "process.exit_code" in node.attributes:
+        return "subprocess"
+    return "other"
+
+
+def print_table(title, totals, path_ns, top):
+    print(f"\n{title:<40} {'ms':>10} {'%':>6}")
+    for key, value in sorted(totals.items(), key=lambda item: -item[1])[:top]:
+        print(f"{key:<40} {value / 1e6:10.1f} {value * 100 / path_ns:6.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="+", help="OTLP/JSON lines trace files")
+    parser.add_argument("--mission", help="Mission ID (default: the latest trace)")
+    parser.add_argument("--trace-id", help="Trace ID, instead of --mission")
+    parser.add_argument("--top", type=int, default=15, help="Span names listed")
+    parser.add_argument("--show-path", action="store_true", help="Print every critical path segment")
+    args = parser.parse_args()
+
+    trace_id, nodes = select_trace(args.files, args.mission, args.trace_id)
+    if not nodes:
+        print("No spans found", file=sys.stderr)
+        sys.exit(1)
+
+    root = build_tree(nodes)
+    segments = critical_path(root, root.end_ns, [])
+    path_ns = sum(self_ns for _, self_ns in segments) or 1
+
+    by_category = defaultdict(int)
+    by_name = defaultdict(int)
+    for node, self_ns in segments:
+        by_category[category(node)] += self_ns
+        by_name[f"{node.service}: {node.name}" if node.service else node.name] += self_ns
+
+    services = sorted({node.service for node in nodes})
+    print(f"trace {trace_id}: {len(nodes)} spans from {', '.join(services)}")
+    print(f"critical path {path_ns / 1e6:.1f} ms, {len(segments)} segments")
+    print_table("category (self time on critical path)", by_category, path_ns, len(by_category))
+    print_table("span", by_name, path_ns, args.top)
+
+    if args.show_path:
+        print("\ncritical path (latest first):")
+        for node, self_ns in segments:
+            where = f" {node.attributes['code.function']}:{node.attributes['code.lineno']}" \
+                if "code.function" in node.attributes else ""
+            print(f"  {self_ns / 1e6:9.1f} ms  {category(node):<10} {node.name}{where}")
+
+
+if __name__ == "__main__":
+    main()
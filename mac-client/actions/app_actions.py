@@ -1,7 +1,7 @@
 """Application control actions."""
 import subprocess
-import time
 from utils.logger import setup_logger
+from utils.tracing import traced_run, traced_sleep
 
 logger = setup_logger("app_actions")
 
@@ -19,7 +19,7 @@ def open_app(app_name: str) -> bool:
         logger.info(f"Opening app: {app_name}")
         
         # Use macOS 'open' command
-        result = subprocess.run(
+        result = traced_run(
             ["open", "-a", app_name],
             capture_output=True,
             text=True,
@@ -28,7 +28,7 @@ def open_app(app_name: str) -> bool:
         
         if result.returncode == 0:
             logger.info(f"Successfully opened {app_name}")
-            time.sleep(2)  # Wait for app to launch
+            traced_sleep(2)  # Wait for app to launch
             return True
         else:
             logger.error(f"Failed to open {app_name}: {result.stderr}")
@@ -52,7 +52,7 @@ def check_if_open(app_name: str) -> bool:
         True if running, False otherwise
     """
     try:
-        result = subprocess.run(
+        result = traced_run(
             ["pgrep", "-x", app_name],
             capture_output=True,
             text=True
@@ -81,7 +81,7 @@ def focus_app(app_name: str) -> bool:
         
         # Use AppleScript to activate the app
         script = f'tell application "{app_name}" to activate'
-        result = subprocess.run(
+        result = traced_run(
             ["osascript", "-e", script],
             capture_output=True,
             text=True,
@@ -90,7 +90,7 @@ def focus_app(app_name: str) -> bool:
         
         if result.returncode == 0:
             logger.info(f"Successfully focused {app_name}")
-            time.sleep(1)  # Wait for focus
+            traced_sleep(1)  # Wait for focus
             return True
         else:
             logger.error(f"Failed to focus {app_name}: {result.stderr}")
@@ -2,20 +2,72 @@
 import subprocess
 import os
 import time
-from typing import Tuple, Optional
+import signal
+import codecs
+import threading
+from typing import Tuple, Optional, Callable
+from config import CAPTURE_HEAD_BYTES, CAPTURE_TAIL_BYTES
+from utils.capture_buffer import CaptureBuffer
 from utils.logger import setup_logger
 
 logger = setup_logger("file_actions")
 
+READ_CHUNK_BYTES = 65536
+# A background process that inherited the pipes can keep them open after the command exits
+READER_JOIN_TIMEOUT = 5  # seconds
 
-def run_command(cmd: str, cwd: str = None, timeout: int = 60) -> Tuple[int, str, str]:
+
+def _read_stream(pipe, name: str, capture: CaptureBuffer, on_output: Optional[Callable[[str, str], None]],
+                 done: threading.Event):
+    """Read a command's pipe as output arrives until it is closed.
+    
+    Once done is set (run_command returned) the pipe is still drained, but
+    nothing is passed to on_output any more.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    while True:
+        data = pipe.read1(READ_CHUNK_BYTES)
+        text = decoder.decode(data, final=not data)
+        if text and not done.is_set():
+            capture.write(text)
+            if on_output is not None:
+                try:
+                    on_output(name, text)
+                except Exception as e:
+                    logger.error(f"Output callback failed: {e}")
+        if not data:
+            break
+    pipe.close()
+
+
+def _kill_group(process: subprocess.Popen):
+    """Kill a command and every process it started (it leads its own session)."""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    except OSError as e:
+        logger.error(f"Failed to kill process group {process.pid}: {e}")
+        process.kill()
+
+
+def run_command(cmd: str, cwd: str = None, timeout: int = 60,
+                on_output: Optional[Callable[[str, str], None]] = None) -> Tuple[int, str, str]:
     """Run a shell command.
     
+    stdout and stderr are read as the command produces them and passed to
+    on_output, so long builds and test runs can be followed live. Only the
+    first CAPTURE_HEAD_BYTES and last CAPTURE_TAIL_BYTES of each stream are
+    kept for the return value. The command runs in its own session, so a
+    timeout kills everything it started, not only the shell.
+    
     Args:
         cmd: Command to run
         cwd: Working directory (optional)
         timeout: Timeout in seconds
-        
+        on_output: Optional callback(stream, text) called with every chunk
+            of output ("stdout" or "stderr")
+            
     Returns:
         Tuple of (return_code, stdout, stderr)
     """
@@ -23,31 +75,63 @@ def run_command(cmd: str, cwd: str = None, timeout: int = 60) -> Tuple[int, str,
         logger.info(f"Running command: {cmd}")
         if cwd:
             logger.info(f"Working directory: {cwd}")
-        
+            
         # Run command
-        result = subprocess.run(
+        process = subprocess.Popen(
             cmd,
             shell=True,
             cwd=cwd,
-            capture_output=True,
-            text=True,
-            timeout=timeout
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=True
         )
+        captures = {
+            "stdout": CaptureBuffer(CAPTURE_HEAD_BYTES, CAPTURE_TAIL_BYTES),
+            "stderr": CaptureBuffer(CAPTURE_HEAD_BYTES, CAPTURE_TAIL_BYTES)
+        }
+        done = threading.Event()
+        readers = [
+            threading.Thread(target=_read_stream, args=(process.stdout, "stdout", captures["stdout"], on_output, done),
+                             name="command-stdout", daemon=True),
+            threading.Thread(target=_read_stream, args=(process.stderr, "stderr", captures["stderr"], on_output, done),
+                             name="command-stderr", daemon=True)
+        ]
+        for reader in readers:
+            reader.start()
+            
+        try:
+            return_code = process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            _kill_group(process)
+            process.wait()
+            for reader in readers:
+                reader.join(READER_JOIN_TIMEOUT)
+            done.set()
+            logger.error(f"Command timed out after {timeout}s")
+            if on_output is not None:
+                on_output("stderr", f"Command timed out after {timeout}s\n")
+            stderr = captures["stderr"].text()
+            return -1, captures["stdout"].text(), f"{stderr}Command timed out after {timeout}s"
+            
+        for reader in readers:
+            reader.join(READER_JOIN_TIMEOUT)
+        # A background process may still hold the pipes; its output no longer belongs to this step
+        done.set()
+        stdout, stderr = captures["stdout"].text(), captures["stderr"].text()
+        
+        logger.info(f"Command completed with return code: {return_code}")
+        
+        if stdout:
+            logger.info(f"stdout: {stdout[:200]}...")  # Log first 200 chars
+        if stderr:
+            logger.warning(f"stderr: {stderr[:200]}...")
+            
+        return return_code, stdout, stderr
         
-        logger.info(f"Command completed with return code: {result.returncode}")
-        
-        if result.stdout:
-            logger.info(f"stdout: {result.stdout[:200]}...")  # Log first 200 chars
-        if result.stderr:
-            logger.warning(f"stderr: {result.stderr[:200]}...")
-        
-        return result.returncode, result.stdout, result.stderr
-        
-    except subprocess.TimeoutExpired:
-        logger.error(f"Command timed out after {timeout}s")
-        return -1, "", f"Command timed out after {timeout}s"
     except Exception as e:
         logger.error(f"Error running command: {e}")
+        if on_output is not None:
+            on_output("stderr", f"{e}\n")
         return -1, "", str(e)
 
 
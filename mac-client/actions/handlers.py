@@ -0,0 +1,122 @@
+"""Handlers for the plan action types, registered in actions.registry.
+
+Importing this module registers every handler. Each handler takes the
+action and the mission's repository path and returns a result dict with
+"success" and optionally "stdout", "stderr", "screenshot", "error" and
+"cached" (served from the result cache).
+"""
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+from actions.registry import register, get_handler, GUI, CPU, IO
+from actions.app_actions import open_app
+from actions.screenshot_actions import take_screenshot
+from actions.file_actions import run_command, wait_for_file
+from actions.input_actions import open_project_in_kiro, prompt_kiro_ai, wait_for_kiro_completion
+from utils.result_cache import result_cache
+from utils.tracing import tracer
+from utils.logger import setup_logger
+
+logger = setup_logger("action_handlers")
+
+
+@register("open_app", GUI, idempotent=True)
+def handle_open_app(action: Dict[str, Any], repo_path: Optional[str]) -> Dict[str, Any]:
+    app_name = action.get("app")
+    success = open_app(app_name)
+    return {
+        "success": success,
+        "stdout": f"Opened {app_name}" if success else f"Failed to open {app_name}"
+    }
+
+
+@register("screenshot", GUI, idempotent=True)
+def handle_screenshot(action: Dict[str, Any], repo_path: Optional[str]) -> Dict[str, Any]:
+    screenshot = take_screenshot()
+    return {
+        "success": bool(screenshot),
+        "screenshot": screenshot,
+        "stdout": "Screenshot captured" if screenshot else "Failed to capture screenshot"
+    }
+
+
+@register("run_command", CPU, timeout=60, streams_output=True)
+def handle_run_command(action: Dict[str, Any], repo_path: Optional[str],
+                       on_output: Optional[Callable[[str, str], None]] = None) -> Dict[str, Any]:
+    cwd = action.get("cwd", repo_path)
+    key = result_cache.key_for(action, cwd, repo_path)
+    cached = result_cache.get(key) if key else None
+    if cached is not None:
+        logger.info(f"Command result served from cache: {action.get('cmd')}")
+        if on_output is not None:
+            for stream in ("stdout", "stderr"):
+                if cached[stream]:
+                    on_output(stream, cached[stream])
+        return {
+            "success": cached["return_code"] == 0,
+            "stdout": cached["stdout"],
+            "stderr": cached["stderr"],
+            "cached": True
+        }
+        
+    timeout = get_handler("run_command").timeout_for(action)
+    started = time.perf_counter()
+    with tracer.span("subprocess", attributes={"process.command_line": action.get("cmd")}) as span:
+        return_code, stdout, stderr = run_command(action.get("cmd"), cwd=cwd, timeout=timeout, on_output=on_output)
+        span.set_attribute("process.exit_code", return_code)
+    # -1 is a timeout or a failure to start, which says nothing about the tree
+    if key and return_code != -1:
+        result_cache.put(key, action["cmd"], cwd, return_code, stdout, stderr, time.perf_counter() - started)
+    return {"success": return_code == 0, "stdout": stdout, "stderr": stderr}
+
+
+@register("open_project", GUI, idempotent=True)
+def handle_open_project(action: Dict[str, Any], repo_path: Optional[str]) -> Dict[str, Any]:
+    path = action.get("path")
+    success = open_project_in_kiro(path)
+    return {
+        "success": success,
+        "stdout": f"Opened project: {path}" if success else f"Failed to open project: {path}"
+    }
+
+
+@register("prompt_kiro_ai", GUI, timeout=30)
+def handle_prompt_kiro_ai(action: Dict[str, Any], repo_path: Optional[str]) -> Dict[str, Any]:
+    # The wait for Kiro to finish is done by StepExecutor.wait_after_prompt
+    prompt = action.get("prompt")
+    success = prompt_kiro_ai(prompt)
+    return {
+        "success": success,
+        "stdout": f"Sent prompt to Kiro AI: {prompt}" if success else "Failed to send prompt to Kiro AI"
+    }
+
+
+@register("wait_for_marker", IO, idempotent=True)
+def handle_wait_for_marker(action: Dict[str, Any], repo_path: Optional[str]) -> Dict[str, Any]:
+    # Will implement in Step 6
+    marker = action.get("marker")
+    logger.info(f"Wait for marker: {marker} (not yet implemented)")
+    return {"success": True, "stdout": f"Waiting for marker {marker} (simulated)"}
+
+
+@register("wait_for_file", IO, timeout=60, idempotent=True)
+def handle_wait_for_file(action: Dict[str, Any], repo_path: Optional[str]) -> Dict[str, Any]:
+    file_path = action.get("file_path")
+    if not file_path:
+        return {"success": False, "error": "wait_for_file action requires 'file_path' parameter"}
+        
+    # Make path absolute if repo_path is provided
+    if repo_path and not os.path.isabs(file_path):
+        file_path = os.path.join(repo_path, file_path)
+    found = wait_for_file(file_path, timeout=get_handler("wait_for_file").timeout_for(action))
+    return {"success": found, "stdout": f"File {'found' if found else 'not found'}: {file_path}"}
+
+
+@register("wait_for_kiro_completion", IO, timeout=30, idempotent=True)
+def handle_wait_for_kiro_completion(action: Dict[str, Any], repo_path: Optional[str]) -> Dict[str, Any]:
+    success = wait_for_kiro_completion(
+        repo_path=repo_path,
+        timeout=get_handler("wait_for_kiro_completion").timeout_for(action),
+        expected_files=action.get("expected_files")
+    )
+    return {"success": success, "stdout": "Kiro.app completion wait finished"}
@@ -5,6 +5,7 @@ import json
 import os
 from typing import Optional
 from utils.logger import setup_logger
+from utils.tracing import traced_run, traced_sleep
 
 logger = setup_logger("input_actions")
 
@@ -28,12 +29,12 @@ def open_project_in_kiro(path: str) -> bool:
         
         # Ensure Kiro is running and focused first
         focus_script = 'tell application "Kiro" to activate'
-        subprocess.run(
+        traced_run(
             ["osascript", "-e", focus_script],
             capture_output=True,
             timeout=5
         )
-        time.sleep(0.2)  # Reduced from 0.5s
+        traced_sleep(0.2)  # Reduced from 0.5s
         
         # Use AppleScript to open project in Kiro
         # Use POSIX file to handle paths properly
@@ -47,7 +48,7 @@ def open_project_in_kiro(path: str) -> bool:
         end tell
         '''
         
-        result = subprocess.run(
+        result = traced_run(
             ["osascript", "-e", script],
             capture_output=True,
             text=True,
@@ -56,7 +57,7 @@ def open_project_in_kiro(path: str) -> bool:
         
         if result.returncode == 0:
             logger.info(f"Successfully opened project: {path}")
-            time.sleep(0.5)  # Reduced from 0.8s - Wait for project to load
+            traced_sleep(0.5)  # Reduced from 0.8s - Wait for project to load
             return True
         else:
             error_msg = result.stderr or result.stdout
@@ -86,12 +87,12 @@ def open_project_via_shortcut(path: str) -> bool:
         
         # First, ensure Kiro is focused
         focus_script = 'tell application "Kiro" to activate'
-        subprocess.run(
+        traced_run(
             ["osascript", "-e", focus_script],
             capture_output=True,
             timeout=5
         )
-        time.sleep(0.5)
+        traced_sleep(0.5)
         
         # Press Cmd+O
         shortcut_script = '''
@@ -101,12 +102,12 @@ def open_project_via_shortcut(path: str) -> bool:
             end tell
         end tell
         '''
-        subprocess.run(
+        traced_run(
             ["osascript", "-e", shortcut_script],
             capture_output=True,
             timeout=5
         )
-        time.sleep(0.5)  # Reduced from 1s
+        traced_sleep(0.5)  # Reduced from 1s
         
         # Type the path and press Enter
         # Note: This assumes the file dialog is open
@@ -119,7 +120,7 @@ def open_project_via_shortcut(path: str) -> bool:
             end tell
         end tell
         '''
-        result = subprocess.run(
+        result = traced_run(
             ["osascript", "-e", path_script],
             capture_output=True,
             text=True,
@@ -127,7 +128,7 @@ def open_project_via_shortcut(path: str) -> bool:
         )
         
         if result.returncode == 0:
-            time.sleep(0.5)  # Reduced from 1s
+            traced_sleep(0.5)  # Reduced from 1s
             return True
         return False
         
@@ -168,7 +169,7 @@ def prompt_kiro_ai(prompt: str) -> bool:
         
         # First, ensure Kiro is focused and active
         focus_script = 'tell application "Kiro" to activate'
-        focus_result = subprocess.run(
+        focus_result = traced_run(
             ["osascript", "-e", focus_script],
             capture_output=True,
             text=True,
@@ -186,16 +187,16 @@ def prompt_kiro_ai(prompt: str) -> bool:
         if not _is_kiro_frontmost():
             logger.info("Kiro not frontmost, using Option+Tab to switch")
             switch_to_kiro_with_option_tab()
-            time.sleep(0.8)  # Wait for app switch to complete
+            traced_sleep(0.8)  # Wait for app switch to complete
         else:
-            time.sleep(0.5)  # Wait for Kiro to come to front
+            traced_sleep(0.5)  # Wait for Kiro to come to front
         
         # Check if chat is already open before opening it
         chat_already_open = _is_chat_open()
         if chat_already_open:
             logger.info("Chat panel already open, skipping Cmd+L")
             _chat_open_state = True
-            time.sleep(0.3)  # Small delay to ensure UI is ready
+            traced_sleep(0.3)  # Small delay to ensure UI is ready
         else:
             # Open chat with Cmd+L only if not already open
             logger.info("Opening chat panel with Cmd+L")
@@ -211,7 +212,7 @@ def prompt_kiro_ai(prompt: str) -> bool:
             end tell
             '''
             
-            open_result = subprocess.run(
+            open_result = traced_run(
                 ["osascript", "-e", open_chat_script],
                 capture_output=True,
                 text=True,
@@ -221,7 +222,7 @@ def prompt_kiro_ai(prompt: str) -> bool:
             if open_result.returncode != 0:
                 logger.warning(f"Failed to open chat: {open_result.stderr}")
             
-            time.sleep(0.8)  # Wait for chat panel to fully open
+            traced_sleep(0.8)  # Wait for chat panel to fully open
             _chat_open_state = True
         
         # Now find and click the chat input field
@@ -270,7 +271,7 @@ def prompt_kiro_ai(prompt: str) -> bool:
         end tell
         '''
         
-        click_result = subprocess.run(
+        click_result = traced_run(
             ["osascript", "-e", find_input_script],
             capture_output=True,
             text=True,
@@ -282,9 +283,9 @@ def prompt_kiro_ai(prompt: str) -> bool:
             logger.warning("Input field detection may have failed, ensuring Kiro focus")
             if not _is_kiro_frontmost():
                 switch_to_kiro_with_option_tab()
-                time.sleep(0.3)
+                traced_sleep(0.3)
         
-        time.sleep(0.1)  # Reduced from 0.3s - Small delay after clicking
+        traced_sleep(0.1)  # Reduced from 0.3s - Small delay after clicking
         
         # Escape special characters for AppleScript
         # AppleScript string escaping: backslash, quotes, and newlines
@@ -316,7 +317,7 @@ def prompt_kiro_ai(prompt: str) -> bool:
         end tell
         '''
         
-        result = subprocess.run(
+        result = traced_run(
             ["osascript", "-e", type_script],
             capture_output=True,
             text=True,
@@ -327,7 +328,7 @@ def prompt_kiro_ai(prompt: str) -> bool:
             logger.info("Successfully sent prompt to Kiro AI")
             # Wait longer for Kiro to process the prompt before allowing next action
             logger.info("Waiting for Kiro to process prompt...")
-            time.sleep(3.0)  # Increased wait time to ensure prompt is processed
+            traced_sleep(3.0)  # Increased wait time to ensure prompt is processed
             return True
         else:
             error_msg = result.stderr or result.stdout
@@ -363,12 +364,12 @@ def prompt_kiro_ai_alternative(prompt: str) -> bool:
         
         # Focus Kiro first
         focus_script = 'tell application "Kiro" to activate'
-        subprocess.run(
+        traced_run(
             ["osascript", "-e", focus_script],
             capture_output=True,
             timeout=5
         )
-        time.sleep(0.8)  # Wait for app to focus
+        traced_sleep(0.8)  # Wait for app to focus
         
         # Check if chat is already open before opening it
         chat_already_open = _is_chat_open()
@@ -387,16 +388,16 @@ def prompt_kiro_ai_alternative(prompt: str) -> bool:
             end tell
             '''
             
-            open_chat_result = subprocess.run(
+            open_chat_result = traced_run(
                 ["osascript", "-e", open_chat_script],
                 capture_output=True,
                 timeout=10
             )
             
-            time.sleep(0.8)  # Wait for chat to open
+            traced_sleep(0.8)  # Wait for chat to open
         else:
             logger.info("Chat panel already open, skipping Cmd+L (alternative method)")
-            time.sleep(0.3)  # Small delay to ensure UI is ready
+            traced_sleep(0.3)  # Small delay to ensure UI is ready
         
         # Enhanced method: Find input field by searching through all UI elements
         # Look for text fields, text areas, or scroll areas that contain input fields
@@ -477,7 +478,7 @@ def prompt_kiro_ai_alternative(prompt: str) -> bool:
         end tell
         '''
         
-        click_result = subprocess.run(
+        click_result = traced_run(
             ["osascript", "-e", find_and_click_script],
             capture_output=True,
             text=True,
@@ -487,7 +488,7 @@ def prompt_kiro_ai_alternative(prompt: str) -> bool:
         if click_result.returncode != 0:
             logger.warning(f"Clicking failed: {click_result.stderr}")
         
-        time.sleep(0.2)  # Reduced from 0.5s
+        traced_sleep(0.2)  # Reduced from 0.5s
         
         # Now try typing
         escaped_prompt = (
@@ -517,7 +518,7 @@ def prompt_kiro_ai_alternative(prompt: str) -> bool:
         end tell
         '''
         
-        result = subprocess.run(
+        result = traced_run(
             ["osascript", "-e", type_script],
             capture_output=True,
             text=True,
@@ -528,7 +529,7 @@ def prompt_kiro_ai_alternative(prompt: str) -> bool:
             logger.info("Alternative method succeeded")
             # Wait longer for Kiro to process the prompt
             logger.info("Waiting for Kiro to process prompt...")
-            time.sleep(3.0)  # Increased wait time to ensure prompt is processed
+            traced_sleep(3.0)  # Increased wait time to ensure prompt is processed
             return True
         else:
             logger.error(f"Alternative method failed: {result.stderr}")
@@ -666,7 +667,7 @@ def _is_kiro_frontmost() -> bool:
         end tell
         '''
         
-        result = subprocess.run(
+        result = traced_run(
             ["osascript", "-e", script],
             capture_output=True,
             text=True,
@@ -716,7 +717,7 @@ def _is_chat_open() -> bool:
         end tell
         '''
         
-        result = subprocess.run(
+        result = traced_run(
             ["osascript", "-e", script],
             capture_output=True,
             text=True,
@@ -754,7 +755,7 @@ def switch_to_kiro_with_option_tab() -> bool:
         end tell
         '''
         
-        result = subprocess.run(
+        result = traced_run(
             ["osascript", "-e", script],
             capture_output=True,
             text=True,
@@ -762,7 +763,7 @@ def switch_to_kiro_with_option_tab() -> bool:
         )
         
         if result.returncode == 0:
-            time.sleep(0.5)  # Wait for app switch to complete
+            traced_sleep(0.5)  # Wait for app switch to complete
             return True
         return False
         
@@ -787,12 +788,12 @@ def _send_kiro_shortcut(key: str, command: bool = False, shift: bool = False, co
     try:
         # Focus Kiro first
         focus_script = 'tell application "Kiro" to activate'
-        subprocess.run(
+        traced_run(
             ["osascript", "-e", focus_script],
             capture_output=True,
             timeout=5
         )
-        time.sleep(0.2)  # Reduced from 0.3s
+        traced_sleep(0.2)  # Reduced from 0.3s
         
         # Build the modifier string
         modifiers = []
@@ -820,7 +821,7 @@ def _send_kiro_shortcut(key: str, command: bool = False, shift: bool = False, co
         end tell
         '''
         
-        result = subprocess.run(
+        result = traced_run(
             ["osascript", "-e", script],
             capture_output=True,
             text=True,
@@ -850,12 +851,12 @@ def _send_kiro_keycode(keycode: int, command: bool = False, shift: bool = False,
     try:
         # Focus Kiro first
         focus_script = 'tell application "Kiro" to activate'
-        subprocess.run(
+        traced_run(
             ["osascript", "-e", focus_script],
             capture_output=True,
             timeout=5
         )
-        time.sleep(0.2)  # Reduced from 0.3s
+        traced_sleep(0.2)  # Reduced from 0.3s
         
         # Build the modifier string
         modifiers = []
@@ -880,7 +881,7 @@ def _send_kiro_keycode(keycode: int, command: bool = False, shift: bool = False,
         end tell
         '''
         
-        result = subprocess.run(
+        result = traced_run(
             ["osascript", "-e", script],
             capture_output=True,
             text=True,
@@ -933,7 +934,7 @@ def wait_for_kiro_completion(repo_path: Optional[str] = None, timeout: int = 30,
         # Increased wait time to ensure proper completion
         wait_time = min(timeout, 12)  # Increased from 8s to 12s for default wait
         logger.info(f"Waiting {wait_time}s for Kiro.app to process...")
-        time.sleep(wait_time)
+        traced_sleep(wait_time)
         
         # If repo_path is provided, check for common project files
         if repo_path:
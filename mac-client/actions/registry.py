@@ -0,0 +1,88 @@
+"""Registry mapping action types to their handlers."""
+from typing import Any, Callable, Dict, Optional
+
+# Resource classes: what an action occupies while it runs
+GUI = "gui"  # screen, keyboard or mouse; one action at a time per machine
+CPU = "cpu"  # local computation (builds, tests)
+IO = "io"    # waiting on files or other processes
+
+
+class ActionHandler:
+    """An action type's implementation and how it may be scheduled."""
+    
+    def __init__(self, action_type: str, run: Callable, resource: str,
+                 timeout: Optional[float] = None, idempotent: bool = False,
+                 streams_output: bool = False):
+        """Describe an action handler.
+        
+        Args:
+            action_type: Plan action type handled, e.g. "run_command"
+            run: Callable(action, repo_path) returning the action result dict
+            resource: GUI, CPU or IO
+            timeout: Default timeout in seconds for handlers that wait (an
+                action's "timeout" overrides it)
+            idempotent: Whether running the action twice has the same effect as once
+            streams_output: Whether run also accepts an on_output(stream, text)
+                callback for live output
+        """
+        self.action_type = action_type
+        self.run = run
+        self.resource = resource
+        self.timeout = timeout
+        self.idempotent = idempotent
+        self.streams_output = streams_output
+    
+    def timeout_for(self, action: Dict[str, Any]) -> Optional[float]:
+        """Return the timeout of one action."""
+        return action.get("timeout", self.timeout)
+    
+    def idempotent_for(self, action: Dict[str, Any]) -> bool:
+        """Return whether one action may safely run again.
+        
+        A run_command the plan marks "cache": true only reads the repository.
+        """
+        return self.idempotent or action.get("cache") is True
+
+
+ACTION_HANDLERS: Dict[str, ActionHandler] = {}
+
+
+def register(action_type: str, resource: str, timeout: Optional[float] = None,
+             idempotent: bool = False, streams_output: bool = False) -> Callable:
+    """Decorator registering a function as the handler of an action type.
+    
+    Args:
+        action_type: Plan action type handled
+        resource: GUI, CPU or IO
+        timeout: Default timeout in seconds
+        idempotent: Whether the action may safely run twice
+        streams_output: Whether the handler accepts an on_output callback
+        
+    Returns:
+        Decorator returning the function unchanged
+    """
+    def decorator(run: Callable) -> Callable:
+        ACTION_HANDLERS[action_type] = ActionHandler(
+            action_type, run, resource, timeout, idempotent, streams_output
+        )
+        return run
+    return decorator
+
+
+def get_handler(action_type: str) -> Optional[ActionHandler]:
+    """Return the handler of an action type, or None if it is unknown."""
+    return ACTION_HANDLERS.get(action_type)
+
+
+def step_is_idempotent(step: Dict[str, Any]) -> bool:
+    """Return whether every action of a step may safely run again."""
+    for action in step.get("actions", []):
+        handler = get_handler(action.get("type"))
+        if handler is None or not handler.idempotent_for(action):
+            return False
+    return True
+
+
+def action_types(resource: str) -> set:
+    """Return the registered action types using a resource class."""
+    return {name for name, handler in ACTION_HANDLERS.items() if handler.resource == resource}
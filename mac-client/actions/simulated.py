@@ -0,0 +1,84 @@
+"""Stand-in handlers for the plan action types, registered when SIMULATE_ACTIONS is on.
+
+Imported instead of actions.handlers, so nothing macOS-specific is loaded.
+Each stand-in keeps the resource class, timeout and result shape of the real
+handler, but only sleeps for a latency sampled by utils.simulation and
+returns synthetic output of a sampled size.
+"""
+from typing import Any, Callable, Dict, Optional
+from actions.registry import register, get_handler, GUI, CPU, IO
+from utils.simulation import simulator
+from utils.logger import setup_logger
+
+logger = setup_logger("simulated_actions")
+
+
+def _simulate(action_type: str, action: Dict[str, Any], stdout: str, failure: str) -> Dict[str, Any]:
+    timed_out = simulator.wait(action_type, get_handler(action_type).timeout_for(action))
+    success = not timed_out and not simulator.fails(action_type)
+    return {"success": success, "stdout": stdout if success else failure}
+
+
+@register("open_app", GUI, idempotent=True)
+def simulate_open_app(action: Dict[str, Any], repo_path: Optional[str]) -> Dict[str, Any]:
+    app_name = action.get("app")
+    return _simulate("open_app", action, f"Opened {app_name}", f"Failed to open {app_name}")
+
+
+@register("screenshot", GUI, idempotent=True)
+def simulate_screenshot(action: Dict[str, Any], repo_path: Optional[str]) -> Dict[str, Any]:
+    result = _simulate("screenshot", action, "Screenshot captured", "Failed to capture screenshot")
+    if result["success"]:
+        result["screenshot"] = simulator.screenshot(int(simulator.sample("screenshot", "screenshot_bytes")))
+    return result
+
+
+@register("run_command", CPU, timeout=60, streams_output=True)
+def simulate_run_command(action: Dict[str, Any], repo_path: Optional[str],
+                         on_output: Optional[Callable[[str, str], None]] = None) -> Dict[str, Any]:
+    timeout = get_handler("run_command").timeout_for(action)
+    latency = simulator.latency("run_command", timeout)
+    outputs = {
+        "stdout": simulator.output(int(simulator.sample("run_command", "stdout_bytes")), "stdout"),
+        "stderr": simulator.output(int(simulator.sample("run_command", "stderr_bytes")), "stderr")
+    }
+    if latency["timed_out"]:
+        outputs["stderr"] += f"Command timed out after {timeout} seconds"
+    simulator.stream_output(latency["seconds"], outputs, on_output)
+    
+    success = not latency["timed_out"] and not simulator.fails("run_command")
+    logger.info(f"Simulated command {action.get('cmd')!r}: {'ok' if success else 'failed'}")
+    return {"success": success, **outputs}
+
+
+@register("open_project", GUI, idempotent=True)
+def simulate_open_project(action: Dict[str, Any], repo_path: Optional[str]) -> Dict[str, Any]:
+    path = action.get("path")
+    return _simulate("open_project", action, f"Opened project: {path}", f"Failed to open project: {path}")
+
+
+@register("prompt_kiro_ai", GUI, timeout=30)
+def simulate_prompt_kiro_ai(action: Dict[str, Any], repo_path: Optional[str]) -> Dict[str, Any]:
+    prompt = action.get("prompt")
+    return _simulate("prompt_kiro_ai", action, f"Sent prompt to Kiro AI: {prompt}", "Failed to send prompt to Kiro AI")
+
+
+@register("wait_for_marker", IO, idempotent=True)
+def simulate_wait_for_marker(action: Dict[str, Any], repo_path: Optional[str]) -> Dict[str, Any]:
+    marker = action.get("marker")
+    return _simulate("wait_for_marker", action, f"Waiting for marker {marker} (simulated)", f"Marker {marker} not seen")
+
+
+@register("wait_for_file", IO, timeout=60, idempotent=True)
+def simulate_wait_for_file(action: Dict[str, Any], repo_path: Optional[str]) -> Dict[str, Any]:
+    file_path = action.get("file_path")
+    if not file_path:
+        return {"success": False, "error": "wait_for_file action requires 'file_path' parameter"}
+    return _simulate("wait_for_file", action, f"File found: {file_path}", f"File not found: {file_path}")
+
+
+@register("wait_for_kiro_completion", IO, timeout=30, idempotent=True)
+def simulate_wait_for_kiro_completion(action: Dict[str, Any], repo_path: Optional[str]) -> Dict[str, Any]:
+    return _simulate(
+        "wait_for_kiro_completion", action, "Kiro.app completion wait finished", "Kiro.app completion wait timed out"
+    )
@@ -0,0 +1,254 @@
+"""Async Mission Controller - Runs several missions concurrently on one machine."""
+import time
+import asyncio
+from typing import Dict, List, Optional
+from utils.async_http_client import AsyncHTTPClient
+from utils.http_client import HTTPClient
+from utils.event_outbox import EventOutbox
+from utils.log_streamer import LogStreamer
+from utils.latency_stats import LatencyStats
+from utils.capture_buffer import spill_prefix
+from utils.tracing import tracer, traced_async_sleep
+from utils.logger import setup_logger
+from agents.step_executor import StepExecutor
+from config import OUTBOX_DRAIN_TIMEOUT, OUTBOX_PATH, LOG_STREAMING
+
+logger = setup_logger("async_mission_controller")
+
+
+class AsyncMissionController:
+    """Runs one asyncio task per mission.
+    
+    GUI actions of all missions are serialized by a shared lock, while
+    commands and waits (``npm test``, waiting for Kiro to finish) of
+    different missions overlap.
+    """
+    
+    def __init__(self, mac_id: str, backend_url: str, poll_interval: int = 3, outbox_path: str = OUTBOX_PATH,
+                 stats: Optional[LatencyStats] = None):
+        """Initialize the controller.
+        
+        Args:
+            mac_id: macOS client identifier
+            backend_url: Backend server URL
+            poll_interval: Polling interval in seconds
+            outbox_path: SQLite file of the event outbox
+            stats: Latency stats shared by the controller's HTTP clients
+        """
+        self.mac_id = mac_id
+        self.backend_url = backend_url
+        self.poll_interval = poll_interval
+        self.stats = stats if stats is not None else LatencyStats()
+        self.outbox = EventOutbox(HTTPClient(backend_url, stats=self.stats), path=outbox_path)
+        self.log_streamer = LogStreamer(self.outbox.http_client) if LOG_STREAMING else None
+        self.step_executor = StepExecutor()
+        self.http_client: Optional[AsyncHTTPClient] = None
+        self.ui_lock: Optional[asyncio.Lock] = None
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.running = False
+    
+    def add_mission(self, mission_id: str) -> asyncio.Task:
+        """Start running a mission; must be called from the event loop.
+        
+        Args:
+            mission_id: Mission identifier
+            
+        Returns:
+            The mission's task
+        """
+        task = self.tasks.get(mission_id)
+        if task is None or task.done():
+            task = asyncio.create_task(self.run_mission(mission_id), name=f"mission-{mission_id}")
+            self.tasks[mission_id] = task
+            logger.info(f"Mission added: {mission_id} ({len(self.tasks)} missions)")
+        return task
+    
+    def report_event(self, mission_id: str, step_id: str, status: str, **kwargs):
+        """Queue an event for the backend (see EventOutbox).
+        
+        Args:
+            mission_id: Mission identifier
+            step_id: Step identifier
+            status: Event status (running, completed, failed)
+            **kwargs: Additional event data (stdout, stderr, screenshots, etc.)
+        """
+        self.outbox.append(mission_id, {
+            "mac_id": self.mac_id,
+            "step_id": step_id,
+            "status": status,
+            **kwargs
+        })
+        logger.info(f"[{mission_id}] Event queued: {step_id} - {status}")
+    
+    async def run_mission(self, mission_id: str) -> int:
+        """Poll and execute one mission's steps until it is complete.
+        
+        Args:
+            mission_id: Mission identifier
+            
+        Returns:
+            Number of steps run
+        """
+        parent = await self.http_client.get_trace_context(mission_id) if tracer.enabled else None
+        attributes = {"mission.id": mission_id, "mac.id": self.mac_id, "execution.mode": "async"}
+        with tracer.span("mission", attributes=attributes, parent=parent):
+            return await self._poll_mission(mission_id)
+    
+    async def _poll_mission(self, mission_id: str) -> int:
+        mission = await self.http_client.get_mission(mission_id)
+        repo_path = mission.get("repo_path") if mission else None
+        logger.info(f"[{mission_id}] Repository path: {repo_path}")
+        
+        # Events left over from a previous run must arrive before next_step is trusted
+        if not await asyncio.to_thread(self.outbox.drain, mission_id, OUTBOX_DRAIN_TIMEOUT):
+            logger.warning(f"[{mission_id}] {self.outbox.pending(mission_id)} events from a previous run not sent yet")
+            
+        finished_steps: List[str] = []
+        prefetch: Optional[asyncio.Task] = None
+        consecutive_empty_polls = 0
+        max_empty_polls = 3
+        idle_time = 0.0
+        totals = {"network": 0.0, "execution": 0.0, "ui_wait": 0.0, "idle": 0.0}
+        
+        while self.running:
+            try:
+                fetch_started = time.perf_counter()
+                if prefetch is not None:
+                    data = await prefetch
+                    prefetch = None
+                else:
+                    data = await self.http_client.get_next_step_response(mission_id, self.mac_id, finished_steps)
+                network_time = time.perf_counter() - fetch_started
+                totals["network"] += network_time
+                
+                status = data.get("status") if data else None
+                step = data.get("step") if data else None
+                
+                if step:
+                    consecutive_empty_polls = 0
+                    step_id = step.get("step_id")
+                    logger.info(f"[{mission_id}] Executing step: {step_id} - {step.get('title')}")
+                    
+                    self.report_event(mission_id, step_id, "running")
+                    
+                    execution_started = time.perf_counter()
+                    on_output = self.log_streamer.writer(mission_id, step_id) if self.log_streamer else None
+                    try:
+                        with tracer.span("step", attributes={"step.id": step_id, "step.title": step.get("title")}) as span:
+                            results = await self.step_executor.execute_async(
+                                step, repo_path, self.ui_lock, on_output, spill_prefix(mission_id, step_id)
+                            )
+                            span.set_attribute("step.success", results["success"])
+                            if not results["success"]:
+                                span.set_error("; ".join(results["errors"])[:500])
+                    finally:
+                        if self.log_streamer:
+                            self.log_streamer.finish(mission_id, step_id, timeout=0)
+                    execution_time = time.perf_counter() - execution_started
+                    
+                    self.report_event(
+                        mission_id,
+                        step_id,
+                        "completed" if results["success"] else "failed",
+                        stdout=results.get("stdout", ""),
+                        stderr=results.get("stderr", ""),
+                        screenshots=results.get("screenshots", []),
+                        action_timings=results.get("action_timings", []),
+                        output=results.get("output")
+                    )
+                    
+                    # Fetch the next step while the result is being sent
+                    finished_steps.append(step_id)
+                    prefetch = asyncio.create_task(
+                        self.http_client.get_next_step_response(mission_id, self.mac_id, list(finished_steps))
+                    )
+                    
+                    logger.info(
+                        f"[{mission_id}] Step {step_id} timing: network {network_time:.2f}s, "
+                        f"execution {execution_time:.2f}s (ui wait {results['ui_wait']:.2f}s), "
+                        f"idle {idle_time:.2f}s"
+                    )
+                    totals["execution"] += execution_time
+                    totals["ui_wait"] += results["ui_wait"]
+                    idle_time = 0.0
+                    continue
+                    
+                if status == "planning":
+                    # Plan still being generated - not an empty poll
+                    consecutive_empty_polls = 0
+                    wait_time = max(1, self.poll_interval // 2)
+                elif data is None:
+                    # Backend unreachable - an error, not a sign the mission is done
+                    wait_time = self.poll_interval * 2
+                else:
+                    consecutive_empty_polls += 1
+                    if consecutive_empty_polls >= max_empty_polls:
+                        logger.info(
+                            f"[{mission_id}] Mission complete! ({len(finished_steps)} steps: "
+                            f"network {totals['network']:.2f}s, execution {totals['execution']:.2f}s, "
+                            f"ui wait {totals['ui_wait']:.2f}s, idle {totals['idle']:.2f}s)"
+                        )
+                        return len(finished_steps)
+                    # Progressive backoff when waiting for steps
+                    wait_time = self.poll_interval + (consecutive_empty_polls * 2)
+                    
+                await traced_async_sleep(wait_time)
+                idle_time += wait_time
+                totals["idle"] += wait_time
+                
+            except asyncio.CancelledError:
+                if prefetch is not None:
+                    prefetch.cancel()
+                raise
+            except Exception as e:
+                logger.error(f"[{mission_id}] Error in mission loop: {e}")
+                prefetch = None
+                error_wait = min(self.poll_interval * 2, 10)
+                await traced_async_sleep(error_wait)
+                idle_time += error_wait
+                totals["idle"] += error_wait
+        return len(finished_steps)
+    
+    async def run(self, mission_ids: List[str]):
+        """Run missions concurrently until all of them are complete.
+        
+        Args:
+            mission_ids: Missions to run
+        """
+        await self.start()
+        logger.info(f"Async Mission Controller started with {len(mission_ids)} missions")
+        
+        try:
+            for mission_id in mission_ids:
+                self.add_mission(mission_id)
+            # Missions may be added while others run
+            while self.running and any(not task.done() for task in self.tasks.values()):
+                await asyncio.wait([task for task in self.tasks.values() if not task.done()])
+        finally:
+            await self.close()
+    
+    async def start(self):
+        """Open the backend connection and start sending events; must be called from the event loop."""
+        self.running = True
+        self.http_client = AsyncHTTPClient(self.backend_url, stats=self.stats)
+        self.ui_lock = asyncio.Lock()
+        self.outbox.start()
+        if self.log_streamer:
+            self.log_streamer.start()
+    
+    async def close(self):
+        """Cancel running missions, send the remaining events and close the connection."""
+        for task in self.tasks.values():
+            task.cancel()
+        await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+        await self.http_client.close()
+        if self.log_streamer:
+            await asyncio.to_thread(self.log_streamer.close)
+        await asyncio.to_thread(self.outbox.close)
+        logger.info("Async Mission Controller stopped")
+    
+    def stop(self):
+        """Stop all missions."""
+        self.running = False
+        for task in self.tasks.values():
+            task.cancel()
@@ -1,31 +1,56 @@
 """Mission Controller - Main orchestrator that polls backend."""
 import time
-from typing import Optional
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, List
 from utils.http_client import HTTPClient
+from utils.event_outbox import EventOutbox
+from utils.log_streamer import LogStreamer
+from utils.capture_buffer import spill_prefix
+from utils.tracing import tracer, traced_sleep
 from utils.logger import setup_logger
 from agents.step_executor import StepExecutor
+from actions.registry import step_is_idempotent
+from config import OUTBOX_DRAIN_TIMEOUT, EXECUTION_MODE, LOG_STREAMING
 
 logger = setup_logger("mission_controller")
 
+# Longest wait before resynchronizing with a cursor that disagrees with the local plan
+MAX_RESYNC_WAIT = 30  # seconds
+
 
 class MissionController:
     """Main orchestrator that polls backend and manages mission flow."""
     
-    def __init__(self, mac_id: str, backend_url: str, poll_interval: int = 3):
+    def __init__(self, mac_id: str, backend_url: str, poll_interval: int = 3,
+                 execution_mode: str = EXECUTION_MODE):
         """Initialize Mission Controller.
         
         Args:
             mac_id: macOS client identifier
             backend_url: Backend server URL
             poll_interval: Polling interval in seconds
+            execution_mode: "poll" to ask the backend for every step, "plan"
+                to download the plan once and run it locally
         """
         self.mac_id = mac_id
         self.poll_interval = poll_interval
+        self.execution_mode = execution_mode
         self.http_client = HTTPClient(backend_url)
+        self.outbox = EventOutbox(self.http_client)
+        self.log_streamer = LogStreamer(self.http_client) if LOG_STREAMING else None
         self.step_executor = StepExecutor()
         self.current_mission_id: Optional[str] = None
         self.current_repo_path: Optional[str] = None
+        self.mission_status: Optional[str] = None
         self.running = False
+        
+        # Step IDs run in this mission; excluded from next_step until their events are stored
+        self.finished_steps: List[str] = []
+        self._fetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="next-step")
+        self._prefetch: Optional[Future] = None
+        # Span of the mission being run, active in the controller thread
+        self.mission_span = None
     
     def set_mission(self, mission_id: str):
         """Set the current mission to execute.
@@ -34,6 +59,8 @@ class MissionController:
             mission_id: Mission identifier
         """
         self.current_mission_id = mission_id
+        self.finished_steps = []
+        self._prefetch = None
         logger.info(f"Mission set: {mission_id}")
         
         # Get mission details to extract repo_path
@@ -42,27 +69,56 @@ class MissionController:
             self.current_repo_path = mission.get("repo_path")
             logger.info(f"Repository path: {self.current_repo_path}")
     
+    def prefetch_next_step(self):
+        """Start fetching the next step in the background."""
+        if self.current_mission_id and self._prefetch is None:
+            # Run in the current context so the request is traced as part of the mission
+            self._prefetch = self._fetcher.submit(
+                contextvars.copy_context().run, self.http_client.get_next_step_response,
+                self.current_mission_id, self.mac_id, list(self.finished_steps)
+            )
+    
     def get_next_step(self) -> Optional[dict]:
         """Get the next step from backend.
         
+        Uses the prefetched response if one was started.
+        
         Returns:
             Step data or None if no steps remaining
         """
         if not self.current_mission_id:
             logger.warning("No mission set")
             return None
-        
-        step = self.http_client.get_next_step(self.current_mission_id, self.mac_id)
+            
+        if self._prefetch is not None:
+            data = self._prefetch.result()
+            self._prefetch = None
+        else:
+            data = self.http_client.get_next_step_response(
+                self.current_mission_id, self.mac_id, self.finished_steps
+            )
+        if not data:
+            # A failed call says nothing about the mission; don't keep the last status
+            self.mission_status = None
+            return None
+            
+        self.mission_status = data.get("status")
+        step = data.get("step")
         
         if step:
             logger.info(f"Next step: {step.get('step_id')} - {step.get('title')}")
+        elif self.mission_status == "planning":
+            logger.info("Mission is still being planned")
         else:
             logger.info("No steps remaining")
-        
+            
         return step
     
     def report_event(self, step_id: str, status: str, **kwargs):
-        """Report an event to the backend.
+        """Queue an event for the backend.
+        
+        The event is stored in the local outbox and sent in the background,
+        so a backend failure delays it instead of losing it.
         
         Args:
             step_id: Step identifier
@@ -76,25 +132,98 @@ class MissionController:
             **kwargs
         }
         
-        success = self.http_client.post_event(self.current_mission_id, event_data)
+        self.outbox.append(self.current_mission_id, event_data)
+        logger.info(f"Event queued: {step_id} - {status}")
+    
+    def start_mission_span(self):
+        """Start the current mission's span, child of the trace context the backend hands out."""
+        if not tracer.enabled or not self.current_mission_id or self.mission_span is not None:
+            return
+        self.mission_span = tracer.start_span(
+            "mission",
+            attributes={"mission.id": self.current_mission_id, "mac.id": self.mac_id, "execution.mode": self.execution_mode},
+            parent=self.http_client.get_trace_context(self.current_mission_id)
+        )
+        tracer.set_current(self.mission_span)
+    
+    def end_mission_span(self, error: Optional[str] = None):
+        """End the current mission's span, if any."""
+        if self.mission_span is None:
+            return
+        self.mission_span.set_attribute("mission.steps", len(self.finished_steps))
+        if error:
+            self.mission_span.set_error(error)
+        self.mission_span.end()
+        self.mission_span = None
+        tracer.set_current(None)
+    
+    def execute_step(self, step: dict) -> dict:
+        """Execute a step, streaming command output to the backend as it runs.
         
-        if success:
-            logger.info(f"Event reported: {step_id} - {status}")
-        else:
-            logger.error(f"Failed to report event: {step_id}")
+        Args:
+            step: Step data
+            
+        Returns:
+            Step execution results
+        """
+        with tracer.span("step", attributes={"step.id": step.get("step_id"), "step.title": step.get("title")}) as span:
+            results = self._execute_step(step)
+            span.set_attribute("step.success", results["success"])
+            if not results["success"]:
+                span.set_error("; ".join(results["errors"])[:500])
+            return results
+    
+    def _execute_step(self, step: dict) -> dict:
+        mission_id, step_id = self.current_mission_id, step.get("step_id")
+        spill_to = spill_prefix(mission_id, step_id)
+        if self.log_streamer is None:
+            return self.step_executor.execute(step, self.current_repo_path, spill_to=spill_to)
+            
+        try:
+            return self.step_executor.execute(
+                step, self.current_repo_path, on_output=self.log_streamer.writer(mission_id, step_id),
+                spill_to=spill_to
+            )
+        finally:
+            # Remaining output is uploaded in the background
+            self.log_streamer.finish(mission_id, step_id, timeout=0)
     
     def run(self):
-        """Main polling loop with adaptive intervals."""
+        """Run the current mission in the configured execution mode."""
+        if self.execution_mode == "plan":
+            self.run_plan()
+        else:
+            self.run_poll()
+    
+    def run_poll(self):
+        """Main polling loop with adaptive intervals.
+        
+        Events are sent by the outbox in the background, and the next step is
+        prefetched as soon as a step finishes, so network round trips overlap
+        with reporting instead of adding to mission wall time.
+        """
         self.running = True
+        self.outbox.start()
+        if self.log_streamer:
+            self.log_streamer.start()
         logger.info(f"Mission Controller started (polling every {self.poll_interval}s)")
         
+        # Events left over from a previous run must arrive before next_step is trusted
+        if self.current_mission_id and not self.outbox.drain(self.current_mission_id, OUTBOX_DRAIN_TIMEOUT):
+            logger.warning(f"{self.outbox.pending(self.current_mission_id)} events from a previous run not sent yet")
+        self.start_mission_span()
+            
         consecutive_empty_polls = 0
         max_empty_polls = 3
+        idle_time = 0.0
+        totals = {"network": 0.0, "execution": 0.0, "idle": 0.0}
         
         while self.running:
             try:
                 # Get next step
+                fetch_started = time.perf_counter()
                 step = self.get_next_step()
+                network_time = time.perf_counter() - fetch_started
                 
                 if step:
                     # Reset empty poll counter when we get a step
@@ -107,44 +236,67 @@ class MissionController:
                     self.report_event(step_id, "running")
                     
                     # Execute step actions
-                    results = self.step_executor.execute(step, self.current_repo_path)
+                    execution_started = time.perf_counter()
+                    results = self.execute_step(step)
+                    execution_time = time.perf_counter() - execution_started
                     
                     # Report step completed or failed
-                    if results["success"]:
-                        self.report_event(
-                            step_id,
-                            "completed",
-                            stdout=results.get("stdout", ""),
-                            stderr=results.get("stderr", ""),
-                            screenshots=results.get("screenshots", [])
-                        )
-                    else:
-                        self.report_event(
-                            step_id,
-                            "failed",
-                            stdout=results.get("stdout", ""),
-                            stderr=results.get("stderr", ""),
-                            screenshots=results.get("screenshots", [])
-                        )
-                    
-                    # Shorter wait after executing a step
+                    self.report_event(
+                        step_id,
+                        "completed" if results["success"] else "failed",
+                        stdout=results.get("stdout", ""),
+                        stderr=results.get("stderr", ""),
+                        screenshots=results.get("screenshots", []),
+                        action_timings=results.get("action_timings", []),
+                        output=results.get("output")
+                    )
+                    
+                    # Fetch the next step while the result is being sent
+                    self.finished_steps.append(step_id)
+                    self.prefetch_next_step()
+                    
+                    logger.info(
+                        f"Step {step_id} timing: network {network_time:.2f}s, "
+                        f"execution {execution_time:.2f}s, idle {idle_time:.2f}s"
+                    )
+                    totals["network"] += network_time
+                    totals["execution"] += execution_time
+                    idle_time = 0.0
+                    continue
+                    
+                totals["network"] += network_time
+                if self.mission_status == "planning":
+                    # Plan still being generated - not an empty poll
+                    consecutive_empty_polls = 0
                     wait_time = max(1, self.poll_interval // 2)
+                elif self.mission_status is None:
+                    # Backend unreachable - an error, not a sign the mission is done
+                    wait_time = self.poll_interval * 2
                 else:
                     # No steps remaining - use adaptive waiting
                     consecutive_empty_polls += 1
                     
                     if consecutive_empty_polls >= max_empty_polls:
                         if self.current_mission_id:
-                            logger.info("Mission complete!")
+                            logger.info(
+                                f"Mission complete! ({len(self.finished_steps)} steps: "
+                                f"network {totals['network']:.2f}s, execution {totals['execution']:.2f}s, "
+                                f"idle {totals['idle']:.2f}s)"
+                            )
+                            logger.info(f"Backend latency: {self.http_client.stats.summary()}")
+                            self.end_mission_span()
                             self.current_mission_id = None
+                            totals = {"network": 0.0, "execution": 0.0, "idle": 0.0}
                         # Longer wait when no steps available
                         wait_time = self.poll_interval * 2
                     else:
                         # Progressive backoff when waiting for steps
                         wait_time = self.poll_interval + (consecutive_empty_polls * 2)
-                
+                        
                 # Wait before next poll
-                time.sleep(wait_time)
+                traced_sleep(wait_time)
+                idle_time += wait_time
+                totals["idle"] += wait_time
                 
             except KeyboardInterrupt:
                 logger.info("Shutting down...")
@@ -152,11 +304,187 @@ class MissionController:
                 break
             except Exception as e:
                 logger.error(f"Error in main loop: {e}")
+                self._prefetch = None
                 # Exponential backoff on errors
                 error_wait = min(self.poll_interval * 2, 10)
-                time.sleep(error_wait)
+                traced_sleep(error_wait)
+                idle_time += error_wait
+                totals["idle"] += error_wait
+    
+    def run_plan(self):
+        """Run the current mission from a plan downloaded once.
+        
+        The plan is fetched from /steps and revalidated with its ETag only
+        while the mission is still being planned. Steps are iterated locally
+        and only their results are reported, so a step costs no round trip
+        besides the (background) event post. The client resynchronizes with
+        the server cursor on start, after the backend was unreachable and
+        when an acknowledged event batch reports a different plan ETag.
+        """
+        self.running = True
+        self.outbox.start()
+        if self.log_streamer:
+            self.log_streamer.start()
+        mission_id = self.current_mission_id
+        logger.info(f"Mission Controller started in plan mode for {mission_id}")
+        
+        # Events left over from a previous run must arrive before the cursor is trusted
+        if mission_id and not self.outbox.drain(mission_id, OUTBOX_DRAIN_TIMEOUT):
+            logger.warning(f"{self.outbox.pending(mission_id)} events from a previous run not sent yet")
+        self.start_mission_span()
+            
+        steps: List[dict] = []
+        done = set()
+        etag: Optional[str] = None
+        resync = True
+        failures_seen = self.outbox.failed_flushes
+        ack_seen = self.outbox.plan_etags.get(mission_id)
+        idle_time = 0.0
+        totals = {"network": 0.0, "execution": 0.0, "idle": 0.0}
+        mismatches = 0
+        
+        while self.running and self.current_mission_id:
+            try:
+                # Reconnected after the backend was unreachable: events may have raced other clients
+                if self.outbox.failed_flushes != failures_seen and not self.outbox.pending(mission_id):
+                    logger.info("Backend reachable again, resynchronizing")
+                    failures_seen = self.outbox.failed_flushes
+                    resync = True
+                # The backend acknowledged events against a plan that is not ours
+                ack = self.outbox.plan_etags.get(mission_id)
+                if ack != ack_seen:
+                    ack_seen = ack
+                    if ack != etag:
+                        logger.info("Plan changed on the backend, resynchronizing")
+                        resync = True
+                        
+                network_time = 0.0
+                if resync:
+                    fetch_started = time.perf_counter()
+                    cursor = self.http_client.get_cursor(mission_id)
+                    fetched = None
+                    if cursor is not None and cursor["etag"] != etag:
+                        fetched = self.http_client.get_steps(mission_id, etag)
+                    network_time = time.perf_counter() - fetch_started
+                    totals["network"] += network_time
+                    if cursor is None or (cursor["etag"] != etag and fetched is None):
+                        raise ConnectionError("backend unreachable")
+                    if fetched is not None and fetched[0] is not None:
+                        data, etag = fetched
+                        steps = data.get("plan", [])
+                        self.mission_status = data.get("status")
+                    # Steps whose events are still queued locally are done too
+                    done = set(cursor["completed"]) | set(self.finished_steps)
+                    resync = False
+                    logger.info(f"Resynchronized: {len(done)}/{len(steps)} steps done, next {cursor['next_step_id']}")
+                    
+                step = next((s for s in steps if s.get("step_id") not in done), None)
+                if step:
+                    step_id = step.get("step_id")
+                    logger.info(f"Executing step: {step_id} - {step.get('title')}")
+                    
+                    execution_started = time.perf_counter()
+                    results = self.execute_step(step)
+                    execution_time = time.perf_counter() - execution_started
+                    
+                    # Only the result is reported; the step is known locally
+                    self.report_event(
+                        step_id,
+                        "completed" if results["success"] else "failed",
+                        stdout=results.get("stdout", ""),
+                        stderr=results.get("stderr", ""),
+                        screenshots=results.get("screenshots", []),
+                        action_timings=results.get("action_timings", []),
+                        output=results.get("output")
+                    )
+                    self.finished_steps.append(step_id)
+                    done.add(step_id)
+                    
+                    logger.info(
+                        f"Step {step_id} timing: network {network_time:.2f}s, "
+                        f"execution {execution_time:.2f}s, idle {idle_time:.2f}s"
+                    )
+                    totals["execution"] += execution_time
+                    idle_time = 0.0
+                    mismatches = 0
+                    continue
+                    
+                if self.mission_status == "planning":
+                    # More steps may still be streamed into the plan
+                    wait_time = max(1, self.poll_interval // 2)
+                    traced_sleep(wait_time)
+                    idle_time += wait_time
+                    totals["idle"] += wait_time
+                    
+                    fetch_started = time.perf_counter()
+                    fetched = self.http_client.get_steps(mission_id, etag)
+                    totals["network"] += time.perf_counter() - fetch_started
+                    if fetched is None:
+                        raise ConnectionError("backend unreachable")
+                    if fetched[0] is not None:
+                        data, etag = fetched
+                        steps = data.get("plan", [])
+                        self.mission_status = data.get("status")
+                    continue
+                    
+                # All steps ran locally; the mission is complete once the backend has the results
+                if not self.outbox.drain(mission_id, OUTBOX_DRAIN_TIMEOUT):
+                    logger.warning(f"{self.outbox.pending(mission_id)} events not sent yet, waiting")
+                    continue
+                cursor = self.http_client.get_cursor(mission_id)
+                if cursor is None:
+                    raise ConnectionError("backend unreachable")
+                if cursor["etag"] != etag or cursor["next_step_id"]:
+                    # Plan changed or a step is missing on the server
+                    missing = cursor["next_step_id"]
+                    if cursor["etag"] == etag and missing in self.finished_steps:
+                        # Its event never reached the backend (e.g. dropped with a rejected batch)
+                        lost = next((s for s in steps if s.get("step_id") == missing), None)
+                        if lost is not None and step_is_idempotent(lost):
+                            logger.warning(f"Backend has no result for step {missing}, running it again")
+                            self.finished_steps.remove(missing)
+                        else:
+                            # Running it again would repeat its side effects (a commit, a Kiro prompt)
+                            logger.error(f"Backend has no result for step {missing}, reporting it failed")
+                            self.report_event(
+                                missing, "failed",
+                                stderr="Step result was lost and the step is not safe to run again"
+                            )
+                    mismatches += 1
+                    wait_time = min(self.poll_interval * mismatches, MAX_RESYNC_WAIT)
+                    traced_sleep(wait_time)
+                    idle_time += wait_time
+                    totals["idle"] += wait_time
+                    resync = True
+                    continue
+                    
+                logger.info(
+                    f"Mission complete! ({len(self.finished_steps)} steps: "
+                    f"network {totals['network']:.2f}s, execution {totals['execution']:.2f}s, "
+                    f"idle {totals['idle']:.2f}s)"
+                )
+                logger.info(f"Backend latency: {self.http_client.stats.summary()}")
+                self.end_mission_span()
+                self.current_mission_id = None
+                
+            except KeyboardInterrupt:
+                logger.info("Shutting down...")
+                self.running = False
+                break
+            except Exception as e:
+                logger.error(f"Error in plan loop: {e}")
+                resync = True
+                error_wait = min(self.poll_interval * 2, 10)
+                traced_sleep(error_wait)
+                idle_time += error_wait
+                totals["idle"] += error_wait
     
     def stop(self):
         """Stop the mission controller."""
         self.running = False
+        self.end_mission_span(error="stopped")
+        self._fetcher.shutdown(wait=False)
+        if self.log_streamer:
+            self.log_streamer.close()
+        self.outbox.close()
         logger.info("Mission Controller stopped")
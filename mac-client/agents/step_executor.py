@@ -1,31 +1,119 @@
-"""Step Executor - Executes step actions sequentially."""
-import os
-from typing import Dict, Any, List
-from actions.app_actions import open_app, focus_app, check_if_open
-from actions.screenshot_actions import take_screenshot
-from actions.file_actions import run_command
-from actions.input_actions import open_project_in_kiro, prompt_kiro_ai, wait_for_kiro_completion
+"""Step Executor - Executes step actions in order or as a dependency graph."""
+import time
+import heapq
+import asyncio
+import contextvars
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, List, Optional, Set, Tuple, Callable
+from config import STEP_MAX_PARALLEL, CAPTURE_HEAD_BYTES, CAPTURE_TAIL_BYTES, SIMULATE_ACTIONS
+if SIMULATE_ACTIONS:
+    from actions import simulated  # noqa: F401 (registers stand-in handlers, see utils/simulation.py)
+else:
+    from actions import handlers  # noqa: F401 (registers the action handlers)
+from actions.registry import get_handler, action_types, GUI
+from utils.capture_buffer import StepCapture
+from utils.tracing import tracer
 from utils.logger import setup_logger
 
 logger = setup_logger("step_executor")
 
+# Actions that drive the screen, keyboard or mouse; only one mission may run them at a time
+GUI_ACTIONS = action_types(GUI)
+
+
+def build_action_graph(actions: List[Dict[str, Any]]) -> Optional[Tuple[List[Set[int]], List[int]]]:
+    """Build the dependency graph of a step's actions.
+    
+    Actions may carry an "id" and a "depends_on" list of action IDs. Steps
+    without any depends_on run strictly in order, as before.
+    
+    Args:
+        actions: The step's actions
+        
+    Returns:
+        Tuple of (dependencies, gui_lane): the indices each action waits for,
+        and the GUI actions in the order they must run one at a time. None if
+        the step runs in order (no dependencies, or a cycle)
+    """
+    if not any(action.get("depends_on") for action in actions):
+        return None
+        
+    ids: Dict[str, int] = {}
+    for i, action in enumerate(actions):
+        if action.get("id") is not None:
+            ids.setdefault(str(action["id"]), i)
+            
+    dependencies: List[Set[int]] = []
+    for i, action in enumerate(actions):
+        wanted = action.get("depends_on") or []
+        if isinstance(wanted, str):
+            wanted = [wanted]
+        found = set()
+        for ref in wanted:
+            j = ids.get(str(ref))
+            if j is None or j == i:
+                logger.warning(f"Ignoring unknown dependency {ref!r} of action {i+1}")
+                continue
+            found.add(j)
+        dependencies.append(found)
+        
+    # Topological order, earliest plan position first among ready actions
+    dependents: List[List[int]] = [[] for _ in actions]
+    indegree = [len(deps) for deps in dependencies]
+    for i, deps in enumerate(dependencies):
+        for j in deps:
+            dependents[j].append(i)
+    ready = [i for i, count in enumerate(indegree) if count == 0]
+    heapq.heapify(ready)
+    order = []
+    while ready:
+        i = heapq.heappop(ready)
+        order.append(i)
+        for k in dependents[i]:
+            indegree[k] -= 1
+            if indegree[k] == 0:
+                heapq.heappush(ready, k)
+    if len(order) != len(actions):
+        logger.warning("Action dependencies form a cycle, running actions in order")
+        return None
+        
+    # Chaining GUI actions in topological order cannot introduce a cycle
+    gui_lane = [i for i in order if actions[i].get("type") in GUI_ACTIONS]
+    return dependencies, gui_lane
+
 
 class StepExecutor:
-    """Executes individual step actions sequentially."""
+    """Executes a step's actions, in order or concurrently along their dependencies."""
     
-    def __init__(self):
-        """Initialize Step Executor."""
+    def __init__(self, max_parallel: int = STEP_MAX_PARALLEL):
+        """Initialize Step Executor.
+        
+        Args:
+            max_parallel: Maximum actions of a step running at the same time
+        """
         self.current_step = None
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_parallel), thread_name_prefix="action")
     
-    def execute(self, step: Dict[str, Any], repo_path: str = None) -> Dict[str, Any]:
+    def execute(self, step: Dict[str, Any], repo_path: str = None,
+                on_output: Optional[Callable[[str, str], None]] = None,
+                spill_to: Optional[str] = None) -> Dict[str, Any]:
         """Execute a step's actions.
         
+        If actions declare depends_on, independent actions run concurrently
+        (see _execute_graph); otherwise they run in order.
+        
         Args:
             step: Step data containing actions to execute
             repo_path: Repository path for commands
-            
+            on_output: Optional callback(stream, text) receiving live output
+                of commands (see LogStreamer)
+            spill_to: Optional path prefix the full output is spilled to
+                (see StepCapture)
+                
         Returns:
-            Dictionary with execution results
+            Dictionary with execution results. "stdout" and "stderr" hold the
+            head and tail of the output, "output" the byte counts per stream
         """
         self.current_step = step
         step_id = step.get("step_id")
@@ -35,142 +123,360 @@ class StepExecutor:
         logger.info(f"Executing step {step_id}: {title}")
         logger.info(f"Actions to execute: {len(actions)}")
         
-        results = {
-            "step_id": step_id,
-            "success": True,
-            "stdout": "",
-            "stderr": "",
-            "screenshots": [],
-            "errors": []
-        }
+        results = self._new_results(step_id)
+        capture = StepCapture(CAPTURE_HEAD_BYTES, CAPTURE_TAIL_BYTES, spill_to)
+        on_output = self._tee(capture, on_output)
         
+        graph = build_action_graph(actions)
+        if graph is not None:
+            self._execute_graph(actions, repo_path, results, graph, capture, on_output=on_output)
+            self._finish_capture(results, capture)
+            logger.info(f"Step {step_id} execution {'succeeded' if results['success'] else 'failed'}")
+            return results
+            
         # Execute each action
         for i, action in enumerate(actions):
             action_type = action.get("type")
             logger.info(f"Action {i+1}/{len(actions)}: {action_type}")
             
             try:
-                action_result = self.execute_action(action, repo_path)
-                
-                # Collect results
-                if action_result.get("stdout"):
-                    results["stdout"] += action_result["stdout"] + "\n"
-                if action_result.get("stderr"):
-                    results["stderr"] += action_result["stderr"] + "\n"
-                if action_result.get("screenshot"):
-                    results["screenshots"].append(action_result["screenshot"])
+                action_result = self.execute_action(action, repo_path, on_output=on_output)
+                self._collect(results, capture, action, action_result)
                 
-                # Check if action failed
-                if not action_result.get("success", True):
-                    results["success"] = False
-                    error_msg = f"Action {action_type} failed: {action_result.get('error', 'Unknown error')}"
-                    results["errors"].append(error_msg)
-                    logger.error(error_msg)
-                    
             except Exception as e:
-                results["success"] = False
-                error_msg = f"Exception in action {action_type}: {str(e)}"
-                results["errors"].append(error_msg)
-                logger.error(error_msg)
-        
+                self._record_exception(results, action, e)
+                
+        self._finish_capture(results, capture)
         logger.info(f"Step {step_id} execution {'succeeded' if results['success'] else 'failed'}")
         return results
     
-    def execute_action(self, action: Dict[str, Any], repo_path: str = None) -> Dict[str, Any]:
-        """Execute a single action.
+    async def execute_async(self, step: Dict[str, Any], repo_path: str = None,
+                            ui_lock: Optional[asyncio.Lock] = None,
+                            on_output: Optional[Callable[[str, str], None]] = None,
+                            spill_to: Optional[str] = None) -> Dict[str, Any]:
+        """Execute a step's actions without blocking the event loop.
+        
+        Actions run in worker threads. A run of consecutive GUI actions holds
+        ui_lock, so only one mission drives the screen at a time and another
+        mission cannot switch windows between e.g. open_project and
+        screenshot. Commands and waits (including the wait after prompting
+        Kiro) run outside the lock and overlap with other missions. Steps
+        whose actions declare depends_on run as a graph in worker threads,
+        taking the lock around each GUI action.
         
         Args:
-            action: Action data
+            step: Step data containing actions to execute
             repo_path: Repository path for commands
+            ui_lock: Lock shared by all missions of this machine
+            on_output: Optional callback(stream, text) receiving live output
+                of commands (called from worker threads)
+            spill_to: Optional path prefix the full output is spilled to
             
         Returns:
-            Dictionary with action results
+            Dictionary with execution results, plus "ui_wait" seconds spent
+            waiting for the lock
         """
-        action_type = action.get("type")
-        result = {"success": True}
+        step_id = step.get("step_id")
+        actions = step.get("actions", [])
+        logger.info(f"Executing step {step_id}: {step.get('title')} ({len(actions)} actions)")
         
-        if action_type == "open_app":
-            app_name = action.get("app")
-            success = open_app(app_name)
-            result["success"] = success
-            result["stdout"] = f"Opened {app_name}" if success else f"Failed to open {app_name}"
-            
-        elif action_type == "screenshot":
-            screenshot = take_screenshot()
-            result["screenshot"] = screenshot
-            result["success"] = bool(screenshot)
-            result["stdout"] = "Screenshot captured" if screenshot else "Failed to capture screenshot"
-            
-        elif action_type == "run_command":
-            cmd = action.get("cmd")
-            cwd = action.get("cwd", repo_path)
-            return_code, stdout, stderr = run_command(cmd, cwd=cwd)
-            result["success"] = return_code == 0
-            result["stdout"] = stdout
-            result["stderr"] = stderr
-            
-        elif action_type == "open_project":
-            path = action.get("path")
-            success = open_project_in_kiro(path)
-            result["success"] = success
-            result["stdout"] = f"Opened project: {path}" if success else f"Failed to open project: {path}"
-            
-        elif action_type == "prompt_kiro_ai":
-            prompt = action.get("prompt")
-            success = prompt_kiro_ai(prompt)
-            result["success"] = success
-            result["stdout"] = f"Sent prompt to Kiro AI: {prompt}" if success else f"Failed to send prompt to Kiro AI"
-            
-            # After sending prompt, wait for Kiro.app to complete work
-            if success:
-                expected_files = action.get("expected_files")  # Optional: files to wait for
-                wait_timeout = action.get("wait_timeout", 30)  # Default 30 seconds
-                logger.info("Waiting for Kiro.app to complete work after prompt...")
-                wait_success = wait_for_kiro_completion(
-                    repo_path=repo_path,
-                    timeout=wait_timeout,
-                    expected_files=expected_files
-                )
-                if wait_success:
-                    result["stdout"] += "\nKiro.app work completion detected"
-                else:
-                    result["stdout"] += "\nKiro.app work completion wait finished (timeout or no files detected)"
+        results = self._new_results(step_id)
+        results["ui_wait"] = 0.0
+        capture = StepCapture(CAPTURE_HEAD_BYTES, CAPTURE_TAIL_BYTES, spill_to)
+        on_output = self._tee(capture, on_output)
+        
+        graph = build_action_graph(actions)
+        if graph is not None:
+            gui_guard = self._ui_lock_guard(ui_lock, asyncio.get_running_loop(), results) if ui_lock else None
+            await asyncio.to_thread(self._execute_graph, actions, repo_path, results, graph, capture, gui_guard, on_output)
+            await asyncio.to_thread(self._finish_capture, results, capture)
+            logger.info(f"Step {step_id} execution {'succeeded' if results['success'] else 'failed'}")
+            return results
             
-        elif action_type == "wait_for_marker":
-            # Will implement in Step 6
-            marker = action.get("marker")
-            logger.info(f"Wait for marker: {marker} (not yet implemented)")
-            result["stdout"] = f"Waiting for marker {marker} (simulated)"
+        holding = False
+        
+        try:
+            for i, action in enumerate(actions):
+                action_type = action.get("type")
+                logger.info(f"Action {i+1}/{len(actions)}: {action_type}")
+                
+                gui = action_type in GUI_ACTIONS and ui_lock is not None
+                if gui and not holding:
+                    lock_requested = time.perf_counter()
+                    await ui_lock.acquire()
+                    holding = True
+                    results["ui_wait"] += time.perf_counter() - lock_requested
+                elif not gui and holding:
+                    ui_lock.release()
+                    holding = False
+                    
+                try:
+                    action_result = await asyncio.to_thread(self.execute_action, action, repo_path, not gui, on_output)
+                    if gui and action_type == "prompt_kiro_ai" and action_result.get("success"):
+                        # Waiting for Kiro only watches files; let other missions use the screen
+                        ui_lock.release()
+                        holding = False
+                        await asyncio.to_thread(self.wait_after_prompt, action, repo_path, action_result)
+                    self._collect(results, capture, action, action_result)
+                    
+                except Exception as e:
+                    self._record_exception(results, action, e)
+        finally:
+            if holding:
+                ui_lock.release()
+                
+        await asyncio.to_thread(self._finish_capture, results, capture)
+        logger.info(f"Step {step_id} execution {'succeeded' if results['success'] else 'failed'}")
+        return results
+    
+    def _execute_graph(self, actions: List[Dict[str, Any]], repo_path: Optional[str],
+                       results: Dict[str, Any], graph: Tuple[List[Set[int]], List[int]],
+                       capture: StepCapture, gui_guard: Optional[Callable] = None,
+                       on_output: Optional[Callable[[str, str], None]] = None):
+        """Run actions concurrently along their dependencies.
+        
+        An action starts once the actions it depends on have finished. GUI
+        actions additionally run one at a time on a single lane, in the order
+        given by the graph. An action whose dependency failed is skipped.
+        Results are merged in plan order, so output reads as in a
+        sequential run.
+        
+        Args:
+            actions: The step's actions
+            repo_path: Repository path for commands
+            results: Step results to merge into
+            graph: Result of build_action_graph
+            capture: Capture receiving the actions' output
+            gui_guard: Optional context manager factory held around each GUI
+                action (the async controller's UI lock)
+            on_output: Optional callback(stream, text) receiving live output
+        """
+        dependencies, gui_lane = graph
+        waits = [set(deps) for deps in dependencies]
+        for previous, following in zip(gui_lane, gui_lane[1:]):
+            waits[following].add(previous)
             
-        elif action_type == "wait_for_file":
-            from actions.file_actions import wait_for_file
-            file_path = action.get("file_path")
-            timeout = action.get("timeout", 60)
-            if file_path:
-                # Make path absolute if repo_path is provided
-                if repo_path and not os.path.isabs(file_path):
-                    file_path = os.path.join(repo_path, file_path)
-                found = wait_for_file(file_path, timeout=timeout)
-                result["success"] = found
-                result["stdout"] = f"File {'found' if found else 'not found'}: {file_path}"
+        outcomes: Dict[int, Any] = {}
+        pending = set(range(len(actions)))
+        running = {}
+        while pending or running:
+            started = True
+            while started:
+                started = False
+                for i in sorted(pending):
+                    if not waits[i] <= outcomes.keys():
+                        continue
+                    pending.discard(i)
+                    started = True
+                    failed = [j for j in dependencies[i] if not self._succeeded(outcomes[j])]
+                    if failed:
+                        refs = ", ".join(str(actions[j].get("id", j + 1)) for j in failed)
+                        logger.warning(f"Skipping action {i+1}/{len(actions)}: dependency {refs} failed")
+                        outcomes[i] = {"success": False, "error": f"skipped, dependency {refs} failed"}
+                        continue
+                    logger.info(f"Action {i+1}/{len(actions)}: {actions[i].get('type')} (started)")
+                    # Each action runs in a copy of this context, so its span nests under the step
+                    context = contextvars.copy_context()
+                    running[self._pool.submit(context.run, self._run_node, actions[i], repo_path, gui_guard, on_output)] = i
+            if not running:
+                break
+                
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = running.pop(future)
+                try:
+                    outcomes[i] = future.result()
+                except Exception as e:
+                    outcomes[i] = e
+                    
+        for i, action in enumerate(actions):
+            outcome = outcomes[i]
+            if isinstance(outcome, Exception):
+                self._record_exception(results, action, outcome)
             else:
-                result["success"] = False
-                result["error"] = "wait_for_file action requires 'file_path' parameter"
-            
-        elif action_type == "wait_for_kiro_completion":
-            expected_files = action.get("expected_files")
-            timeout = action.get("timeout", 30)
-            wait_success = wait_for_kiro_completion(
-                repo_path=repo_path,
-                timeout=timeout,
-                expected_files=expected_files
+                self._collect(results, capture, action, outcome)
+    
+    def _run_node(self, action: Dict[str, Any], repo_path: Optional[str],
+                  gui_guard: Optional[Callable],
+                  on_output: Optional[Callable[[str, str], None]] = None) -> Dict[str, Any]:
+        """Run one action of a graph, holding gui_guard around GUI actions."""
+        guard = gui_guard() if gui_guard and action.get("type") in GUI_ACTIONS else nullcontext()
+        with guard:
+            result = self.execute_action(action, repo_path, wait_after_prompt=False, on_output=on_output)
+        if action.get("type") == "prompt_kiro_ai" and result.get("success"):
+            # Waiting for Kiro only watches files; the screen is free meanwhile
+            self.wait_after_prompt(action, repo_path, result)
+        return result
+    
+    @staticmethod
+    def _ui_lock_guard(ui_lock: asyncio.Lock, loop: asyncio.AbstractEventLoop,
+                       results: Dict[str, Any]) -> Callable:
+        """Return a context manager factory holding an asyncio lock from a worker thread."""
+        @contextmanager
+        def guard():
+            lock_requested = time.perf_counter()
+            asyncio.run_coroutine_threadsafe(ui_lock.acquire(), loop).result()
+            # GUI actions of a step run one at a time, so this is not racy
+            results["ui_wait"] += time.perf_counter() - lock_requested
+            try:
+                yield
+            finally:
+                loop.call_soon_threadsafe(ui_lock.release)
+        return guard
+    
+    @staticmethod
+    def _tee(capture: StepCapture,
+             on_output: Optional[Callable[[str, str], None]]) -> Callable[[str, str], None]:
+        """Return an output callback writing to the capture and to on_output."""
+        def tee(stream: str, text: str):
+            capture.write(stream, text)
+            if on_output is not None:
+                on_output(stream, text)
+        return tee
+    
+    @staticmethod
+    def _finish_capture(results: Dict[str, Any], capture: StepCapture):
+        """Close the capture and store its head and tail in the step results."""
+        results["output"] = capture.close()
+        results["stdout"] = capture.text("stdout")
+        results["stderr"] = capture.text("stderr")
+    
+    @staticmethod
+    def _succeeded(outcome: Any) -> bool:
+        return not isinstance(outcome, Exception) and outcome.get("success", True)
+    
+    @staticmethod
+    def _new_results(step_id: str) -> Dict[str, Any]:
+        return {
+            "step_id": step_id,
+            "success": True,
+            "stdout": "",
+            "stderr": "",
+            "screenshots": [],
+            "errors": [],
+            "action_timings": []
+        }
+    
+    @staticmethod
+    def _timing(action: Dict[str, Any], success: bool, duration_s: Optional[float],
+                cached: bool = False) -> Dict[str, Any]:
+        """Return the timing entry of an action reported with the step's event."""
+        handler = get_handler(action.get("type"))
+        timing = {
+            "type": action.get("type"),
+            "resource": handler.resource if handler else None,
+            "duration_s": round(duration_s, 3) if duration_s is not None else None,
+            "success": success
+        }
+        if action.get("id") is not None:
+            timing["id"] = action["id"]
+        if cached:
+            timing["cached"] = True
+        return timing
+    
+    @classmethod
+    def _collect(cls, results: Dict[str, Any], capture: StepCapture,
+                 action: Dict[str, Any], action_result: Dict[str, Any]):
+        """Merge one action's result into the step results."""
+        action_type = action.get("type")
+        results["action_timings"].append(
+            cls._timing(
+                action, action_result.get("success", True), action_result.get("duration_s"),
+                action_result.get("cached", False)
             )
-            result["success"] = wait_success
-            result["stdout"] = "Kiro.app completion wait finished"
+        )
+        # Streamed output already went to the capture while the action ran
+        if not action_result.get("streamed"):
+            if action_result.get("stdout"):
+                capture.write("stdout", action_result["stdout"] + "\n")
+            if action_result.get("stderr"):
+                capture.write("stderr", action_result["stderr"] + "\n")
+        if action_result.get("screenshot"):
+            results["screenshots"].append(action_result["screenshot"])
             
-        else:
+        # Check if action failed
+        if not action_result.get("success", True):
+            results["success"] = False
+            error_msg = f"Action {action_type} failed: {action_result.get('error', 'Unknown error')}"
+            results["errors"].append(error_msg)
+            logger.error(error_msg)
+    
+    @classmethod
+    def _record_exception(cls, results: Dict[str, Any], action: Dict[str, Any], e: Exception):
+        results["success"] = False
+        results["action_timings"].append(cls._timing(action, False, None))
+        error_msg = f"Exception in action {action.get('type')}: {str(e)}"
+        results["errors"].append(error_msg)
+        logger.error(error_msg)
+    
+    def execute_action(self, action: Dict[str, Any], repo_path: str = None,
+                       wait_after_prompt: bool = True,
+                       on_output: Optional[Callable[[str, str], None]] = None) -> Dict[str, Any]:
+        """Execute a single action through its registered handler.
+        
+        The result's "duration_s" holds the handler's wall time (plus the
+        wait for Kiro after a prompt).
+        
+        Args:
+            action: Action data
+            repo_path: Repository path for commands
+            wait_after_prompt: Whether prompt_kiro_ai also waits for Kiro to
+                finish (the async executor waits separately, outside the UI lock)
+            on_output: Optional callback(stream, text) passed to handlers that
+                stream output
+                
+        Returns:
+            Dictionary with action results
+        """
+        action_type = action.get("type")
+        handler = get_handler(action_type)
+        if handler is None:
             logger.warning(f"Unknown action type: {action_type}")
-            result["success"] = False
-            result["error"] = f"Unknown action type: {action_type}"
+            return {"success": False, "error": f"Unknown action type: {action_type}", "duration_s": 0.0}
+            
+        attributes = {"action.type": action_type, "action.resource": handler.resource}
+        if action.get("id") is not None:
+            attributes["action.id"] = str(action["id"])
+        with tracer.span(f"action {action_type}", attributes=attributes) as span:
+            started = time.perf_counter()
+            if handler.streams_output and on_output is not None:
+                result = {"success": True, **handler.run(action, repo_path, on_output=on_output), "streamed": True}
+            else:
+                result = {"success": True, **handler.run(action, repo_path)}
+            result["duration_s"] = time.perf_counter() - started
         
+            # After sending prompt, wait for Kiro.app to complete work
+            if action_type == "prompt_kiro_ai" and result["success"] and wait_after_prompt:
+                self.wait_after_prompt(action, repo_path, result)
+            
+            span.set_attribute("action.cached", result.get("cached"))
+            # Output sizes let recorded traces drive simulated runs (SIMULATION_TRACES)
+            for field in ("stdout", "stderr", "screenshot"):
+                if result.get(field) is not None:
+                    span.set_attribute(f"action.{field}_bytes", len(result[field]))
+            if not result["success"]:
+                span.set_error(str(result.get("error", "action failed")))
         return result
+    
+    def wait_after_prompt(self, action: Dict[str, Any], repo_path: str, result: Dict[str, Any]):
+        """Wait for Kiro.app to finish the work requested by a prompt_kiro_ai action.
+        
+        Args:
+            action: The prompt_kiro_ai action
+            repo_path: Repository path to watch for files
+            result: Action result whose stdout is extended
+        """
+        expected_files = action.get("expected_files")  # Optional: files to wait for
+        wait_timeout = action.get("wait_timeout", get_handler("prompt_kiro_ai").timeout)
+        logger.info("Waiting for Kiro.app to complete work after prompt...")
+        started = time.perf_counter()
+        with tracer.span("wait_for_kiro", attributes={"wait.timeout_s": wait_timeout}) as span:
+            wait = {"type": "wait_for_kiro_completion", "timeout": wait_timeout, "expected_files": expected_files}
+            wait_success = get_handler("wait_for_kiro_completion").run(wait, repo_path)["success"]
+            span.set_attribute("wait.success", wait_success)
+        # The wait counts towards the prompt action's duration
+        result["duration_s"] = result.get("duration_s", 0.0) + time.perf_counter() - started
+        if wait_success:
+            result["stdout"] += "\nKiro.app work completion detected"
+        else:
+            result["stdout"] += "\nKiro.app work completion wait finished (timeout or no files detected)"
@@ -0,0 +1,146 @@
+"""Virtual Fleet - Many simulated macs in one process, for backend load tests."""
+import os
+import time
+import shutil
+import asyncio
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from agents.async_mission_controller import AsyncMissionController
+from utils.latency_stats import LatencyStats
+from utils.logger import setup_logger
+from config import MAC_ID, SIMULATION_PROMPT, SIMULATION_REPO_PATH
+
+logger = setup_logger("virtual_fleet")
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct))], 2)
+
+
+class VirtualFleet:
+    """Runs virtual macs, each an AsyncMissionController with its own outbox.
+    
+    Every virtual mac creates a mission (or clones one of the template
+    missions), runs it to completion like a real client and repeats, so the
+    backend sees the request mix of a fleet: mission creation, next_step
+    polling, event batches and log uploads. Actions should be simulated
+    (SIMULATE_ACTIONS); the virtual macs share one process and HTTP latency
+    stats.
+    """
+    
+    def __init__(self, count: int, backend_url: str, poll_interval: int, missions_per_mac: int = 1,
+                 template_missions: Optional[List[str]] = None, prompt: str = SIMULATION_PROMPT,
+                 repo_path: str = SIMULATION_REPO_PATH, ramp_up_s: float = 0.0, mac_prefix: str = MAC_ID):
+        """Initialize the fleet.
+        
+        Args:
+            count: Number of virtual macs
+            backend_url: Backend server URL
+            poll_interval: Polling interval of each virtual mac in seconds
+            missions_per_mac: Missions each virtual mac runs one after another
+            template_missions: Missions whose plans are cloned instead of
+                planning new missions from prompt (assigned round-robin)
+            prompt: Prompt of the missions created
+            repo_path: Repository path of the missions created
+            ramp_up_s: Seconds over which the virtual macs are started
+            mac_prefix: Prefix of the virtual mac IDs
+        """
+        self.count = max(1, count)
+        self.backend_url = backend_url
+        self.poll_interval = poll_interval
+        self.missions_per_mac = max(1, missions_per_mac)
+        self.template_missions = list(template_missions or [])
+        self.prompt = prompt
+        self.repo_path = repo_path
+        self.ramp_up_s = max(0.0, ramp_up_s)
+        self.mac_prefix = mac_prefix
+        
+        self.stats = LatencyStats(window=10000)
+        self.mission_durations: List[float] = []
+        self.failed_missions = 0
+        self.steps = 0
+        self.events_sent = 0
+        self.events_unsent = 0
+    
+    async def run(self) -> Dict[str, Any]:
+        """Run every virtual mac's missions and return the load test report."""
+        # Each virtual mac runs its actions in worker threads
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=self.count * 2 + 4, thread_name_prefix="virtual-mac")
+        )
+        workdir = tempfile.mkdtemp(prefix="autoide-fleet-")
+        logger.info(f"Starting {self.count} virtual macs, {self.missions_per_mac} missions each")
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*(self._run_mac(index, workdir) for index in range(self.count)))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        return self.report(time.perf_counter() - started)
+    
+    async def _run_mac(self, index: int, workdir: str):
+        await asyncio.sleep(self.ramp_up_s * index / self.count)
+        mac_id = f"{self.mac_prefix}-sim{index:03d}"
+        controller = AsyncMissionController(
+            mac_id, self.backend_url, self.poll_interval,
+            outbox_path=os.path.join(workdir, f"{mac_id}.sqlite"), stats=self.stats
+        )
+        await controller.start()
+        
+        try:
+            for number in range(self.missions_per_mac):
+                started = time.perf_counter()
+                if self.template_missions:
+                    template = self.template_missions[(index + number) % len(self.template_missions)]
+                    mission_id = await controller.http_client.clone_mission(template, mac_id)
+                else:
+                    mission_id = await controller.http_client.create_mission(
+                        mac_id, self.prompt, self.repo_path, mac_id
+                    )
+                if mission_id is None:
+                    self.failed_missions += 1
+                    continue
+                    
+                try:
+                    steps = await controller.add_mission(mission_id)
+                    self.steps += steps
+                    self.mission_durations.append(time.perf_counter() - started)
+                except Exception as e:
+                    logger.error(f"[{mac_id}] Mission {mission_id} failed: {e}")
+                    self.failed_missions += 1
+        finally:
+            await controller.close()
+            self.events_sent += controller.outbox.sent
+            self.events_unsent += controller.outbox.pending()
+    
+    def report(self, wall_s: float) -> Dict[str, Any]:
+        """Return mission and backend call throughput of a run.
+        
+        Args:
+            wall_s: Duration of the run in seconds
+            
+        Returns:
+            Dictionary with mission counts and durations, request rate and
+            per-endpoint latency (see LatencyStats.snapshot)
+        """
+        backend = self.stats.snapshot()
+        requests = sum(entry["calls"] for entry in backend.values())
+        return {
+            "macs": self.count,
+            "missions": len(self.mission_durations),
+            "failed_missions": self.failed_missions,
+            "steps": self.steps,
+            "events_sent": self.events_sent,
+            "events_unsent": self.events_unsent,
+            "wall_s": round(wall_s, 2),
+            "missions_per_min": round(len(self.mission_durations) * 60 / wall_s, 2) if wall_s else None,
+            "mission_p50_s": _percentile(self.mission_durations, 0.50),
+            "mission_p95_s": _percentile(self.mission_durations, 0.95),
+            "requests": requests,
+            "requests_per_s": round(requests / wall_s, 2) if wall_s else None,
+            "request_errors": sum(entry["errors"] for entry in backend.values()),
+            "backend": backend
+        }
@@ -8,6 +8,69 @@ load_dotenv()
 MAC_ID = os.getenv("MAC_ID", "mac-01")
 BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:5757")
 POLL_INTERVAL = int(os.getenv("POLL_INTERVAL", "5"))  # seconds (increased from 3 to reduce CPU usage)
+# "poll": ask the backend for every step; "plan": download the plan once and run it locally
+EXECUTION_MODE = os.getenv("EXECUTION_MODE", "poll").lower()
+# Use the asyncio controller even for a single mission (always used for several missions)
+ASYNC_CONTROLLER = os.getenv("ASYNC_CONTROLLER", "false").lower() == "true"
+# Actions of one step run concurrently when the plan declares their dependencies
+STEP_MAX_PARALLEL = int(os.getenv("STEP_MAX_PARALLEL", "4"))
+# Live command output, streamed to the backend while a command runs
+LOG_STREAMING = os.getenv("LOG_STREAMING", "true").lower() == "true"
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "0.5"))  # seconds between uploads
+LOG_BATCH_BYTES = int(os.getenv("LOG_BATCH_BYTES", "65536"))  # maximum output per upload
+LOG_MAX_BUFFER_BYTES = int(os.getenv("LOG_MAX_BUFFER_BYTES", str(1024 * 1024)))  # oldest output dropped beyond this
+
+# Step output kept for the step event: the first and last bytes of each stream
+CAPTURE_HEAD_BYTES = int(os.getenv("CAPTURE_HEAD_BYTES", str(16 * 1024)))
+CAPTURE_TAIL_BYTES = int(os.getenv("CAPTURE_TAIL_BYTES", str(64 * 1024)))
+# Also write the full output of every step to a gzip file (uploaded on demand)
+CAPTURE_SPILL = os.getenv("CAPTURE_SPILL", "false").lower() == "true"
+CAPTURE_SPILL_DIR = os.getenv("CAPTURE_SPILL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "captures"))
+CAPTURE_SPILL_TTL_S = float(os.getenv("CAPTURE_SPILL_TTL_S", str(7 * 24 * 3600)))  # not-uploaded spill files are deleted after this (0 keeps them)
+
+# Cache of run_command results keyed by command, cwd, environment and repository content (opt-in)
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "false").lower() == "true"
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "result_cache.sqlite"))
+RESULT_CACHE_TTL_S = float(os.getenv("RESULT_CACHE_TTL_S", "86400"))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "500"))
+# Environment variables that are part of the key
+RESULT_CACHE_ENV = [name for name in os.getenv("RESULT_CACHE_ENV", "PATH,NODE_ENV,CI").split(",") if name]
+# Directories left out of the repository fingerprint, and the largest tree fingerprinted
+RESULT_CACHE_IGNORE_DIRS = [name for name in os.getenv("RESULT_CACHE_IGNORE_DIRS", ".git,node_modules,__pycache__").split(",") if name]
+RESULT_CACHE_MAX_FILES = int(os.getenv("RESULT_CACHE_MAX_FILES", "100000"))
+
+# Tracing: spans of missions, steps, actions, subprocesses and HTTP calls, as OTLP/JSON lines
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+TRACE_FILE = os.getenv("TRACE_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "traces", "client.jsonl"))
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "mac-client")
+
+# Simulated execution for load tests without macOS: every action is replaced by a stand-in
+# that samples its latency and output size (see utils/simulation.py)
+SIMULATE_ACTIONS = os.getenv("SIMULATE_ACTIONS", "false").lower() == "true"
+SIMULATION_PROFILE = os.getenv("SIMULATION_PROFILE", "")  # JSON file of per-action distributions
+# Client trace files (TRACE_FILE) whose recorded actions are sampled instead of the profile
+SIMULATION_TRACES = [path for path in os.getenv("SIMULATION_TRACES", "").split(",") if path]
+SIMULATION_SPEED = float(os.getenv("SIMULATION_SPEED", "1.0"))  # multiplier of sampled latencies
+SIMULATION_SEED = int(os.environ["SIMULATION_SEED"]) if os.getenv("SIMULATION_SEED") else None
+# Mission created by each virtual mac of `main.py --simulate`
+SIMULATION_PROMPT = os.getenv("SIMULATION_PROMPT", "run the tests")
+SIMULATION_REPO_PATH = os.getenv("SIMULATION_REPO_PATH", "/tmp/autoide-sim")
+
+# HTTP client
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3"))  # seconds
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))  # seconds
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))  # extra attempts for idempotent calls
+HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "0.25"))  # seconds, doubled per retry
+HTTP_MAX_RETRY_AFTER = float(os.getenv("HTTP_MAX_RETRY_AFTER", "30"))  # longest Retry-After honoured, seconds
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))  # connections kept per host
+HTTP_GZIP_MIN_BYTES = int(os.getenv("HTTP_GZIP_MIN_BYTES", "2048"))  # compress larger request bodies
+
+# Event outbox (events are stored locally and sent to the backend in batches)
+OUTBOX_PATH = os.getenv("OUTBOX_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "outbox.sqlite"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_MAX_BACKOFF = float(os.getenv("OUTBOX_MAX_BACKOFF", "30"))  # seconds
+# How long the controller waits on startup for events from a previous run to be sent
+OUTBOX_DRAIN_TIMEOUT = float(os.getenv("OUTBOX_DRAIN_TIMEOUT", "5"))  # seconds
 
 # Current mission (will be set at runtime)
 CURRENT_MISSION_ID = None
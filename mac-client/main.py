@@ -1,29 +1,77 @@
 """macOS Client - Entry point."""
-import sys
-from agents.mission_controller import MissionController
-from config import MAC_ID, BACKEND_URL, POLL_INTERVAL
-from utils.logger import setup_logger
+import os
+import json
+import asyncio
+import argparse
+import config
+from config import MAC_ID, BACKEND_URL, POLL_INTERVAL, ASYNC_CONTROLLER
+from utils.capture_buffer import STREAMS, spill_path, remove_spill
+from utils.http_client import HTTPClient
+from utils.logger import setup_logger, log_to_stderr
 
 logger = setup_logger("main")
 
 
+def parse_args() -> argparse.Namespace:
+    """Parse the command line."""
+    parser = argparse.ArgumentParser(
+        description="Run AutoIDE missions on this machine.",
+        epilog="Example: python main.py m-abc123"
+    )
+    parser.add_argument("mission_ids", nargs="*", metavar="mission_id",
+                        help="Missions to run (with --simulate: missions whose plans the virtual macs clone)")
+    parser.add_argument("--upload-output", nargs=2, metavar=("MISSION_ID", "STEP_ID"),
+                        help="Upload the spilled full output of a step (see CAPTURE_SPILL)")
+    parser.add_argument("--simulate", type=int, metavar="N",
+                        help="Load-test the backend with N virtual macs running simulated actions "
+                             "(logs go to stderr, the JSON report to stdout)")
+    parser.add_argument("--missions-per-mac", type=int, default=1,
+                        help="Missions each virtual mac runs one after another (default: 1)")
+    parser.add_argument("--ramp-up", type=float, default=0.0, metavar="SECONDS",
+                        help="Spread the start of the virtual macs over this many seconds (default: 0)")
+    parser.add_argument("--prompt", default=config.SIMULATION_PROMPT,
+                        help="Prompt of the missions virtual macs create (default: SIMULATION_PROMPT)")
+    return parser.parse_args()
+
+
 def main():
     """Main entry point for macOS client."""
+    args = parse_args()
+    if args.simulate:
+        # stdout carries only the JSON report, e.g. for piping into jq
+        log_to_stderr()
     logger.info("=== macOS Client Starting ===")
     logger.info(f"MAC_ID: {MAC_ID}")
     logger.info(f"Backend URL: {BACKEND_URL}")
     logger.info(f"Poll Interval: {POLL_INTERVAL}s")
     
+    if args.upload_output:
+        upload_output(args.upload_output)
+        return
+        
+    if args.simulate:
+        simulate(args)
+        return
+        
     # Check if mission ID provided as argument
-    if len(sys.argv) > 1:
-        mission_id = sys.argv[1]
-        logger.info(f"Mission ID provided: {mission_id}")
+    if args.mission_ids:
+        mission_ids = args.mission_ids
+        logger.info(f"Mission IDs provided: {', '.join(mission_ids)}")
     else:
         logger.info("No mission ID provided. Waiting for mission...")
-        logger.info("Usage: python main.py <mission_id>")
+        logger.info("Usage: python main.py <mission_id> [<mission_id> ...]")
+        logger.info("       python main.py --upload-output <mission_id> <step_id>")
+        logger.info("       python main.py --simulate <N> [--missions-per-mac M] [<template_mission_id> ...]")
         logger.info("\nExample:")
         logger.info("  python main.py m-abc123")
         return
+        
+    if len(mission_ids) > 1 or ASYNC_CONTROLLER:
+        run_async(mission_ids)
+        return
+    mission_id = mission_ids[0]
+    
+    from agents.mission_controller import MissionController
     
     # Create and start Mission Controller
     controller = MissionController(
@@ -41,9 +89,73 @@ def main():
     except KeyboardInterrupt:
         logger.info("\nShutting down gracefully...")
         controller.stop()
+        
+    logger.info("=== macOS Client Stopped ===")
+
+
+def run_async(mission_ids):
+    """Run missions concurrently with the asyncio controller."""
+    from agents.async_mission_controller import AsyncMissionController
+    
+    controller = AsyncMissionController(
+        mac_id=MAC_ID,
+        backend_url=BACKEND_URL,
+        poll_interval=POLL_INTERVAL
+    )
     
+    try:
+        asyncio.run(controller.run(mission_ids))
+    except KeyboardInterrupt:
+        logger.info("\nShutting down gracefully...")
+        
     logger.info("=== macOS Client Stopped ===")
 
 
+def simulate(args):
+    """Run a fleet of virtual macs with simulated actions and print the load test report."""
+    # Must be set before the step executor is imported: it picks the action handlers
+    config.SIMULATE_ACTIONS = True
+    from agents.virtual_fleet import VirtualFleet
+    
+    fleet = VirtualFleet(
+        args.simulate, BACKEND_URL, POLL_INTERVAL,
+        missions_per_mac=args.missions_per_mac,
+        template_missions=args.mission_ids,
+        prompt=args.prompt,
+        ramp_up_s=args.ramp_up
+    )
+    try:
+        report = asyncio.run(fleet.run())
+    except KeyboardInterrupt:
+        logger.info("\nShutting down gracefully...")
+        return
+        
+    logger.info(
+        f"{report['macs']} virtual macs: {report['missions']} missions ({report['failed_missions']} failed), "
+        f"{report['steps']} steps in {report['wall_s']}s, {report['missions_per_min']} missions/min, "
+        f"mission p50 {report['mission_p50_s']}s p95 {report['mission_p95_s']}s, "
+        f"{report['requests']} requests ({report['requests_per_s']}/s, {report['request_errors']} errors)"
+    )
+    logger.info(f"Backend latency: {fleet.stats.summary()}")
+    print(json.dumps(report, indent=2))
+
+
+def upload_output(args):
+    """Upload the spilled full output of a step (see CAPTURE_SPILL)."""
+    mission_id, step_id = args
+    
+    http_client = HTTPClient(BACKEND_URL)
+    uploaded = 0
+    for stream in STREAMS:
+        path = spill_path(mission_id, step_id, stream)
+        if not os.path.exists(path):
+            logger.warning(f"No spilled {stream} for step {step_id}: {path}")
+            continue
+        if http_client.upload_output(mission_id, step_id, stream, path):
+            remove_spill(path)
+            uploaded += 1
+    logger.info(f"Uploaded {uploaded} output file(s) of step {step_id}")
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,153 @@
+"""Async HTTP client for backend communication (used by the asyncio controller)."""
+import time
+import httpx
+from typing import Optional, Dict, Any, List
+from config import HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_POOL_SIZE
+from utils.latency_stats import LatencyStats
+from utils.tracing import tracer, KIND_CLIENT
+from utils.logger import setup_logger
+
+logger = setup_logger("async_http_client")
+
+
+class AsyncHTTPClient:
+    """Non-blocking HTTP client for communicating with the backend."""
+
+    def __init__(self, backend_url: str, stats: Optional[LatencyStats] = None):
+        """Initialize async HTTP client.
+
+        Args:
+            backend_url: Base URL of the backend server
+            stats: Latency stats to record calls in (a new one if None)
+        """
+        self.backend_url = backend_url.rstrip('/')
+        self.stats = stats if stats is not None else LatencyStats()
+        self.client = httpx.AsyncClient(
+            base_url=self.backend_url,
+            headers={'Content-Type': 'application/json'},
+            timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=HTTP_POOL_SIZE, max_keepalive_connections=HTTP_POOL_SIZE)
+        )
+
+    async def _get(self, endpoint: str, path: str, **kwargs) -> httpx.Response:
+        """Send a GET request, traced as a client span inside a traced operation."""
+        if tracer.current() is None:
+            return await self._send("GET", endpoint, path, **kwargs)
+        with tracer.span("HTTP GET", KIND_CLIENT, {"http.method": "GET", "http.route": endpoint}) as span:
+            response = await self._send("GET", endpoint, path, headers=tracer.inject({}), **kwargs)
+            span.set_attribute("http.status_code", response.status_code)
+            return response
+
+    async def _send(self, method: str, endpoint: str, path: str, **kwargs) -> httpx.Response:
+        """Send a request and record its latency under endpoint."""
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, **kwargs)
+        except httpx.HTTPError:
+            self.stats.record(endpoint, time.perf_counter() - started, False)
+            raise
+        self.stats.record(endpoint, time.perf_counter() - started, response.is_success)
+        return response
+
+    async def create_mission(self, user: str, prompt: str, repo_path: str, mac_id: str) -> Optional[str]:
+        """Create a mission.
+
+        Args:
+            user: Submitting user
+            prompt: Mission description
+            repo_path: Repository path on the client
+            mac_id: Client the mission is assigned to
+
+        Returns:
+            The new mission ID, or None on error
+        """
+        try:
+            response = await self._send("POST", "POST /missions", "/missions", json={
+                "user": user, "prompt": prompt, "repo_path": repo_path, "mac_id": mac_id
+            })
+            response.raise_for_status()
+            return response.json()["mission_id"]
+
+        except httpx.HTTPError as e:
+            logger.error(f"Failed to create mission: {e}")
+            return None
+
+    async def clone_mission(self, mission_id: str, mac_id: str) -> Optional[str]:
+        """Create a pending mission from a stored mission's plan, assigned to mac_id.
+
+        Args:
+            mission_id: Mission whose plan is reused
+            mac_id: Client the new mission is assigned to
+
+        Returns:
+            The new mission ID, or None on error
+        """
+        try:
+            response = await self._send(
+                "POST", "POST /missions/{id}/clone", f"/missions/{mission_id}/clone", json={"mac_id": mac_id}
+            )
+            response.raise_for_status()
+            return response.json()["mission_id"]
+
+        except httpx.HTTPError as e:
+            logger.error(f"Failed to clone mission {mission_id}: {e}")
+            return None
+
+    async def get_trace_context(self, mission_id: str) -> Optional[str]:
+        """Return the mission's trace context (a W3C traceparent header) from the backend."""
+        try:
+            response = await self._send("GET", "GET /missions/{id}/cursor", f"/missions/{mission_id}/cursor")
+            return response.headers.get("traceparent")
+
+        except httpx.HTTPError as e:
+            logger.error(f"Failed to get trace context for {mission_id}: {e}")
+            return None
+
+    async def get_next_step_response(self, mission_id: str, mac_id: str,
+                                     exclude: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """Get the full next-step response for a mission.
+
+        Args:
+            mission_id: Mission identifier
+            mac_id: macOS client identifier
+            exclude: Step IDs already run whose events may not be stored yet
+
+        Returns:
+            Dictionary with "step" and mission "status", or None on error
+        """
+        try:
+            params = {"mac_id": mac_id}
+            if exclude:
+                params["exclude"] = ",".join(exclude)
+
+            response = await self._get("GET /missions/{id}/next_step", f"/missions/{mission_id}/next_step", params=params)
+            response.raise_for_status()
+
+            return response.json()
+
+        except httpx.HTTPError as e:
+            logger.error(f"Failed to get next step for {mission_id}: {e}")
+            return None
+
+    async def get_mission(self, mission_id: str) -> Optional[Dict[str, Any]]:
+        """Get mission details.
+
+        Args:
+            mission_id: Mission identifier
+
+        Returns:
+            Dictionary with mission data or None if not found
+        """
+        try:
+            response = await self._get("GET /missions/{id}", f"/missions/{mission_id}")
+            response.raise_for_status()
+
+            return response.json()
+
+        except httpx.HTTPError as e:
+            logger.error(f"Failed to get mission {mission_id}: {e}")
+            return None
+
+    async def close(self):
+        """Close the underlying connection pool."""
+        await self.client.aclose()
@@ -0,0 +1,208 @@
+"""Bounded capture of step output.
+
+A chatty command can print hundreds of MB. ``CaptureBuffer`` keeps only the
+first ``head_bytes`` and the last ``tail_bytes`` of a stream plus a byte
+counter, so memory per step and event payload size are constant. With a
+spill path, the full stream is also written to a gzip file that can be
+uploaded to the backend on demand. Spill files are deleted once uploaded or
+after ``CAPTURE_SPILL_TTL_S``.
+"""
+import os
+import re
+import gzip
+import time
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+from config import CAPTURE_SPILL, CAPTURE_SPILL_DIR, CAPTURE_SPILL_TTL_S
+from utils.logger import setup_logger
+
+logger = setup_logger("capture_buffer")
+
+STREAMS = ("stdout", "stderr")
+
+# Characters allowed in spill file and directory names; IDs come from the plan
+_UNSAFE_ID_CHARS = re.compile(r"[^A-Za-z0-9_-]")
+# Seconds between sweeps for expired spill files
+SPILL_SWEEP_INTERVAL_S = 60.0
+_last_sweep = 0.0
+_sweep_lock = threading.Lock()
+
+
+def _safe_id(value: str) -> str:
+    """Return an ID usable as one path component (no separators or dots)."""
+    return _UNSAFE_ID_CHARS.sub("_", str(value)) or "_"
+
+
+def spill_path(mission_id: str, step_id: str, stream: str) -> str:
+    """Return the spill file of one stream of a step, inside CAPTURE_SPILL_DIR."""
+    return f"{os.path.join(CAPTURE_SPILL_DIR, _safe_id(mission_id), _safe_id(step_id))}.{stream}.gz"
+
+
+def remove_spill(path: str):
+    """Delete a spill file and its mission directory once that is empty."""
+    try:
+        os.remove(path)
+        os.rmdir(os.path.dirname(path))
+    except OSError:
+        pass
+
+
+def sweep_spills(now: Optional[float] = None) -> int:
+    """Delete spill files older than CAPTURE_SPILL_TTL_S, at most once per sweep interval.
+    
+    Args:
+        now: Current time (default: time.time())
+        
+    Returns:
+        Number of files deleted
+    """
+    global _last_sweep
+    now = time.time() if now is None else now
+    with _sweep_lock:
+        if CAPTURE_SPILL_TTL_S <= 0 or now - _last_sweep < SPILL_SWEEP_INTERVAL_S:
+            return 0
+        _last_sweep = now
+        
+    deleted = 0
+    if not os.path.isdir(CAPTURE_SPILL_DIR):
+        return 0
+    for mission_dir in os.scandir(CAPTURE_SPILL_DIR):
+        if not mission_dir.is_dir(follow_symlinks=False):
+            continue
+        for entry in os.scandir(mission_dir.path):
+            try:
+                if entry.is_file(follow_symlinks=False) and now - entry.stat().st_mtime > CAPTURE_SPILL_TTL_S:
+                    remove_spill(entry.path)
+                    deleted += 1
+            except OSError:
+                continue
+    if deleted:
+        logger.info(f"Deleted {deleted} spill file(s) older than {CAPTURE_SPILL_TTL_S:.0f}s")
+    return deleted
+
+
+def spill_prefix(mission_id: str, step_id: str) -> Optional[str]:
+    """Return the spill path prefix of a step, or None if spilling is off."""
+    if not CAPTURE_SPILL:
+        return None
+    sweep_spills()
+    return os.path.join(CAPTURE_SPILL_DIR, _safe_id(mission_id), _safe_id(step_id))
+
+
+class CaptureBuffer:
+    """Head and tail of one output stream, with an optional full spill file."""
+    
+    def __init__(self, head_bytes: int, tail_bytes: int, spill_path: Optional[str] = None):
+        """Initialize the buffer.
+        
+        Args:
+            head_bytes: Bytes kept from the start of the stream
+            tail_bytes: Bytes kept from the end of the stream
+            spill_path: Optional gzip file receiving the whole stream
+        """
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.spill_path = spill_path
+        self.total_bytes = 0
+        
+        self._lock = threading.Lock()
+        self._head = bytearray()
+        self._tail: deque = deque()
+        self._tail_size = 0
+        self._spill = None
+        if spill_path:
+            os.makedirs(os.path.dirname(spill_path) or ".", exist_ok=True)
+            self._spill = gzip.open(spill_path, "wb", compresslevel=5)
+    
+    def write(self, text: str):
+        """Append output."""
+        data = text.encode("utf-8", errors="replace")
+        with self._lock:
+            self.total_bytes += len(data)
+            if self._spill is not None:
+                self._spill.write(data)
+                
+            room = self.head_bytes - len(self._head)
+            if room > 0:
+                self._head += data[:room]
+                data = data[room:]
+            if not data:
+                return
+                
+            self._tail.append(data)
+            self._tail_size += len(data)
+            while self._tail_size > self.tail_bytes:
+                excess = self._tail_size - self.tail_bytes
+                if len(self._tail[0]) <= excess:
+                    self._tail_size -= len(self._tail.popleft())
+                else:
+                    self._tail[0] = self._tail[0][excess:]
+                    self._tail_size -= excess
+    
+    @property
+    def truncated(self) -> bool:
+        """Whether part of the stream was left out of text()."""
+        return self.total_bytes > len(self._head) + self._tail_size
+    
+    def text(self) -> str:
+        """Return the head and tail, with a marker for the bytes in between."""
+        with self._lock:
+            head = bytes(self._head)
+            tail = b"".join(self._tail)
+            omitted = self.total_bytes - len(head) - len(tail)
+        if omitted:
+            return (
+                head.decode("utf-8", errors="replace")
+                + f"\n[... {omitted} bytes omitted ...]\n"
+                + tail.decode("utf-8", errors="replace")
+            )
+        return (head + tail).decode("utf-8", errors="replace")
+    
+    def close(self):
+        """Finish the spill file."""
+        with self._lock:
+            if self._spill is not None:
+                self._spill.close()
+                self._spill = None
+
+
+class StepCapture:
+    """Capture buffers for the stdout and stderr of one step."""
+    
+    def __init__(self, head_bytes: int, tail_bytes: int, spill_to: Optional[str] = None):
+        """Initialize the capture.
+        
+        Args:
+            head_bytes: Bytes kept from the start of each stream
+            tail_bytes: Bytes kept from the end of each stream
+            spill_to: Optional path prefix; streams are spilled to
+                "<spill_to>.stdout.gz" and "<spill_to>.stderr.gz"
+        """
+        self.buffers = {
+            stream: CaptureBuffer(head_bytes, tail_bytes, f"{spill_to}.{stream}.gz" if spill_to else None)
+            for stream in STREAMS
+        }
+    
+    def write(self, stream: str, text: str):
+        """Append output to a stream ("stdout" or "stderr")."""
+        self.buffers[stream].write(text)
+    
+    def text(self, stream: str) -> str:
+        """Return the captured head and tail of a stream."""
+        return self.buffers[stream].text()
+    
+    def close(self) -> Dict[str, Any]:
+        """Finish the spill files and return per-stream byte counts.
+        
+        Returns:
+            Dictionary per stream with "bytes", "truncated" and, if spilled,
+            "spill" (the gzip file path)
+        """
+        summary = {}
+        for stream, buffer in self.buffers.items():
+            buffer.close()
+            summary[stream] = {"bytes": buffer.total_bytes, "truncated": buffer.truncated}
+            if buffer.spill_path:
+                summary[stream]["spill"] = buffer.spill_path
+        return summary
@@ -0,0 +1,213 @@
+"""Durable outbox for step events.
+
+Events are appended to a local SQLite file and sent to the backend by a
+background thread in batches, so reporting never blocks step execution and
+survives backend outages and client restarts. Every event carries an
+idempotency key; the backend stores a resent event only once. A batch the
+backend rejects is split and resent, so only the events it rejects on their
+own are dropped.
+"""
+import json
+import time
+import uuid
+import random
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+from config import OUTBOX_PATH, OUTBOX_BATCH_SIZE, OUTBOX_MAX_BACKOFF
+from utils.logger import setup_logger
+
+logger = setup_logger("event_outbox")
+
+INITIAL_BACKOFF = 0.5  # seconds
+
+
+class EventOutbox:
+    """SQLite-backed event queue with a batching background flusher."""
+    
+    def __init__(self, http_client, path: str = OUTBOX_PATH, batch_size: int = OUTBOX_BATCH_SIZE,
+                 max_backoff: float = OUTBOX_MAX_BACKOFF):
+        """Open (or create) the outbox.
+        
+        Events left over from a previous run are sent once the flusher starts.
+        
+        Args:
+            http_client: HTTPClient used to post event batches
+            path: SQLite file holding unsent events
+            batch_size: Maximum events per request
+            max_backoff: Maximum seconds between retries while the backend fails
+        """
+        self.http_client = http_client
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.max_backoff = max_backoff
+        
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                mission_id TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        
+        self._cond = threading.Condition()
+        self._pending: Dict[str, int] = {}
+        for mission_id, count in self._conn.execute("SELECT mission_id, COUNT(*) FROM outbox GROUP BY mission_id"):
+            self._pending[mission_id] = count
+        if self._pending:
+            logger.info(f"Outbox has {sum(self._pending.values())} unsent events from a previous run")
+            
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        self.sent = 0
+        self.failed_flushes = 0
+        self.dropped = 0
+        # Events per request; halved while the backend rejects batches
+        self._batch_limit = self.batch_size
+        # Plan ETag reported by the backend with the last acknowledged batch, per mission
+        self.plan_etags: Dict[str, str] = {}
+    
+    def append(self, mission_id: str, event_data: Dict[str, Any]) -> str:
+        """Store an event for sending.
+        
+        Args:
+            mission_id: Mission identifier
+            event_data: Event fields (step_id, status, stdout, ...)
+            
+        Returns:
+            The idempotency key assigned to the event
+        """
+        key = uuid.uuid4().hex
+        payload = json.dumps({**event_data, "idempotency_key": key})
+        with self._cond:
+            self._conn.execute(
+                "INSERT INTO outbox (mission_id, payload, created_at) VALUES (?, ?, ?)",
+                (mission_id, payload, time.time())
+            )
+            self._pending[mission_id] = self._pending.get(mission_id, 0) + 1
+            self._cond.notify_all()
+        return key
+    
+    def pending(self, mission_id: Optional[str] = None) -> int:
+        """Return the number of unsent events (for one mission or in total)."""
+        with self._cond:
+            if mission_id is not None:
+                return self._pending.get(mission_id, 0)
+            return sum(self._pending.values())
+    
+    def start(self):
+        """Start the background flusher."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped = False
+        self._thread = threading.Thread(target=self._flush_loop, name="event-outbox", daemon=True)
+        self._thread.start()
+    
+    def drain(self, mission_id: Optional[str] = None, timeout: Optional[float] = None) -> bool:
+        """Wait until the events of a mission (or all events) have been sent.
+        
+        Args:
+            mission_id: Mission to wait for, or None for all missions
+            timeout: Maximum seconds to wait
+            
+        Returns:
+            True if nothing is left to send
+        """
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: (self._pending.get(mission_id, 0) if mission_id else sum(self._pending.values())) == 0,
+                timeout
+            )
+    
+    def close(self, timeout: float = 2.0):
+        """Try to send the remaining events, then stop the flusher.
+        
+        Unsent events stay on disk and are sent on the next start.
+        """
+        self.drain(timeout=timeout)
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        remaining = self.pending()
+        if remaining:
+            logger.warning(f"Outbox closed with {remaining} unsent events (kept in {self.path})")
+    
+    def _next_batch(self) -> List[tuple]:
+        # Oldest mission first; events of a mission are sent in the order they happened
+        with self._cond:
+            row = self._conn.execute("SELECT mission_id FROM outbox ORDER BY seq LIMIT 1").fetchone()
+            if row is None:
+                return []
+            return self._conn.execute(
+                "SELECT seq, mission_id, payload FROM outbox WHERE mission_id = ? ORDER BY seq LIMIT ?",
+                (row[0], self._batch_limit)
+            ).fetchall()
+    
+    def _remove(self, batch: List[tuple]):
+        mission_id = batch[0][1]
+        with self._cond:
+            self._conn.executemany("DELETE FROM outbox WHERE seq = ?", [(seq,) for seq, _, _ in batch])
+            left = self._pending.get(mission_id, 0) - len(batch)
+            if left > 0:
+                self._pending[mission_id] = left
+            else:
+                self._pending.pop(mission_id, None)
+            self._cond.notify_all()
+    
+    def _flush_loop(self):
+        backoff = 0.0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._stopped or self._pending)
+                if self._stopped:
+                    return
+                if backoff:
+                    # Only stop() interrupts a backoff
+                    self._cond.wait_for(lambda: self._stopped, backoff)
+                    if self._stopped:
+                        return
+                        
+            try:
+                batch = self._next_batch()
+                if not batch:
+                    with self._cond:
+                        self._pending.clear()
+                    continue
+                    
+                mission_id = batch[0][1]
+                result = self.http_client.post_events(mission_id, [json.loads(payload) for _, _, payload in batch])
+            except Exception as e:
+                logger.error(f"Outbox flush failed: {e}")
+                result = None
+                
+            if result is None:
+                self.failed_flushes += 1
+                backoff = min(self.max_backoff, backoff * 2 if backoff else INITIAL_BACKOFF)
+                backoff *= random.uniform(0.8, 1.2)
+                logger.warning(f"Backend unavailable, {self.pending()} events queued (retry in {backoff:.1f}s)")
+                continue
+                
+            backoff = 0.0
+            if not result.get("ok"):
+                if len(batch) > 1 and result.get("status_code") != 404:
+                    # Resend each half, so only the invalid events are dropped
+                    self._batch_limit = len(batch) // 2
+                    logger.warning(f"Batch of {len(batch)} events for mission {mission_id} rejected, "
+                                   f"resending in batches of {self._batch_limit}")
+                    continue
+                # Resending would be rejected again (e.g. the mission no longer exists)
+                self.dropped += len(batch)
+                logger.error(f"Dropping {len(batch)} events for mission {mission_id} rejected by the backend")
+            else:
+                self._batch_limit = min(self.batch_size, self._batch_limit * 2)
+                self.sent += len(batch)
+                if result.get("plan_etag"):
+                    self.plan_etags[mission_id] = result["plan_etag"]
+                logger.info(f"Outbox sent {len(batch)} events for mission {mission_id}")
+            self._remove(batch)
@@ -1,26 +1,126 @@
 """HTTP client for backend communication."""
+import gzip
+import json
+import time
+import random
 import requests
-from typing import Optional, Dict, Any
+from requests.adapters import HTTPAdapter
+from typing import Optional, Dict, Any, List, Tuple
+from config import (
+    HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_RETRIES, HTTP_RETRY_BACKOFF,
+    HTTP_POOL_SIZE, HTTP_GZIP_MIN_BYTES, HTTP_MAX_RETRY_AFTER
+)
+from utils.latency_stats import LatencyStats
+from utils.tracing import tracer, KIND_CLIENT
 from utils.logger import setup_logger
 
 logger = setup_logger("http_client")
 
+# Responses worth retrying (the request may succeed on another attempt)
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+
 
 class HTTPClient:
     """HTTP client for communicating with the backend."""
     
-    def __init__(self, backend_url: str):
+    def __init__(self, backend_url: str, retries: int = HTTP_RETRIES, pool_size: int = HTTP_POOL_SIZE,
+                 gzip_min_bytes: int = HTTP_GZIP_MIN_BYTES, stats: Optional[LatencyStats] = None):
         """Initialize HTTP client.
         
         Args:
             backend_url: Base URL of the backend server
+            retries: Extra attempts for idempotent calls on connection
+                errors, timeouts and 429/502/503/504 responses
+            pool_size: Connections kept open to the backend (one per
+                concurrent worker: controller, prefetch, outbox)
+            gzip_min_bytes: Request bodies at least this large are gzipped
+            stats: Latency stats to record calls in (shared by several
+                clients, e.g. the virtual macs of a simulated fleet)
         """
         self.backend_url = backend_url.rstrip('/')
+        self.retries = max(0, retries)
+        self.gzip_min_bytes = gzip_min_bytes
+        self.timeout = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+        self.stats = stats if stats is not None else LatencyStats()
+        
         self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
         self.session.headers.update({
             'Content-Type': 'application/json'
         })
     
+    def _encode(self, payload: Any) -> tuple:
+        """Serialize a JSON body, gzipping it above the size threshold."""
+        body = json.dumps(payload).encode("utf-8")
+        if self.gzip_min_bytes and len(body) >= self.gzip_min_bytes:
+            return gzip.compress(body, compresslevel=5), {"Content-Encoding": "gzip"}
+        return body, {}
+    
+    def _backoff(self, attempt: int, response: Optional[requests.Response]) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            # A misbehaving server must not park the caller for hours
+            return min(float(retry_after), HTTP_MAX_RETRY_AFTER)
+        # Full jitter keeps clients that failed together from retrying together
+        return random.uniform(0, HTTP_RETRY_BACKOFF * (2 ** attempt))
+    
+    def _request(self, method: str, endpoint: str, path: str, idempotent: bool,
+                 json_body: Any = None, **kwargs) -> requests.Response:
+        """Send a request, retrying idempotent calls, and record its latency.
+        
+        Args:
+            method: HTTP method
+            endpoint: Endpoint name for latency stats
+            path: URL path below the backend URL
+            idempotent: Whether the call may be retried
+            json_body: Optional JSON body (gzipped if large)
+            **kwargs: Passed to requests (params, ...)
+            
+        Returns:
+            The final response (may be an error status)
+            
+        Raises:
+            requests.exceptions.RequestException: If no response was received
+        """
+        if json_body is not None:
+            kwargs["data"], headers = self._encode(json_body)
+            kwargs["headers"] = {**kwargs.get("headers", {}), **headers}
+            
+        if tracer.current() is None:
+            return self._send(method, endpoint, path, idempotent, **kwargs)
+        with tracer.span(f"HTTP {method}", KIND_CLIENT, {"http.method": method, "http.route": endpoint}) as span:
+            kwargs["headers"] = tracer.inject(dict(kwargs.get("headers", {})))
+            response = self._send(method, endpoint, path, idempotent, **kwargs)
+            span.set_attribute("http.status_code", response.status_code)
+            return response
+    
+    def _send(self, method: str, endpoint: str, path: str, idempotent: bool, **kwargs) -> requests.Response:
+        """Send a request with retries (see _request)."""
+        attempts = 1 + (self.retries if idempotent else 0)
+        started = time.perf_counter()
+        for attempt in range(attempts):
+            response = None
+            try:
+                response = self.session.request(
+                    method, f"{self.backend_url}{path}", timeout=self.timeout, **kwargs
+                )
+                if response.status_code not in RETRY_STATUS_CODES or attempt == attempts - 1:
+                    self.stats.record(endpoint, time.perf_counter() - started, response.ok, attempt)
+                    return response
+                logger.warning(f"{endpoint} returned {response.status_code}, retrying ({attempt + 1}/{attempts - 1})")
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt == attempts - 1:
+                    self.stats.record(endpoint, time.perf_counter() - started, False, attempt)
+                    raise
+                logger.warning(f"{endpoint} failed ({e.__class__.__name__}), retrying ({attempt + 1}/{attempts - 1})")
+            time.sleep(self._backoff(attempt, response))
+    
+    def latency_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return call counts and latency percentiles per endpoint."""
+        return self.stats.snapshot()
+    
     def get_next_step(self, mission_id: str, mac_id: str) -> Optional[Dict[str, Any]]:
         """Get the next step for a mission.
         
@@ -31,23 +131,111 @@ class HTTPClient:
         Returns:
             Dictionary with step data or None if no steps remaining
         """
+        data = self.get_next_step_response(mission_id, mac_id)
+        return data.get("step") if data else None
+    
+    def get_next_step_response(self, mission_id: str, mac_id: str,
+                               exclude: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """Get the full next-step response for a mission.
+        
+        Args:
+            mission_id: Mission identifier
+            mac_id: macOS client identifier
+            exclude: Step IDs already run whose events may not be stored yet
+            
+        Returns:
+            Dictionary with "step" and mission "status", or None on error
+        """
         try:
-            url = f"{self.backend_url}/missions/{mission_id}/next_step"
             params = {"mac_id": mac_id}
-            
-            response = self.session.get(url, params=params, timeout=10)
+            if exclude:
+                params["exclude"] = ",".join(exclude)
+                
+            response = self._request(
+                "GET", "GET /missions/{id}/next_step", f"/missions/{mission_id}/next_step",
+                idempotent=True, params=params
+            )
             response.raise_for_status()
             
-            data = response.json()
-            return data.get("step")
+            return response.json()
             
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to get next step: {e}")
             return None
     
+    def get_trace_context(self, mission_id: str) -> Optional[str]:
+        """Return the mission's trace context (a W3C traceparent header) from the backend.
+        
+        Args:
+            mission_id: Mission identifier
+            
+        Returns:
+            traceparent header value, or None if unavailable
+        """
+        try:
+            response = self._request(
+                "GET", "GET /missions/{id}/cursor", f"/missions/{mission_id}/cursor", idempotent=True
+            )
+            return response.headers.get("traceparent")
+            
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Failed to get trace context: {e}")
+            return None
+    
+    def get_steps(self, mission_id: str, etag: Optional[str] = None) -> Optional[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+        """Download a mission's full plan, revalidating a copy already held.
+        
+        Args:
+            mission_id: Mission identifier
+            etag: ETag of the plan already downloaded, if any
+            
+        Returns:
+            (plan, etag) if the plan changed, (None, etag) if the held copy is
+            still current, or None on error
+        """
+        try:
+            headers = {"If-None-Match": etag} if etag else {}
+            response = self._request(
+                "GET", "GET /missions/{id}/steps", f"/missions/{mission_id}/steps",
+                idempotent=True, headers=headers
+            )
+            if response.status_code == 304:
+                return None, etag
+            response.raise_for_status()
+            
+            return response.json(), response.headers.get("ETag")
+            
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Failed to get steps: {e}")
+            return None
+    
+    def get_cursor(self, mission_id: str) -> Optional[Dict[str, Any]]:
+        """Get the steps the backend has recorded as done for a mission.
+        
+        Args:
+            mission_id: Mission identifier
+            
+        Returns:
+            Dictionary with status, etag, completed step IDs and next_step_id,
+            or None on error
+        """
+        try:
+            response = self._request(
+                "GET", "GET /missions/{id}/cursor", f"/missions/{mission_id}/cursor", idempotent=True
+            )
+            response.raise_for_status()
+            
+            return response.json()
+            
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Failed to get cursor: {e}")
+            return None
+    
     def post_event(self, mission_id: str, event_data: Dict[str, Any]) -> bool:
         """Post an event for a mission step.
         
+        The call is retried only if the event carries an idempotency_key.
+        
         Args:
             mission_id: Mission identifier
             event_data: Event data to post
@@ -56,9 +244,10 @@ class HTTPClient:
             True if successful, False otherwise
         """
         try:
-            url = f"{self.backend_url}/missions/{mission_id}/events"
-            
-            response = self.session.post(url, json=event_data, timeout=10)
+            response = self._request(
+                "POST", "POST /missions/{id}/events", f"/missions/{mission_id}/events",
+                idempotent=bool(event_data.get("idempotency_key")), json_body=event_data
+            )
             response.raise_for_status()
             
             result = response.json()
@@ -69,6 +258,100 @@ class HTTPClient:
             logger.error(f"Failed to post event: {e}")
             return False
     
+    def post_events(self, mission_id: str, events: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Post a batch of events for a mission.
+        
+        Retried like other idempotent calls, since every event carries an
+        idempotency key.
+        
+        Args:
+            mission_id: Mission identifier
+            events: Event data to post, each with an idempotency_key
+            
+        Returns:
+            Response JSON ({"ok": True, ...}) if stored, {"ok": False,
+            "status_code": ...} if the backend rejected the batch for good
+            (4xx other than 408/429), or None on a transient failure
+        """
+        try:
+            response = self._request(
+                "POST", "POST /missions/{id}/events/batch", f"/missions/{mission_id}/events/batch",
+                idempotent=True, json_body={"events": events}
+            )
+            if 400 <= response.status_code < 500 and response.status_code not in (408, 429):
+                logger.error(f"Event batch rejected ({response.status_code}): {response.text[:200]}")
+                return {"ok": False, "status_code": response.status_code}
+            response.raise_for_status()
+            
+            return response.json()
+            
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Failed to post event batch: {e}")
+            return None
+    
+    def post_logs(self, mission_id: str, step_id: str, chunks: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Append live output of a running step.
+        
+        Retried like other idempotent calls, since every chunk carries a
+        per-step seq.
+        
+        Args:
+            mission_id: Mission identifier
+            step_id: Step identifier
+            chunks: Output chunks with seq, stream and data
+            
+        Returns:
+            Response JSON ({"ok": True, ...}) if stored, {"ok": False,
+            "status_code": ...} if the backend rejected the chunks for good,
+            or None on a transient failure
+        """
+        try:
+            response = self._request(
+                "POST", "POST /missions/{id}/steps/{step_id}/logs", f"/missions/{mission_id}/steps/{step_id}/logs",
+                idempotent=True, json_body={"chunks": chunks}
+            )
+            if 400 <= response.status_code < 500 and response.status_code not in (408, 429):
+                logger.error(f"Log chunks rejected ({response.status_code}): {response.text[:200]}")
+                return {"ok": False, "status_code": response.status_code}
+            response.raise_for_status()
+            
+            return response.json()
+            
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Failed to post logs: {e}")
+            return None
+    
+    def upload_output(self, mission_id: str, step_id: str, stream: str, path: str) -> bool:
+        """Upload a step's spilled output stream (a gzip file).
+        
+        The file is streamed from disk as the request body. It is not
+        retried, since the body cannot be replayed; uploading again replaces
+        the stored file.
+        
+        Args:
+            mission_id: Mission identifier
+            step_id: Step identifier
+            stream: "stdout" or "stderr"
+            path: Gzip file written by StepCapture
+            
+        Returns:
+            True if stored, False otherwise
+        """
+        try:
+            with open(path, "rb") as f:
+                response = self._request(
+                    "PUT", "PUT /missions/{id}/steps/{step_id}/output/{stream}",
+                    f"/missions/{mission_id}/steps/{step_id}/output/{stream}",
+                    idempotent=False, data=f, headers={"Content-Type": "application/gzip"}
+                )
+            response.raise_for_status()
+            logger.info(f"Uploaded {stream} of step {step_id}: {response.json().get('bytes')} bytes")
+            return True
+            
+        except (OSError, requests.exceptions.RequestException) as e:
+            logger.error(f"Failed to upload {stream} of step {step_id}: {e}")
+            return False
+    
     def get_mission(self, mission_id: str) -> Optional[Dict[str, Any]]:
         """Get mission details.
         
@@ -79,9 +362,9 @@ class HTTPClient:
             Dictionary with mission data or None if not found
         """
         try:
-            url = f"{self.backend_url}/missions/{mission_id}"
-            
-            response = self.session.get(url, timeout=10)
+            response = self._request(
+                "GET", "GET /missions/{id}", f"/missions/{mission_id}", idempotent=True
+            )
             response.raise_for_status()
             
             return response.json()
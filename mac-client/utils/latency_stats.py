@@ -0,0 +1,69 @@
+"""Per-endpoint latency statistics for backend calls."""
+import threading
+from collections import deque
+from typing import Dict, Any, Optional
+
+
+class LatencyStats:
+    """Thread-safe call counts and latency percentiles keyed by endpoint."""
+    
+    def __init__(self, window: int = 1000):
+        """Initialize the stats.
+        
+        Args:
+            window: Latest samples kept per endpoint for percentiles
+        """
+        self.window = window
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, Dict[str, Any]] = {}
+    
+    def record(self, endpoint: str, seconds: float, ok: bool = True, retries: int = 0):
+        """Record one call (including its retries).
+        
+        Args:
+            endpoint: Endpoint name, e.g. "GET /missions/{id}/next_step"
+            seconds: Wall time of the call
+            ok: Whether the call succeeded
+            retries: Attempts beyond the first
+        """
+        with self._lock:
+            entry = self._endpoints.get(endpoint)
+            if entry is None:
+                entry = {"calls": 0, "errors": 0, "retries": 0, "samples": deque(maxlen=self.window)}
+                self._endpoints[endpoint] = entry
+            entry["calls"] += 1
+            entry["errors"] += 0 if ok else 1
+            entry["retries"] += retries
+            entry["samples"].append(seconds)
+    
+    @staticmethod
+    def _percentile(ordered: list, pct: float) -> Optional[float]:
+        if not ordered:
+            return None
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct))] * 1000, 1)
+    
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Return counts and p50/p95/max latency (ms) per endpoint."""
+        with self._lock:
+            snapshot = {}
+            for endpoint, entry in self._endpoints.items():
+                ordered = sorted(entry["samples"])
+                snapshot[endpoint] = {
+                    "calls": entry["calls"],
+                    "errors": entry["errors"],
+                    "retries": entry["retries"],
+                    "p50_ms": self._percentile(ordered, 0.50),
+                    "p95_ms": self._percentile(ordered, 0.95),
+                    "max_ms": round(ordered[-1] * 1000, 1) if ordered else None,
+                }
+            return snapshot
+    
+    def summary(self) -> str:
+        """Return a one-line summary for logs."""
+        parts = [
+            f"{endpoint}: {stats['calls']} calls, p50 {stats['p50_ms']}ms, p95 {stats['p95_ms']}ms"
+            + (f", {stats['errors']} errors" if stats["errors"] else "")
+            + (f", {stats['retries']} retries" if stats["retries"] else "")
+            for endpoint, stats in sorted(self.snapshot().items())
+        ]
+        return "; ".join(parts) if parts else "no calls"
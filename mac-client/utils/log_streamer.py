@@ -0,0 +1,217 @@
+"""Live upload of command output to the backend.
+
+``run_command`` hands every chunk of output to ``LogStreamer.write``, which
+only appends it to an in-memory buffer. A background thread merges the
+buffered chunks and posts them to the backend's log-append endpoint every
+``flush_interval`` seconds, so observers can tail a build while it runs.
+The buffer is bounded: if the backend is slow or down, the oldest output is
+dropped and replaced by a marker (the step event still carries the end of
+the output). Output written after a step finished (e.g. by a re-run of the
+step) continues its seq numbers, so the backend never ignores it as a
+duplicate.
+"""
+import random
+import threading
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+from config import LOG_FLUSH_INTERVAL, LOG_BATCH_BYTES, LOG_MAX_BUFFER_BYTES
+from utils.logger import setup_logger
+
+logger = setup_logger("log_streamer")
+
+MAX_BACKOFF = 10.0  # seconds
+# Finished steps whose next seq number is remembered
+FINISHED_STEPS_KEPT = 1000
+
+
+class _StepLog:
+    """Buffered output of one step, waiting to be uploaded."""
+    
+    def __init__(self):
+        self.chunks: Deque[Tuple[str, str]] = deque()
+        self.size = 0
+        self.dropped = 0
+        self.next_seq = 0
+        # Batch sent but not acknowledged; resent as is so seq numbers stay stable
+        self.in_flight: Optional[List[Dict]] = None
+        self.finished = False
+    
+    def pending(self) -> bool:
+        return bool(self.chunks or self.dropped or self.in_flight)
+
+
+class LogStreamer:
+    """Batches live command output per step and posts it in the background."""
+    
+    def __init__(self, http_client, flush_interval: float = LOG_FLUSH_INTERVAL,
+                 batch_bytes: int = LOG_BATCH_BYTES, max_buffer_bytes: int = LOG_MAX_BUFFER_BYTES):
+        """Initialize the streamer.
+        
+        Args:
+            http_client: HTTPClient used to post output
+            flush_interval: Seconds between uploads
+            batch_bytes: Maximum characters of output per upload
+            max_buffer_bytes: Characters buffered per step before the oldest are dropped
+        """
+        self.http_client = http_client
+        self.flush_interval = flush_interval
+        self.batch_bytes = max(1, batch_bytes)
+        self.max_buffer_bytes = max(self.batch_bytes, max_buffer_bytes)
+        
+        self._cond = threading.Condition()
+        self._steps: Dict[Tuple[str, str], _StepLog] = {}
+        # Next seq number of steps whose output has been uploaded and finished
+        self._finished: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        self.sent_bytes = 0
+        self.dropped_bytes = 0
+    
+    def writer(self, mission_id: str, step_id: str) -> Callable[[str, str], None]:
+        """Return an output callback(stream, text) for one step."""
+        return lambda stream, text: self.write(mission_id, step_id, stream, text)
+    
+    def write(self, mission_id: str, step_id: str, stream: str, text: str):
+        """Buffer a chunk of output for upload.
+        
+        Args:
+            mission_id: Mission identifier
+            step_id: Step identifier
+            stream: "stdout" or "stderr"
+            text: Output text
+        """
+        with self._cond:
+            key = (mission_id, step_id)
+            log = self._steps.get(key)
+            if log is None:
+                log = self._steps[key] = _StepLog()
+                if key in self._finished:
+                    # Late output of a finished step: continue its seq, and drop the entry once uploaded
+                    log.next_seq = self._finished.pop(key)
+                    log.finished = True
+            log.chunks.append((stream, text))
+            log.size += len(text)
+            while log.size > self.max_buffer_bytes and len(log.chunks) > 1:
+                _, removed = log.chunks.popleft()
+                log.size -= len(removed)
+                log.dropped += len(removed)
+                self.dropped_bytes += len(removed)
+            self._cond.notify_all()
+    
+    def start(self):
+        """Start the background uploader."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped = False
+        self._thread = threading.Thread(target=self._flush_loop, name="log-streamer", daemon=True)
+        self._thread.start()
+    
+    def finish(self, mission_id: str, step_id: str, timeout: Optional[float] = None) -> bool:
+        """Mark a step's output complete and wait until it has been uploaded.
+        
+        Args:
+            mission_id: Mission identifier
+            step_id: Step identifier
+            timeout: Maximum seconds to wait (0 to return at once)
+            
+        Returns:
+            True if nothing is left to upload
+        """
+        with self._cond:
+            log = self._steps.get((mission_id, step_id))
+            if log is None:
+                if (mission_id, step_id) not in self._finished:
+                    self._remember_finished((mission_id, step_id), 0)
+                return True
+            log.finished = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: (mission_id, step_id) not in self._steps, timeout)
+    
+    def close(self, timeout: float = 2.0):
+        """Upload what is left (up to timeout), then stop the uploader."""
+        with self._cond:
+            self._cond.wait_for(lambda: not self._has_work(), timeout)
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+    
+    def _remember_finished(self, key: Tuple[str, str], next_seq: int):
+        self._finished[key] = next_seq
+        self._finished.move_to_end(key)
+        while len(self._finished) > FINISHED_STEPS_KEPT:
+            self._finished.popitem(last=False)
+    
+    def _has_work(self) -> bool:
+        return any(log.pending() or log.finished for log in self._steps.values())
+    
+    def _next_batch(self, log: _StepLog) -> List[Dict]:
+        """Take up to batch_bytes of buffered output, merging chunks of the same stream."""
+        batch: List[Dict] = []
+        if log.dropped:
+            batch.append({"stream": "stderr", "data": f"[... {log.dropped} characters of output dropped ...]\n"})
+            log.dropped = 0
+        taken = 0
+        while log.chunks and taken < self.batch_bytes:
+            stream, text = log.chunks[0]
+            text = text[:self.batch_bytes - taken]
+            if len(text) == len(log.chunks[0][1]):
+                log.chunks.popleft()
+            else:
+                log.chunks[0] = (stream, log.chunks[0][1][len(text):])
+            log.size -= len(text)
+            taken += len(text)
+            if batch and batch[-1]["stream"] == stream:
+                batch[-1]["data"] += text
+            else:
+                batch.append({"stream": stream, "data": text})
+        for chunk in batch:
+            chunk["seq"] = log.next_seq
+            log.next_seq += 1
+        return batch
+    
+    def _flush_loop(self):
+        backoff = 0.0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._stopped or self._has_work())
+                if self._stopped:
+                    return
+                # Let output accumulate so one request carries many chunks
+                self._cond.wait_for(lambda: self._stopped, backoff or self.flush_interval)
+                if self._stopped:
+                    return
+                work = []
+                for key, log in self._steps.items():
+                    if log.in_flight is None and (log.chunks or log.dropped):
+                        log.in_flight = self._next_batch(log)
+                    work.append((key, log.in_flight or []))
+                    
+            failed = False
+            for (mission_id, step_id), batch in work:
+                result = None
+                if batch:
+                    try:
+                        result = self.http_client.post_logs(mission_id, step_id, batch)
+                    except Exception as e:
+                        logger.error(f"Log upload failed: {e}")
+                if batch and result is None:
+                    failed = True
+                    continue
+                if batch and not result.get("ok"):
+                    logger.error(f"Dropping output of step {step_id} rejected by the backend")
+                with self._cond:
+                    log = self._steps[(mission_id, step_id)]
+                    log.in_flight = None
+                    self.sent_bytes += sum(len(chunk["data"]) for chunk in batch)
+                    # Entries live until the step finished, so seq numbers keep increasing
+                    if log.finished and not log.pending():
+                        del self._steps[(mission_id, step_id)]
+                        self._remember_finished((mission_id, step_id), log.next_seq)
+                    self._cond.notify_all()
+                    
+            if failed:
+                backoff = min(MAX_BACKOFF, backoff * 2 if backoff else self.flush_interval * 2)
+                backoff *= random.uniform(0.8, 1.2)
+            else:
+                backoff = 0.0
@@ -2,6 +2,10 @@
 import logging
 import sys
 
+# Stream of the console handlers; None means sys.stdout
+_stream = None
+_handlers = []
+
 def setup_logger(name: str = "mac-client") -> logging.Logger:
     """Set up and configure logger.
     
@@ -15,7 +19,7 @@ def setup_logger(name: str = "mac-client") -> logging.Logger:
     logger.setLevel(logging.INFO)
     
     # Console handler
-    handler = logging.StreamHandler(sys.stdout)
+    handler = logging.StreamHandler(_stream or sys.stdout)
     handler.setLevel(logging.INFO)
     
     # Formatter
@@ -27,5 +31,16 @@ def setup_logger(name: str = "mac-client") -> logging.Logger:
     # Add handler if not already added
     if not logger.handlers:
         logger.addHandler(handler)
+        _handlers.append(handler)
     
     return logger
+
+def log_to_stderr():
+    """Send the output of all loggers, existing and future, to stderr.
+    
+    Keeps stdout free for machine-readable output such as the --simulate report.
+    """
+    global _stream
+    _stream = sys.stderr
+    for handler in _handlers:
+        handler.setStream(sys.stderr)
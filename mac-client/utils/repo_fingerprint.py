@@ -0,0 +1,119 @@
+"""Fast content fingerprint of a repository tree.
+
+The fingerprint is a SHA-256 over the relative path and content hash of
+every file. Content hashes are kept in a stat cache keyed by path and
+invalidated by mtime, size or inode changes, so fingerprinting an unchanged
+tree only costs one lstat per file; only files that changed are read again.
+"""
+import os
+import time
+import stat
+import hashlib
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+from config import RESULT_CACHE_IGNORE_DIRS, RESULT_CACHE_MAX_FILES
+from utils.logger import setup_logger
+
+logger = setup_logger("repo_fingerprint")
+
+READ_CHUNK_BYTES = 1024 * 1024
+# Files modified this recently may change again within the same mtime tick,
+# so their hash is not cached
+RACY_MTIME_S = 2.0
+
+
+class RepoFingerprinter:
+    """Computes tree fingerprints, reusing content hashes of unchanged files."""
+    
+    def __init__(self, ignore_dirs: Iterable[str] = RESULT_CACHE_IGNORE_DIRS,
+                 max_files: int = RESULT_CACHE_MAX_FILES):
+        """Initialize the fingerprinter.
+        
+        Args:
+            ignore_dirs: Directory names skipped anywhere in the tree
+            max_files: Trees with more files are not fingerprinted
+        """
+        self.ignore_dirs = set(ignore_dirs)
+        self.max_files = max_files
+        
+        self._lock = threading.Lock()
+        # root -> relative path -> (mtime_ns, size, inode, digest)
+        self._stats: Dict[str, Dict[str, Tuple[int, int, int, str]]] = {}
+        self.files_hashed = 0
+    
+    def fingerprint(self, root: str) -> Optional[str]:
+        """Return the fingerprint of a tree.
+        
+        Args:
+            root: Directory to fingerprint
+            
+        Returns:
+            Hex digest, or None if root is not a directory or has more than
+            max_files files
+        """
+        root = os.path.abspath(root)
+        if not os.path.isdir(root):
+            return None
+            
+        started = time.perf_counter()
+        with self._lock:
+            cached = self._stats.get(root, {})
+        seen: Dict[str, Tuple[int, int, int, str]] = {}
+        entries = []
+        hashed = 0
+        now_ns = time.time_ns()
+        
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if d not in self.ignore_dirs)
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                rel = os.path.relpath(path, root)
+                try:
+                    st = os.lstat(path)
+                except OSError:
+                    continue  # removed while walking
+                if not (stat.S_ISREG(st.st_mode) or stat.S_ISLNK(st.st_mode)):
+                    continue  # sockets, fifos and devices
+                    
+                entry = cached.get(rel)
+                if entry is None or entry[:3] != (st.st_mtime_ns, st.st_size, st.st_ino):
+                    digest = self._hash(path, st)
+                    if digest is None:
+                        continue
+                    hashed += 1
+                    entry = (st.st_mtime_ns, st.st_size, st.st_ino, digest)
+                if now_ns - st.st_mtime_ns > RACY_MTIME_S * 1e9:
+                    seen[rel] = entry
+                entries.append((rel, entry[3], st.st_mode & 0o111))
+                if len(entries) > self.max_files:
+                    logger.warning(f"Not fingerprinting {root}: more than {self.max_files} files")
+                    return None
+                    
+        entries.sort()
+        tree = hashlib.sha256()
+        for rel, digest, executable in entries:
+            tree.update(f"{rel}\0{digest}\0{executable:o}\n".encode("utf-8", errors="surrogateescape"))
+            
+        with self._lock:
+            self._stats[root] = seen
+            self.files_hashed += hashed
+        logger.info(
+            f"Fingerprinted {root}: {len(entries)} files, {hashed} hashed, "
+            f"{time.perf_counter() - started:.3f}s"
+        )
+        return tree.hexdigest()
+    
+    @staticmethod
+    def _hash(path: str, st: os.stat_result) -> Optional[str]:
+        """Return the content hash of a file (the target of a symlink)."""
+        digest = hashlib.sha256()
+        try:
+            if stat.S_ISLNK(st.st_mode):
+                digest.update(b"link:" + os.fsencode(os.readlink(path)))
+                return digest.hexdigest()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(READ_CHUNK_BYTES), b""):
+                    digest.update(chunk)
+            return digest.hexdigest()
+        except OSError:
+            return None
@@ -0,0 +1,219 @@
+"""Cache of run_command results keyed by command and repository content.
+
+Plans often re-run ``npm test`` or a build on a repository that has not
+changed since the last identical run. With ``RESULT_CACHE_ENABLED`` the
+exit code, stdout and stderr of a command are stored in a local SQLite file
+under a key made of the command, its working directory, selected
+environment variables and a fingerprint of the repository tree (see
+RepoFingerprinter). Only actions that opt in with ``"cache": true`` are
+cached, since the fingerprint cannot see side effects such as a commit or
+a push. An identical command on an identical tree is answered from the
+cache without running. Entries expire after a TTL and the least
+recently used are evicted beyond a size limit.
+"""
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, Optional
+from config import (
+    RESULT_CACHE_ENABLED, RESULT_CACHE_PATH, RESULT_CACHE_TTL_S, RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_ENV
+)
+from utils.repo_fingerprint import RepoFingerprinter
+from utils.logger import setup_logger
+
+logger = setup_logger("result_cache")
+
+
+def cache_key(cmd: str, cwd: Optional[str], env: Dict[str, Optional[str]], fingerprint: str) -> str:
+    """Build the cache key of a command run.
+    
+    Args:
+        cmd: Command string
+        cwd: Working directory
+        env: Selected environment variables (None if unset)
+        fingerprint: Repository tree fingerprint
+        
+    Returns:
+        Hex SHA-256 key
+    """
+    raw = json.dumps([cmd, os.path.abspath(cwd) if cwd else None, sorted(env.items()), fingerprint])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CommandResultCache:
+    """SQLite-backed run_command result cache with TTL and LRU eviction."""
+    
+    def __init__(self, path: str = RESULT_CACHE_PATH, ttl_s: float = RESULT_CACHE_TTL_S,
+                 max_entries: int = RESULT_CACHE_MAX_ENTRIES, env_names: Iterable[str] = RESULT_CACHE_ENV,
+                 enabled: bool = RESULT_CACHE_ENABLED):
+        """Initialize the cache. The SQLite file is opened on first use.
+        
+        Args:
+            path: SQLite file holding cached results
+            ttl_s: Seconds a result stays valid
+            max_entries: Maximum number of cached results
+            env_names: Environment variables that are part of the key
+            enabled: Whether commands are looked up and stored at all
+        """
+        self.path = path
+        self.ttl_s = ttl_s
+        self.max_entries = max(1, max_entries)
+        self.env_names = list(env_names)
+        self.enabled = enabled
+        self.fingerprinter = RepoFingerprinter()
+        
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+    
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS command_results (
+                    key TEXT PRIMARY KEY,
+                    cmd TEXT NOT NULL,
+                    cwd TEXT,
+                    return_code INTEGER NOT NULL,
+                    stdout TEXT NOT NULL,
+                    stderr TEXT NOT NULL,
+                    duration_s REAL,
+                    created_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+        return self._conn
+    
+    def key_for(self, action: Dict[str, Any], cwd: Optional[str], repo_path: Optional[str]) -> Optional[str]:
+        """Return the cache key of a run_command action, or None if it is not cacheable.
+        
+        The tree fingerprinted is the mission repository, or the working
+        directory when there is none. Only actions with "cache": true are
+        cacheable; they may add environment variables to the key with
+        "cache_env".
+        
+        Args:
+            action: run_command action
+            cwd: Working directory of the command
+            repo_path: Mission repository path
+            
+        Returns:
+            Cache key, or None if caching is disabled, the action did not opt
+            in or the tree cannot be fingerprinted
+        """
+        if not self.enabled or action.get("cache") is not True or not action.get("cmd"):
+            return None
+        root = repo_path or cwd
+        if not root:
+            return None
+        fingerprint = self.fingerprinter.fingerprint(root)
+        if fingerprint is None:
+            return None
+        names = self.env_names + list(action.get("cache_env") or [])
+        env = {name: os.environ.get(name) for name in names}
+        return cache_key(action["cmd"], cwd, env, fingerprint)
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a cached result.
+        
+        Args:
+            key: Cache key from key_for
+            
+        Returns:
+            Dictionary with return_code, stdout, stderr and duration_s (of the
+            original run), or None on a miss
+        """
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connection()
+                row = conn.execute("""
+                    SELECT return_code, stdout, stderr, duration_s, created_at
+                    FROM command_results
+                    WHERE key = ?
+                """, (key,)).fetchone()
+                
+                if row is None or now - row[4] > self.ttl_s:
+                    if row is not None:
+                        conn.execute("DELETE FROM command_results WHERE key = ?", (key,))
+                    self.misses += 1
+                    return None
+                    
+                conn.execute("""
+                    UPDATE command_results
+                    SET last_used_at = ?, hits = hits + 1
+                    WHERE key = ?
+                """, (now, key))
+                self.hits += 1
+                
+            return {"return_code": row[0], "stdout": row[1], "stderr": row[2], "duration_s": row[3]}
+            
+        except sqlite3.Error as e:
+            logger.error(f"Result cache lookup failed: {e}")
+            return None
+    
+    def put(self, key: str, cmd: str, cwd: Optional[str], return_code: int, stdout: str, stderr: str,
+            duration_s: Optional[float] = None):
+        """Store a command result and evict least recently used entries.
+        
+        Args:
+            key: Cache key from key_for (computed before the command ran)
+            cmd: Command string
+            cwd: Working directory
+            return_code: Exit code
+            stdout: Captured stdout
+            stderr: Captured stderr
+            duration_s: How long the command took
+        """
+        now = time.time()
+        with self._lock:
+            try:
+                conn = self._connection()
+                conn.execute("BEGIN")
+                conn.execute("""
+                    INSERT OR REPLACE INTO command_results
+                        (key, cmd, cwd, return_code, stdout, stderr, duration_s, created_at, last_used_at, hits)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
+                """, (key, cmd, cwd, return_code, stdout, stderr, duration_s, now, now))
+                conn.execute("DELETE FROM command_results WHERE created_at < ?", (now - self.ttl_s,))
+                
+                overflow = conn.execute("SELECT COUNT(*) FROM command_results").fetchone()[0] - self.max_entries
+                if overflow > 0:
+                    conn.execute("""
+                        DELETE FROM command_results
+                        WHERE key IN (
+                            SELECT key FROM command_results ORDER BY last_used_at ASC LIMIT ?
+                        )
+                    """, (overflow,))
+                    self.evictions += overflow
+                conn.execute("COMMIT")
+                self.stores += 1
+                
+            except sqlite3.Error as e:
+                logger.error(f"Result cache store failed: {e}")
+                if self._conn is not None and self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return hit, miss, store and eviction counts."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "files_hashed": self.fingerprinter.files_hashed
+            }
+
+
+# Shared cache used by the run_command handler
+result_cache = CommandResultCache()
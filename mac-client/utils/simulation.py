@@ -0,0 +1,306 @@
+"""Stand-ins for action execution, used to load-test the backend without macOS.
+
+With ``SIMULATE_ACTIONS`` every action type is handled by a stand-in
+(``actions/simulated.py``) that sleeps for a sampled latency and returns
+output of a sampled size instead of driving the screen or running commands.
+Latency, output sizes and failure rates come from a profile: built-in
+defaults, overridden per action type and field by the JSON file
+``SIMULATION_PROFILE``, e.g.::
+
+    {
+        "run_command": {
+            "latency_s": {"dist": "lognormal", "median": 8.0, "sigma": 1.0},
+            "stdout_bytes": {"dist": "uniform", "min": 1000, "max": 50000},
+            "failure_rate": 0.1
+        },
+        "screenshot": {"screenshot_bytes": {"dist": "constant", "value": 250000}}
+    }
+
+Supported distributions are ``constant`` (value), ``uniform`` (min, max),
+``lognormal`` (median, sigma), ``exponential`` (mean) and ``empirical``
+(samples). With ``SIMULATION_TRACES``, action spans recorded by real clients
+(see TRACING_ENABLED) replace the profile with empirical distributions of
+the recorded latencies, output sizes and failure rates.
+"""
+import json
+import math
+import time
+import base64
+import random
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+from config import SIMULATION_PROFILE, SIMULATION_TRACES, SIMULATION_SPEED, SIMULATION_SEED
+from utils.logger import setup_logger
+
+logger = setup_logger("simulation")
+
+DEFAULT_PROFILE: Dict[str, Dict[str, Any]] = {
+    "open_app": {"latency_s": {"dist": "lognormal", "median": 0.8, "sigma": 0.4}},
+    "open_project": {"latency_s": {"dist": "lognormal", "median": 1.2, "sigma": 0.4}},
+    "screenshot": {
+        "latency_s": {"dist": "lognormal", "median": 0.35, "sigma": 0.3},
+        "screenshot_bytes": {"dist": "lognormal", "median": 300000, "sigma": 0.4}
+    },
+    "prompt_kiro_ai": {"latency_s": {"dist": "lognormal", "median": 1.5, "sigma": 0.3}},
+    "wait_for_kiro_completion": {"latency_s": {"dist": "lognormal", "median": 20.0, "sigma": 0.7}},
+    "run_command": {
+        "latency_s": {"dist": "lognormal", "median": 3.0, "sigma": 1.0},
+        "stdout_bytes": {"dist": "lognormal", "median": 4000, "sigma": 1.5},
+        "stderr_bytes": {"dist": "lognormal", "median": 200, "sigma": 1.5},
+        "failure_rate": 0.05
+    },
+    "wait_for_file": {"latency_s": {"dist": "lognormal", "median": 2.0, "sigma": 0.8}},
+    "wait_for_marker": {"latency_s": {"dist": "constant", "value": 0.0}}
+}
+
+DISTRIBUTIONS = {
+    "constant": ("value",),
+    "uniform": ("min", "max"),
+    "lognormal": ("median", "sigma"),
+    "exponential": ("mean",),
+    "empirical": ("samples",)
+}
+
+# Span attributes of recorded actions holding output sizes
+SIZE_ATTRIBUTES = ("stdout_bytes", "stderr_bytes", "screenshot_bytes")
+PROFILE_FIELDS = ("latency_s", "failure_rate") + SIZE_ATTRIBUTES
+OUTPUT_CHUNK_S = 0.25  # seconds between streamed output chunks
+MAX_OUTPUT_CHUNKS = 20
+OUTPUT_LINE = "simulated output " + "0123456789abcdef" * 4 + "\n"
+
+
+def validate_distribution(spec: Any) -> Dict[str, Any]:
+    """Check a distribution spec.
+    
+    Args:
+        spec: Distribution spec, e.g. {"dist": "uniform", "min": 1, "max": 2}
+        
+    Returns:
+        The spec
+        
+    Raises:
+        ValueError: If the distribution is unknown or a parameter is missing
+    """
+    if not isinstance(spec, dict) or spec.get("dist") not in DISTRIBUTIONS:
+        raise ValueError(f"unknown distribution {spec!r}")
+    missing = [name for name in DISTRIBUTIONS[spec["dist"]] if name not in spec]
+    if missing:
+        raise ValueError(f"{spec['dist']} distribution needs {', '.join(missing)}")
+    if spec["dist"] == "empirical" and not spec["samples"]:
+        raise ValueError("empirical distribution needs at least one sample")
+    return spec
+
+
+def sample(spec: Dict[str, Any], rng: random.Random) -> float:
+    """Draw a non-negative value from a distribution spec."""
+    dist = spec["dist"]
+    if dist == "constant":
+        value = spec["value"]
+    elif dist == "uniform":
+        value = rng.uniform(spec["min"], spec["max"])
+    elif dist == "lognormal":
+        value = rng.lognormvariate(math.log(max(spec["median"], 1e-9)), spec["sigma"])
+    elif dist == "exponential":
+        value = rng.expovariate(1.0 / spec["mean"]) if spec["mean"] > 0 else 0.0
+    else:
+        value = rng.choice(spec["samples"])
+    return max(0.0, float(value))
+
+
+def merge_profile(base: Dict[str, Dict[str, Any]], overrides: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Return base with the fields of overrides replaced, per action type.
+    
+    Raises:
+        ValueError: If an override has an unknown field, or is not a valid
+            distribution or rate
+    """
+    merged = {action_type: dict(fields) for action_type, fields in base.items()}
+    for action_type, fields in overrides.items():
+        for field, value in fields.items():
+            if field not in PROFILE_FIELDS:
+                raise ValueError(f"unknown profile field {action_type}.{field} (expected one of {PROFILE_FIELDS})")
+            if field == "failure_rate":
+                if not 0.0 <= float(value) <= 1.0:
+                    raise ValueError(f"{action_type}.failure_rate must be between 0 and 1")
+                value = float(value)
+            else:
+                value = validate_distribution(value)
+            merged.setdefault(action_type, {})[field] = value
+    return merged
+
+
+def load_trace_profile(paths: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """Build empirical distributions from action spans in client trace files.
+    
+    The latency of a prompt_kiro_ai action excludes the wait for Kiro
+    recorded inside it, which becomes a wait_for_kiro_completion sample.
+    
+    Args:
+        paths: OTLP/JSON lines files written by the client tracer
+        
+    Returns:
+        Profile overrides with empirical latency, size and failure rate
+        per recorded action type
+    """
+    spans = []
+    for path in paths:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    for resource_spans in json.loads(line).get("resourceSpans", []):
+                        for scope_spans in resource_spans.get("scopeSpans", []):
+                            spans.extend(scope_spans.get("spans", []))
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to read trace file {path}: {e}")
+    
+    def duration(span: Dict[str, Any]) -> float:
+        return (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e9
+        
+    waits: Dict[str, float] = defaultdict(float)
+    samples: Dict[str, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
+    failures: Dict[str, int] = defaultdict(int)
+    for span in spans:
+        if span.get("name") == "wait_for_kiro":
+            waits[span.get("parentSpanId")] += duration(span)
+            samples["wait_for_kiro_completion"]["latency_s"].append(duration(span))
+            
+    for span in spans:
+        name = span.get("name", "")
+        if not name.startswith("action "):
+            continue
+        action_type = name[len("action "):]
+        attributes = {item["key"]: item["value"] for item in span.get("attributes", [])}
+        if attributes.get("action.cached", {}).get("boolValue"):
+            continue  # answered from the result cache, not representative
+        samples[action_type]["latency_s"].append(max(0.0, duration(span) - waits.get(span["spanId"], 0.0)))
+        for field in SIZE_ATTRIBUTES:
+            value = attributes.get(f"action.{field}", {}).get("intValue")
+            if value is not None:
+                samples[action_type][field].append(int(value))
+        if span.get("status", {}).get("code") == 2:
+            failures[action_type] += 1
+            
+    profile: Dict[str, Dict[str, Any]] = {}
+    for action_type, fields in samples.items():
+        profile[action_type] = {field: {"dist": "empirical", "samples": values} for field, values in fields.items()}
+        profile[action_type]["failure_rate"] = failures[action_type] / len(fields["latency_s"])
+    logger.info(
+        f"Loaded {sum(len(fields['latency_s']) for fields in samples.values())} recorded actions "
+        f"of {len(profile)} types from {len(spans)} spans"
+    )
+    return profile
+
+
+class ActionSimulator:
+    """Samples latency, output and failures of simulated actions."""
+    
+    def __init__(self, profile: Optional[Dict[str, Dict[str, Any]]] = None, speed: float = SIMULATION_SPEED,
+                 seed: Optional[int] = SIMULATION_SEED):
+        """Initialize the simulator.
+        
+        Args:
+            profile: Distributions per action type (DEFAULT_PROFILE if None)
+            speed: Multiplier applied to every sampled latency (0.1 runs
+                missions 10x faster)
+            seed: Random seed, for reproducible runs
+        """
+        self.profile = profile if profile is not None else DEFAULT_PROFILE
+        self.speed = max(0.0, speed)
+        
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._screenshot = ""
+    
+    @classmethod
+    def from_config(cls) -> "ActionSimulator":
+        """Create the simulator described by SIMULATION_PROFILE and SIMULATION_TRACES."""
+        profile = DEFAULT_PROFILE
+        if SIMULATION_PROFILE:
+            try:
+                with open(SIMULATION_PROFILE, "r", encoding="utf-8") as f:
+                    profile = merge_profile(profile, json.load(f))
+            except (OSError, ValueError) as e:
+                logger.error(f"Failed to load simulation profile {SIMULATION_PROFILE}: {e}")
+        if SIMULATION_TRACES:
+            profile = merge_profile(profile, load_trace_profile(SIMULATION_TRACES))
+        return cls(profile)
+    
+    def sample(self, action_type: str, field: str, default: float = 0.0) -> float:
+        """Draw a value of an action type's field, or default if the profile has none."""
+        spec = self.profile.get(action_type, {}).get(field)
+        if spec is None:
+            return default
+        with self._lock:
+            return sample(spec, self._rng)
+    
+    def fails(self, action_type: str) -> bool:
+        """Decide whether a simulated action fails."""
+        rate = self.profile.get(action_type, {}).get("failure_rate", 0.0)
+        with self._lock:
+            return self._rng.random() < rate
+    
+    def latency(self, action_type: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Sample how long an action takes, capped by its timeout.
+        
+        Args:
+            action_type: Action type
+            timeout: Seconds after which the real action would give up
+            
+        Returns:
+            Dictionary with "seconds" (scaled by speed) and "timed_out"
+        """
+        seconds = self.sample(action_type, "latency_s")
+        timed_out = timeout is not None and seconds > timeout
+        if timed_out:
+            seconds = timeout
+        return {"seconds": seconds * self.speed, "timed_out": timed_out}
+    
+    def wait(self, action_type: str, timeout: Optional[float] = None) -> bool:
+        """Sleep for a sampled latency; return whether the action timed out."""
+        latency = self.latency(action_type, timeout)
+        time.sleep(latency["seconds"])
+        return latency["timed_out"]
+    
+    @staticmethod
+    def output(nbytes: int, stream: str = "stdout") -> str:
+        """Return nbytes of synthetic output lines."""
+        if nbytes <= 0:
+            return ""
+        line = f"[{stream}] {OUTPUT_LINE}"
+        return (line * (nbytes // len(line) + 1))[:nbytes]
+    
+    def screenshot(self, nbytes: int) -> str:
+        """Return a base64 string of about nbytes, like an encoded screenshot."""
+        nbytes = max(4, nbytes - nbytes % 4)
+        with self._lock:
+            if len(self._screenshot) < nbytes:
+                # Random bytes do not compress, like real image data; grown with headroom
+                self._screenshot = base64.b64encode(self._rng.randbytes(nbytes * 3 // 2)).decode("ascii")
+            return self._screenshot[:nbytes]
+    
+    def stream_output(self, seconds: float, outputs: Dict[str, str], on_output=None):
+        """Sleep for seconds, handing outputs to on_output in chunks along the way.
+        
+        Args:
+            seconds: Total time to spend
+            outputs: Text per stream
+            on_output: Optional callback(stream, text), as used by run_command
+        """
+        if on_output is None:
+            time.sleep(seconds)
+            return
+        chunks = max(1, min(MAX_OUTPUT_CHUNKS, int(seconds / OUTPUT_CHUNK_S)))
+        for i in range(chunks):
+            time.sleep(seconds / chunks)
+            for stream, text in outputs.items():
+                size = len(text) // chunks
+                piece = text[i * size:] if i == chunks - 1 else text[i * size:(i + 1) * size]
+                if piece:
+                    on_output(stream, piece)
+
+
+# Shared simulator used by the stand-in action handlers
+simulator = ActionSimulator.from_config()
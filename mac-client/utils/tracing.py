@@ -0,0 +1,297 @@
+"""Lightweight tracing of missions, steps, actions, subprocesses and HTTP calls.
+
+Spans are timed with ``Tracer.span`` and appended to ``TRACE_FILE`` as
+OTLP/JSON lines (one ``ExportTraceServiceRequest`` per line, the format of
+the OpenTelemetry collector file exporter), so they can be loaded into any
+OTLP-aware tool or summarized with ``backend/benchmarks/trace_report.py``.
+
+The current span is kept in a context variable: asyncio tasks and
+``asyncio.to_thread`` inherit it, plain threads need
+``contextvars.copy_context()``. The backend hands out each mission's trace
+context in a W3C ``traceparent`` response header, and every traced request
+carries the caller's span in a ``traceparent`` request header, so client and
+backend spans of a mission share one trace.
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import asyncio
+import secrets
+import threading
+import subprocess
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from config import TRACING_ENABLED, TRACE_FILE, TRACE_SERVICE_NAME
+from utils.logger import setup_logger
+
+logger = setup_logger("tracing")
+
+# OTLP span kinds and status codes
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+FLUSH_BATCH = 100  # spans per exported line
+FLUSH_INTERVAL = 1.0  # seconds a finished span may wait in the buffer
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str]]:
+    """Return (trace_id, span_id) from a W3C traceparent header, or None if invalid."""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return parts[1], parts[2]
+
+
+def _attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class Span:
+    """A timed operation within a trace."""
+    
+    def __init__(self, tracer: "Tracer", name: str, trace_id: str, parent_span_id: Optional[str],
+                 kind: int = KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent_span_id
+        self.kind = kind
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.status = STATUS_OK
+        self.status_message = ""
+    
+    def set_attribute(self, key: str, value: Any):
+        if value is not None:
+            self.attributes[key] = value
+    
+    def set_error(self, message: str):
+        self.status = STATUS_ERROR
+        self.status_message = message
+    
+    def traceparent(self) -> str:
+        """Return the W3C traceparent header naming this span as parent."""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+    
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self.tracer._export(self)
+    
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": self.status}
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        return span
+
+
+class _NoopSpan:
+    """Stand-in yielded while tracing is disabled."""
+    
+    def set_attribute(self, key: str, value: Any):
+        pass
+    
+    def set_error(self, message: str):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """Creates spans and exports finished ones to an OTLP/JSON lines file."""
+    
+    def __init__(self, path: str = TRACE_FILE, service_name: str = TRACE_SERVICE_NAME,
+                 enabled: bool = TRACING_ENABLED):
+        """Initialize the tracer.
+        
+        Args:
+            path: File finished spans are appended to
+            service_name: service.name resource attribute of exported spans
+            enabled: Whether spans are recorded at all
+        """
+        self.path = path
+        self.service_name = service_name
+        self.enabled = enabled
+        
+        self._lock = threading.Lock()
+        self._buffer: List[Dict[str, Any]] = []
+        self._last_flush = time.monotonic()
+        self.exported = 0
+        if enabled:
+            atexit.register(self.flush)
+    
+    def current(self) -> Optional[Span]:
+        """Return the active span of the calling context."""
+        return _current_span.get()
+    
+    def set_current(self, span: Optional[Span]):
+        """Make a span the active span of the calling context (None clears it).
+        
+        For spans that outlive a block, e.g. a mission ended by a polling loop.
+        """
+        _current_span.set(span)
+    
+    def start_span(self, name: str, kind: int = KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None,
+                   parent: Optional[str] = None) -> Optional[Span]:
+        """Start a span without activating it; the caller ends it with span.end().
+        
+        Args:
+            name: Span name
+            kind: KIND_INTERNAL, KIND_SERVER or KIND_CLIENT
+            attributes: Initial attributes
+            parent: traceparent header of a remote parent, used instead of
+                the active span
+                
+        Returns:
+            The span, or None while tracing is disabled
+        """
+        if not self.enabled:
+            return None
+        remote = parse_traceparent(parent)
+        active = self.current()
+        if remote is not None:
+            trace_id, parent_span_id = remote
+        elif active is not None:
+            trace_id, parent_span_id = active.trace_id, active.span_id
+        else:
+            trace_id, parent_span_id = secrets.token_hex(16), None
+        return Span(self, name, trace_id, parent_span_id, kind, attributes)
+    
+    @contextmanager
+    def span(self, name: str, kind: int = KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None,
+             parent: Optional[str] = None) -> Iterator[Any]:
+        """Time a block as a span, child of the active span.
+        
+        An exception leaving the block marks the span as failed.
+        
+        Args:
+            name: Span name, e.g. "step" or "HTTP GET"
+            kind: KIND_INTERNAL, KIND_SERVER or KIND_CLIENT
+            attributes: Initial attributes
+            parent: traceparent header of a remote parent, used instead of
+                the active span (e.g. the mission context from the backend)
+                
+        Yields:
+            The span (a no-op object while tracing is disabled)
+        """
+        span = self.start_span(name, kind, attributes, parent)
+        if span is None:
+            yield _NOOP_SPAN
+            return
+            
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_error(f"{e.__class__.__name__}: {e}")
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+    
+    def inject(self, headers: Dict[str, str]) -> Dict[str, str]:
+        """Add the active span's traceparent header to a request's headers."""
+        active = self.current() if self.enabled else None
+        if active is not None:
+            headers["traceparent"] = active.traceparent()
+        return headers
+    
+    def _export(self, span: Span):
+        with self._lock:
+            self._buffer.append(span.to_otlp())
+            due = len(self._buffer) >= FLUSH_BATCH or time.monotonic() - self._last_flush >= FLUSH_INTERVAL
+        if due or span.parent_span_id is None or span.name == "mission":
+            self.flush()
+    
+    def flush(self):
+        """Write buffered spans to the trace file."""
+        with self._lock:
+            spans, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+            if not spans:
+                return
+            request = {
+                "resourceSpans": [{
+                    "resource": {"attributes": [_attribute("service.name", self.service_name)]},
+                    "scopeSpans": [{"scope": {"name": "autoide.tracing"}, "spans": spans}]
+                }]
+            }
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(request) + "\n")
+                self.exported += len(spans)
+            except OSError as e:
+                logger.error(f"Failed to write spans to {self.path}: {e}")
+
+
+def traced_run(args: List[str], **kwargs) -> subprocess.CompletedProcess:
+    """subprocess.run, recorded as a span named after the program (e.g. "osascript").
+    
+    Like traced_sleep, only recorded inside a traced operation (an action).
+    """
+    if tracer.current() is None:
+        return subprocess.run(args, **kwargs)
+    caller = sys._getframe(1)
+    attributes = {"code.function": caller.f_code.co_name, "code.lineno": caller.f_lineno}
+    with tracer.span(os.path.basename(args[0]), attributes=attributes) as span:
+        result = subprocess.run(args, **kwargs)
+        span.set_attribute("process.exit_code", result.returncode)
+        return result
+
+
+def traced_sleep(seconds: float):
+    """time.sleep, recorded as a "sleep" span with the calling function and line."""
+    if tracer.current() is None:
+        time.sleep(seconds)
+        return
+    caller = sys._getframe(1)
+    attributes = {"code.function": caller.f_code.co_name, "code.lineno": caller.f_lineno, "sleep.seconds": seconds}
+    with tracer.span("sleep", attributes=attributes):
+        time.sleep(seconds)
+
+
+async def traced_async_sleep(seconds: float):
+    """asyncio.sleep, recorded as a "sleep" span like traced_sleep."""
+    if tracer.current() is None:
+        await asyncio.sleep(seconds)
+        return
+    caller = sys._getframe(1)
+    attributes = {"code.function": caller.f_code.co_name, "code.lineno": caller.f_lineno, "sleep.seconds": seconds}
+    with tracer.span("sleep", attributes=attributes):
+        await asyncio.sleep(seconds)
+
+
+# Shared tracer used across the client
+tracer = Tracer()